@@ -1,20 +1,43 @@
-import logging
-from logging.handlers import RotatingFileHandler
 from functools import wraps
-from flask import Flask, jsonify, request, send_from_directory
+from contextlib import contextmanager
+from flask import (Flask, Response, g, has_request_context, jsonify, request, send_from_directory,
+                   stream_with_context, url_for)
 from flask_cors import CORS
 import os
+import atexit
+import base64
+import contextvars
+import hashlib
+import itertools
+import json
+import math
+import time
+import threading
 import psycopg2
 from psycopg2 import sql, errors as pg_errors
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-import bcrypt
 import jwt
 from datetime import datetime, timedelta
 import traceback
+import uuid
 import dotenv
 
-# Загрузка переменных окружения
-dotenv.load_dotenv()
+import log_config
+import metrics
+import queries
+from db_pool import ConnectionPool, PoolTimeout
+from db_session import DBSession
+from hashing import HashingBusy, HashingExecutor
+from audit import AuditWriter
+from cache import LRUTTLCache
+from avatars import AvatarStore, AvatarTooLarge, InvalidAvatar
+from ratelimit import LoginRateLimiter, MemoryRateLimitStore
+from strength import StrengthEstimator, load_ranked
+from breached import BreachedIndex
+import generator
+import vault
+import wordlists
 
 app = Flask(__name__)
 CORS(app)
@@ -26,38 +49,13 @@ def log_user_action(username, action_type, status, details=None):
         ip_address = request.remote_addr
         user_agent = request.headers.get('User-Agent', '')
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """INSERT INTO user_logs 
-               (username, action_type, ip_address, user_agent, status, details) 
-               VALUES (%s, %s, %s, %s, %s, %s)""",
+        get_audit_writer().submit(
+            'user_logs',
             (username, action_type, ip_address, user_agent, status, details)
         )
-        conn.commit()
-        cur.close()
-        conn.close()
     except Exception as e:
         app.logger.error(f"Failed to log user action: {str(e)}")
 
-# Настройка логирования
-def setup_logging():
-    handler = RotatingFileHandler('app.log', maxBytes=10000, backupCount=3)
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-    )
-    handler.setFormatter(formatter)
-    app.logger.addHandler(handler)
-    app.logger.setLevel(logging.INFO)
-
-setup_logging()
-
-# Конфигурация
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
-app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
-
 # Конфигурация PostgreSQL
 DATABASE_CONFIG = {
     'dbname': 'OneBad',
@@ -68,8 +66,212 @@ DATABASE_CONFIG = {
 }
 
 UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Аватары: миниатюры фиксированных размеров, имя файла - хеш содержимого
+AVATAR_FOLDER = os.path.abspath(os.path.join(UPLOAD_FOLDER, 'avatars'))
+avatar_store = AvatarStore(AVATAR_FOLDER)
+
+# Конфигурация читается из окружения при создании приложения, а не при импорте
+def load_config():
+    # Настройка логирования
+    app.config['LOG_FILE'] = os.getenv('LOG_FILE', 'app.log')
+    app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json')
+    app.config['LOG_MAX_BYTES'] = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    app.config['LOG_BACKUP_COUNT'] = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    # size - ротация по LOG_MAX_BYTES внутри процесса, external - внешняя
+    # (logrotate); server.py с несколькими воркерами выбирает external
+    app.config['LOG_ROTATION'] = os.getenv('LOG_ROTATION', 'size')
+    app.config['LOG_LEVELS'] = log_config.parse_levels(os.getenv('LOG_LEVELS', 'werkzeug=WARNING'))
+    app.config['LOG_INFO_SAMPLE_RATE'] = float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))
+    app.config['LOG_CONSOLE'] = os.getenv('LOG_CONSOLE', '1') == '1'
+
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+    app.config['TOKEN_CACHE_SIZE'] = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))
+    # Отзыв токена в другом воркере проверяется по БД только при промахе
+    # кэша: TTL ограничивает, сколько секунд там ещё принимается такой токен
+    app.config['TOKEN_CACHE_TTL'] = float(os.getenv('TOKEN_CACHE_TTL', '30'))
+    app.config['TOKEN_REVOCATION_SIZE'] = int(os.getenv('TOKEN_REVOCATION_SIZE', '100000'))
+    app.config['BULK_MAX_ENTRIES'] = int(os.getenv('BULK_MAX_ENTRIES', '5000'))
+    app.config['BULK_EXPORT_FETCH_SIZE'] = 1000
+    # Кэши профилей и списков сервисов свои у каждого воркера. Запись из
+    # любого воркера меняет поколение пользователя в cache_generations, и
+    # запись кэша с другим поколением перечитывается из БД, поэтому TTL
+    # ограничивает только память, а не устаревание данных
+    app.config['PROFILE_CACHE_SIZE'] = int(os.getenv('PROFILE_CACHE_SIZE', '10000'))
+    app.config['PROFILE_CACHE_TTL'] = float(os.getenv('PROFILE_CACHE_TTL', '60'))
+    app.config['SERVICES_CACHE_SIZE'] = int(os.getenv('SERVICES_CACHE_SIZE', '10000'))
+    app.config['SERVICES_CACHE_TTL'] = float(os.getenv('SERVICES_CACHE_TTL', '300'))
+    app.config['SERVICES_CACHE_MAX_BYTES'] = int(os.getenv('SERVICES_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    app.config['LOGS_PAGE_SIZE'] = 100
+    app.config['LOGS_MAX_PAGE_SIZE'] = 500
+    # Генерация и проверка стойкости паролей
+    app.config['PASSWORD_MIN_SCORE'] = int(os.getenv('PASSWORD_MIN_SCORE', '2'))
+    app.config['PASSWORD_DICTIONARY_FILE'] = os.getenv('PASSWORD_DICTIONARY_FILE')
+    app.config['PASSPHRASE_WORDS_FILE'] = os.getenv('PASSPHRASE_WORDS_FILE')
+    app.config['GENERATE_MAX_COUNT'] = int(os.getenv('GENERATE_MAX_COUNT', '100'))
+    app.config['GENERATE_MAX_LENGTH'] = int(os.getenv('GENERATE_MAX_LENGTH', '128'))
+    # Индекс утёкших паролей (breached.py build); без него проверка выключена
+    app.config['BREACHED_PASSWORDS_INDEX'] = os.getenv('BREACHED_PASSWORDS_INDEX')
+    # Зашифрованное хранилище (vault.py): data key пользователя открывается
+    # мастер-паролем при входе и живёт в памяти процесса VAULT_KEY_CACHE_TTL секунд.
+    # Выключено по умолчанию: кэш ключей у каждого воркера свой, и при
+    # нескольких воркерах запрос в "чужой" воркер снова просит мастер-пароль
+    app.config['VAULT_ENABLED'] = os.getenv('VAULT_ENABLED', '0') == '1'
+    app.config['VAULT_KEY_CACHE_SIZE'] = int(os.getenv('VAULT_KEY_CACHE_SIZE', '10000'))
+    app.config['VAULT_KEY_CACHE_TTL'] = float(os.getenv('VAULT_KEY_CACHE_TTL', '900'))
+    app.config['VAULT_KDF_N'] = int(os.getenv('VAULT_KDF_N', str(vault.DEFAULT_KDF_N)))
+    app.config['VAULT_KDF_R'] = int(os.getenv('VAULT_KDF_R', str(vault.DEFAULT_KDF_R)))
+    app.config['VAULT_KDF_P'] = int(os.getenv('VAULT_KDF_P', str(vault.DEFAULT_KDF_P)))
+    # Секционирование и хранение user_logs и password_logs (retention.py)
+    app.config['LOG_PARTITION_INTERVAL'] = os.getenv('LOG_PARTITION_INTERVAL', 'month')
+    app.config['LOG_PARTITIONS_AHEAD'] = int(os.getenv('LOG_PARTITIONS_AHEAD', '2'))
+    app.config['LOG_RETENTION_DAYS'] = int(os.getenv('LOG_RETENTION_DAYS', '180'))
+    app.config['LOG_ARCHIVE_DIR'] = os.getenv('LOG_ARCHIVE_DIR', 'log_archive')
+
+    # Конфигурация bcrypt
+    app.config['BCRYPT_ROUNDS'] = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    app.config['HASHING_EXECUTOR'] = os.getenv('HASHING_EXECUTOR', 'process')
+    app.config['HASHING_WORKERS'] = int(os.getenv('HASHING_WORKERS', str(os.cpu_count() or 1)))
+    app.config['HASHING_MAX_QUEUE'] = int(os.getenv('HASHING_MAX_QUEUE', str(4 * (os.cpu_count() or 1))))
+    app.config['HASHING_QUEUE_TIMEOUT'] = float(os.getenv('HASHING_QUEUE_TIMEOUT', '0.1'))
+    # Пакетный импорт занимает не больше этого числа воркеров (0 - половина)
+    app.config['HASHING_BULK_WORKERS'] = int(os.getenv('HASHING_BULK_WORKERS', '0'))
+
+    # Конфигурация пула соединений
+    app.config['DB_POOL_MIN_SIZE'] = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+    app.config['DB_POOL_MAX_SIZE'] = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+    app.config['ASYNC_DB_POOL_MIN_SIZE'] = int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '2'))
+    app.config['ASYNC_DB_POOL_MAX_SIZE'] = int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '20'))
+    app.config['DB_POOL_ACQUIRE_TIMEOUT'] = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '5'))
+    app.config['DB_POOL_MAX_IDLE'] = float(os.getenv('DB_POOL_MAX_IDLE', '30'))
+    # Поиск соединений, не возвращённых к концу запроса; в режиме отладки включён всегда
+    app.config['DB_LEAK_DETECTION'] = os.getenv('DB_LEAK_DETECTION', '0') == '1'
+
+    # Аватары
+    app.config['AVATAR_MAX_BYTES'] = int(os.getenv('AVATAR_MAX_BYTES', str(2 * 1024 * 1024)))
+    app.config['AVATAR_PROFILE_SIZE'] = 128
+    app.config['AVATAR_CACHE_MAX_AGE'] = 365 * 24 * 3600
+
+    # Конфигурация фоновой записи аудита
+    app.config['AUDIT_BATCH_SIZE'] = int(os.getenv('AUDIT_BATCH_SIZE', '200'))
+    app.config['AUDIT_FLUSH_INTERVAL'] = float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.5'))
+    app.config['AUDIT_MAX_QUEUE'] = int(os.getenv('AUDIT_MAX_QUEUE', '10000'))
+    app.config['AUDIT_OVERFLOW_POLICY'] = os.getenv('AUDIT_OVERFLOW_POLICY', 'drop_oldest')
+
+    # Ограничение частоты входа: попыток с одного IP и неудач на одно имя
+    app.config['LOGIN_RATE_LIMIT_IP'] = int(os.getenv('LOGIN_RATE_LIMIT_IP', '30'))
+    app.config['LOGIN_RATE_WINDOW_IP'] = float(os.getenv('LOGIN_RATE_WINDOW_IP', '60'))
+    app.config['LOGIN_RATE_LIMIT_USER'] = int(os.getenv('LOGIN_RATE_LIMIT_USER', '5'))
+    app.config['LOGIN_RATE_WINDOW_USER'] = float(os.getenv('LOGIN_RATE_WINDOW_USER', '300'))
+    app.config['LOGIN_LOCKOUT_SECONDS'] = float(os.getenv('LOGIN_LOCKOUT_SECONDS', '30'))
+    app.config['LOGIN_LOCKOUT_MAX_SECONDS'] = float(os.getenv('LOGIN_LOCKOUT_MAX_SECONDS', '3600'))
+    app.config['RATE_LIMIT_MAX_KEYS'] = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+    # Общее хранилище счётчиков для нескольких процессов (объект с методами
+    # hit/retry_after/reset, см. ratelimit.py); None - память процесса
+    app.config['RATE_LIMIT_STORE'] = None
+
+def setup_logging():
+    return log_config.setup_logging(
+        app,
+        filename=app.config['LOG_FILE'],
+        max_bytes=app.config['LOG_MAX_BYTES'],
+        backup_count=app.config['LOG_BACKUP_COUNT'],
+        fmt=app.config['LOG_FORMAT'],
+        levels=app.config['LOG_LEVELS'],
+        sample_rate=app.config['LOG_INFO_SAMPLE_RATE'],
+        console=app.config['LOG_CONSOLE'],
+        rotation=app.config['LOG_ROTATION']
+    )
+
+_log_handler = None
+
+metrics.Counter('log_records_dropped_total', 'Log records dropped because the log queue was full',
+                lambda: _log_handler.dropped if _log_handler is not None else 0)
+
+# Фабрика приложения: окружение, конфигурация, логирование и размеры кэшей.
+# Импорт модуля ничего не читает и не создаёт; пул соединений и схема БД
+# инициализируются при первом обращении к базе
+_app_ready = False
+_app_lock = threading.Lock()
+
+def create_app():
+    global _app_ready, _log_handler, _strength_estimator, _passphrase_words, _breached_index
+    if _app_ready:
+        return app
+    with _app_lock:
+        if not _app_ready:
+            dotenv.load_dotenv()
+            load_config()
+            _log_handler = setup_logging()
+
+            _token_cache.maxsize = app.config['TOKEN_CACHE_SIZE']
+            _token_cache.ttl = app.config['TOKEN_CACHE_TTL']
+            _revoked_tokens.maxsize = app.config['TOKEN_REVOCATION_SIZE']
+            _revoked_tokens.ttl = app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()
+            _profile_cache.maxsize = app.config['PROFILE_CACHE_SIZE']
+            _profile_cache.ttl = app.config['PROFILE_CACHE_TTL']
+            _services_cache.maxsize = app.config['SERVICES_CACHE_SIZE']
+            _services_cache.ttl = app.config['SERVICES_CACHE_TTL']
+            _services_cache.max_bytes = app.config['SERVICES_CACHE_MAX_BYTES']
+            _services_invalidations.maxsize = app.config['SERVICES_CACHE_SIZE']
+            avatar_store.max_bytes = app.config['AVATAR_MAX_BYTES']
+            _passphrase_words, _strength_estimator = load_password_dictionaries()
+            if app.config['BREACHED_PASSWORDS_INDEX']:
+                _breached_index = BreachedIndex(app.config['BREACHED_PASSWORDS_INDEX'])
+            _vault_keys.maxsize = app.config['VAULT_KEY_CACHE_SIZE']
+            _vault_keys.ttl = app.config['VAULT_KEY_CACHE_TTL']
+            if app.config['VAULT_ENABLED'] and not vault.AVAILABLE:
+                app.logger.warning("cryptography is not installed, passwords are stored as hashes only")
+            _app_ready = True
+    return app
+
+# Метрики запросов. Метка route - правило URL, а не путь, чтобы число
+# рядов не зависело от параметров в адресе
+HTTP_REQUEST_SECONDS = metrics.Histogram(
+    'http_request_duration_seconds', 'Request latency by route and method'
+)
+HTTP_REQUESTS = metrics.Counter(
+    'http_requests_total', 'Requests by route, method and status code'
+)
+HTTP_IN_FLIGHT = metrics.Gauge(
+    'http_requests_in_flight', 'Requests currently being handled by route'
+)
+
+def route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+# Идентификатор и время начала запроса для структурированных логов
+@app.before_request
+def start_request_context():
+    # Запуск через "flask run" или app:app без вызова create_app()
+    if not _app_ready:
+        create_app()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+    g.route = route_label()
+    HTTP_IN_FLIGHT.inc(route=g.route)
+    if db_leak_detection():
+        g.db_checkouts = set(_db_pool.checkouts(threading.get_ident())) if _db_pool else set()
+
+@app.after_request
+def finish_request_context(response):
+    response.headers['X-Request-ID'] = g.request_id
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - g.request_started, route=g.route, method=request.method
+    )
+    HTTP_REQUESTS.inc(route=g.route, method=request.method, status=response.status_code)
+    app.logger.info(
+        f"{request.method} {request.path} {response.status_code}",
+        extra={'status_code': response.status_code}
+    )
+    return response
+
+@app.teardown_request
+def finish_in_flight(error=None):
+    route = g.pop('route', None)
+    if route is not None:
+        HTTP_IN_FLIGHT.dec(route=route)
 
 # Кастомные ошибки
 class APIError(Exception):
@@ -85,11 +287,23 @@ class APIError(Exception):
         rv['status'] = 'error'
         return rv
 
+class TooManyRequests(APIError):
+    def __init__(self, message, retry_after):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(message, 429, {'retry_after': self.retry_after})
+
+class VersionConflict(APIError):
+    def __init__(self, current_version):
+        super().__init__('Password was changed by another client', 409,
+                         {'current_version': current_version})
+
 # Глобальные обработчики ошибок
 @app.errorhandler(APIError)
 def handle_api_error(error):
     response = jsonify(error.to_dict())
     response.status_code = error.status_code
+    if isinstance(error, TooManyRequests):
+        response.headers['Retry-After'] = str(error.retry_after)
     return response
 
 @app.errorhandler(404)
@@ -107,8 +321,43 @@ def internal_error(error):
         'status': 'error'
     }), 500
 
+# Время SQL-запросов по вспомогательным функциям: имя функции передаётся
+# курсору через contextvar, запросы вне помеченных функций попадают в other
+DB_QUERY_SECONDS = metrics.Histogram('db_query_seconds', 'SQL execute time by helper function')
+DB_ACQUIRE_SECONDS = metrics.Histogram(
+    'db_connection_acquire_seconds', 'Time get_db_connection spent obtaining a connection'
+)
+_db_helper = contextvars.ContextVar('db_helper', default='other')
+
+class TimedCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, helper=_db_helper.get())
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, helper=_db_helper.get())
+
+def label_queries(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = _db_helper.set(f.__name__)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _db_helper.reset(token)
+    return decorated
+
 # Декоратор для обработки ошибок БД
 def handle_db_errors(f):
+    f = label_queries(f)
+
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
@@ -124,57 +373,380 @@ def handle_db_errors(f):
             raise APIError('Database operation failed', 500)
     return decorated
 
+# Пул соединений создаётся при первом обращении к БД
+_db_pool = None
+_db_pool_lock = threading.Lock()
+# Схема проверяется один раз на процесс; при запуске через fork флаг
+# наследуется от мастера
+_db_initialized = False
+_db_init_lock = threading.Lock()
+
+def get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(
+                    lambda: psycopg2.connect(
+                        **DATABASE_CONFIG,
+                        connection_factory=queries.PreparingConnection,
+                        cursor_factory=TimedCursor
+                    ),
+                    min_size=app.config['DB_POOL_MIN_SIZE'],
+                    max_size=app.config['DB_POOL_MAX_SIZE'],
+                    acquire_timeout=app.config['DB_POOL_ACQUIRE_TIMEOUT'],
+                    max_idle=app.config['DB_POOL_MAX_IDLE'],
+                    track_checkouts=db_leak_detection()
+                )
+                atexit.register(_db_pool.close)
+    return _db_pool
+
+def _db_pool_stat(name):
+    return lambda: _db_pool.stats()[name] if _db_pool is not None else 0
+
+metrics.Gauge('db_pool_size', 'Open connections in the pool', _db_pool_stat('size'))
+metrics.Gauge('db_pool_idle', 'Idle connections in the pool', _db_pool_stat('idle'))
+metrics.Gauge('db_pool_in_use', 'Connections checked out of the pool', _db_pool_stat('in_use'))
+metrics.Gauge('db_pool_waiting', 'Threads waiting for a pooled connection', _db_pool_stat('waiting'))
+metrics.Counter('db_pool_acquired_total', 'Connections handed out by the pool', _db_pool_stat('acquired_total'))
+metrics.Counter('db_pool_timeouts_total', 'Pool acquisitions that timed out', _db_pool_stat('timeouts_total'))
+metrics.Counter('db_pool_discarded_total', 'Broken or stale connections discarded', _db_pool_stat('discarded_total'))
+metrics.Counter('db_pool_wait_seconds_total', 'Total time spent waiting for connections', _db_pool_stat('wait_seconds_total'))
+
+DB_CONNECTION_LEAKS = metrics.Counter(
+    'db_connection_leaks_total', 'Connections still checked out when a request finished'
+)
+
+def db_leak_detection():
+    return app.debug or app.config.get('DB_LEAK_DETECTION', False)
+
+# Внутри запроса все функции получают соединение сессии запроса (g.db):
+# одно соединение и одна транзакция, фиксация в finish_db_session, возврат
+# в пул в close_db_session. Вне запроса (аудит, CLI) - соединение из пула
+# на время блока
+def get_db_session():
+    session = g.get('db')
+    if session is None:
+        session = g.db = DBSession(get_db_pool)
+    return session
+
+@contextmanager
 def get_db_connection():
+    acquired = False
     try:
-        conn = psycopg2.connect(**DATABASE_CONFIG)
-        return conn
+        if not _db_initialized:
+            init_db()
+        started = time.perf_counter()
+        if has_request_context():
+            session = get_db_session()
+            reused = session.active
+            conn = session.connection()
+            if not reused:
+                DB_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+            acquired = True
+            try:
+                yield conn
+            except pg_errors.DatabaseError:
+                # Транзакция после ошибки не принимает запросов до отката
+                session.rollback()
+                raise
+        else:
+            with get_db_pool().connection() as conn:
+                DB_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+                acquired = True
+                yield conn
+    except PoolTimeout as e:
+        app.logger.error(f"Database pool exhausted: {str(e)}")
+        raise APIError('Database is busy, try again later', 503)
     except pg_errors.DatabaseError as e:
+        if acquired:
+            raise
         app.logger.error(f"Database connection error: {str(e)}")
         raise APIError('Database connection failed', 500)
 
-# Инициализация базы данных
+# Фиксация записи: внутри запроса - один раз в конце запроса, вне запроса - сразу
+def commit_db(conn):
+    if has_request_context():
+        get_db_session().mark_dirty()
+    else:
+        conn.commit()
 
-@handle_db_errors
-def init_db():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # инц
+# Действие после фиксации (сброс кэшей); при откате запроса не выполняется
+def on_commit(callback, *args):
+    session = g.get('db') if has_request_context() else None
+    if session is not None:
+        session.after_commit(callback, *args)
+    else:
+        callback(*args)
+
+# Перед bcrypt соединение без незафиксированной записи возвращается в пул,
+# чтобы не держать его сотни миллисекунд
+def release_idle_db_connection():
+    session = g.get('db') if has_request_context() else None
+    if session is not None:
+        session.release_if_clean()
+
+@app.after_request
+def finish_db_session(response):
+    session = g.get('db')
+    if session is None:
+        return response
+    if response.status_code >= 400:
+        session.rollback()
+        return response
+    try:
+        session.commit()
+    except pg_errors.DatabaseError as e:
+        app.logger.error(f"Request commit failed: {str(e)}")
+        session.rollback()
+        return handle_api_error(APIError('Database operation failed', 500))
+    return response
+
+# Возврат соединения на любом пути, включая необработанные исключения и
+# прерванную потоковую выдачу
+@app.teardown_request
+def close_db_session(error=None):
+    session = g.pop('db', None)
+    if session is not None:
+        session.close()
+    baseline = g.pop('db_checkouts', None)
+    if baseline is not None and _db_pool is not None:
+        for key, (_, held, stack) in _db_pool.checkouts(threading.get_ident()).items():
+            if key not in baseline:
+                DB_CONNECTION_LEAKS.inc()
+                app.logger.error(
+                    f"Database connection leaked by {request.method} {request.path}, "
+                    f"held for {held:.3f}s, acquired at:\n{''.join(stack)}"
+                )
+
+# Запись аудита пачками в фоновом потоке
+@label_queries
+def write_audit_batch(table, rows):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        queries.insert_audit_rows(cur, table, rows)
+        conn.commit()
 
-    conn.commit()
-    cur.close()
-    conn.close()
+_audit_writer = None
+_audit_writer_lock = threading.Lock()
+
+def get_audit_writer():
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_writer_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter(
+                    write_audit_batch,
+                    batch_size=app.config['AUDIT_BATCH_SIZE'],
+                    flush_interval=app.config['AUDIT_FLUSH_INTERVAL'],
+                    max_queue=app.config['AUDIT_MAX_QUEUE'],
+                    overflow=app.config['AUDIT_OVERFLOW_POLICY'],
+                    logger=app.logger
+                )
+                _audit_writer.start()
+                atexit.register(_audit_writer.stop)
+    return _audit_writer
+
+# Соединения, потоки и пулы процессов нельзя наследовать через fork.
+# Мастер-процесс освобождает их перед запуском воркеров, воркеры создают заново
+def release_resources():
+    global _db_pool, _audit_writer, _hashing_executor
+    if _audit_writer is not None:
+        _audit_writer.stop()
+    if _hashing_executor is not None:
+        _hashing_executor.shutdown()
+    if _db_pool is not None:
+        _db_pool.close()
+    _db_pool = _audit_writer = _hashing_executor = None
+
+def reinit_after_fork():
+    global _db_pool, _audit_writer, _hashing_executor
+    _db_pool = _audit_writer = _hashing_executor = None
+    if _log_handler is not None:
+        log_config.restart_after_fork(_log_handler)
+
+# Инициализация базы данных
+def init_db():
+    global _db_initialized
+    with _db_init_lock:
+        if _db_initialized:
+            return
+        _prepare_schema()
+        _db_initialized = True
     app.logger.info("Database initialized successfully")
 
-init_db()
+def _prepare_schema():
+    with get_db_pool().connection() as conn, conn.cursor() as cur:
+        queries.migrate_schema(cur)
+        queries.create_indexes(cur)
+        conn.commit()
+
+
+# Словари для оценки стойкости и парольных фраз загружаются один раз в
+# create_app; в gunicorn их строит мастер, воркеры получают через fork
+_strength_estimator = None
+_passphrase_words = wordlists.WORDS
+
+def load_password_dictionaries():
+    ranked = wordlists.COMMON_PASSWORDS
+    if app.config['PASSWORD_DICTIONARY_FILE']:
+        ranked = load_ranked(app.config['PASSWORD_DICTIONARY_FILE'])
+    words = wordlists.WORDS
+    if app.config['PASSPHRASE_WORDS_FILE']:
+        words = tuple(dict.fromkeys(load_ranked(app.config['PASSPHRASE_WORDS_FILE'])))
+    return words, StrengthEstimator(ranked, words)
+
+# Индекс отображается в память в create_app; в gunicorn воркеры делят
+# страницы мастера
+_breached_index = None
+
+BREACHED_REJECTIONS = metrics.Counter(
+    'breached_password_rejections_total', 'Passwords rejected because they appear in the breach index'
+)
+metrics.Gauge('breached_index_entries', 'Hashes in the breached password index',
+              lambda: len(_breached_index) if _breached_index is not None else 0)
+
+def check_password_breached(password: str):
+    if _breached_index is not None and password in _breached_index:
+        BREACHED_REJECTIONS.inc()
+        raise APIError('This password has appeared in a data breach', 400, {'breached': True})
+
+def check_password_strength(password: str, *user_inputs):
+    strength = _strength_estimator.estimate(password, user_inputs)
+    if strength.score < app.config['PASSWORD_MIN_SCORE']:
+        raise APIError('Password is too weak', 400, {'strength': strength._asdict()})
+    return strength
 
 
 # Функции для работы с хешами паролей
+# bcrypt выполняется в отдельном пуле, чтобы не занимать потоки запросов
+_hashing_executor = None
+_hashing_executor_lock = threading.Lock()
+
+def get_hashing_executor():
+    global _hashing_executor
+    if _hashing_executor is None:
+        with _hashing_executor_lock:
+            if _hashing_executor is None:
+                _hashing_executor = HashingExecutor(
+                    workers=app.config['HASHING_WORKERS'],
+                    max_queue=app.config['HASHING_MAX_QUEUE'],
+                    queue_timeout=app.config['HASHING_QUEUE_TIMEOUT'],
+                    kind=app.config['HASHING_EXECUTOR'],
+                    bulk_workers=app.config['HASHING_BULK_WORKERS'] or None
+                )
+                atexit.register(_hashing_executor.shutdown)
+    return _hashing_executor
+
+# Полное время хеширования и проверки, включая ожидание в очереди пула
+PASSWORD_HASHING_SECONDS = metrics.Histogram(
+    'password_hashing_seconds', 'hash_password and check_password time including queueing'
+)
+
+@PASSWORD_HASHING_SECONDS.time(op='hash')
 def hash_password(password: str) -> str:
+    release_idle_db_connection()
     try:
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        return get_hashing_executor().hash(password, app.config['BCRYPT_ROUNDS'])
+    except HashingBusy:
+        app.logger.warning("Password hashing rejected: executor is saturated or timed out")
+        raise APIError('Server is busy, try again later', 503)
     except Exception as e:
         app.logger.error(f"Password hashing error: {str(e)}")
         raise APIError('Password processing failed', 500)
 
+@PASSWORD_HASHING_SECONDS.time(op='hash_many')
+def hash_passwords(passwords) -> list:
+    release_idle_db_connection()
+    try:
+        return get_hashing_executor().hash_many(passwords, app.config['BCRYPT_ROUNDS'])
+    except HashingBusy:
+        app.logger.warning("Bulk password hashing rejected: executor is saturated or timed out")
+        raise APIError('Server is busy, try again later', 503)
+    except Exception as e:
+        app.logger.error(f"Bulk password hashing error: {str(e)}")
+        raise APIError('Password processing failed', 500)
+
+@PASSWORD_HASHING_SECONDS.time(op='check')
 def check_password(hashed_password: str, user_password: str) -> bool:
+    release_idle_db_connection()
     try:
-        return bcrypt.checkpw(user_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return get_hashing_executor().check(hashed_password, user_password)
+    except HashingBusy:
+        app.logger.warning("Password check rejected: executor is saturated or timed out")
+        raise APIError('Server is busy, try again later', 503)
     except Exception as e:
         app.logger.error(f"Password check error: {str(e)}")
         raise APIError('Password verification failed', 500)
 
+# Ограничение частоты входа: решение принимается до запроса к БД и bcrypt
+_login_limiter = None
+_login_limiter_lock = threading.Lock()
+
+LOGIN_RATE_LIMITED = metrics.Counter(
+    'login_rate_limited_total', 'Login attempts rejected by the rate limiter'
+)
+
+def get_login_limiter():
+    global _login_limiter
+    if _login_limiter is None:
+        with _login_limiter_lock:
+            if _login_limiter is None:
+                store = app.config['RATE_LIMIT_STORE']
+                if store is None:
+                    store = MemoryRateLimitStore(max_keys=app.config['RATE_LIMIT_MAX_KEYS'])
+                _login_limiter = LoginRateLimiter(
+                    store,
+                    ip_limit=app.config['LOGIN_RATE_LIMIT_IP'],
+                    ip_window=app.config['LOGIN_RATE_WINDOW_IP'],
+                    user_limit=app.config['LOGIN_RATE_LIMIT_USER'],
+                    user_window=app.config['LOGIN_RATE_WINDOW_USER'],
+                    lockout=app.config['LOGIN_LOCKOUT_SECONDS'],
+                    max_lockout=app.config['LOGIN_LOCKOUT_MAX_SECONDS']
+                )
+    return _login_limiter
+
+def _rate_limit_keys():
+    store = _login_limiter.by_ip.store if _login_limiter is not None else None
+    return len(store) if isinstance(store, MemoryRateLimitStore) else 0
+
+metrics.Gauge('login_rate_limit_keys', 'Keys tracked by the in-process rate limit store',
+              _rate_limit_keys)
+
+# Возвращает TooManyRequests, если попытку входа нужно отклонить
+def check_login_rate(username, ip_address):
+    scope, retry_after = get_login_limiter().check(username, ip_address)
+    if not retry_after:
+        return None
+    LOGIN_RATE_LIMITED.inc(scope=scope)
+    limited = TooManyRequests('Too many login attempts, try again later', retry_after)
+    app.logger.warning(f"Login rate limited by {scope} for {limited.retry_after}s")
+    return limited
+
+# Неудачная попытка; если она превысила лимит, имя блокируется
+def record_login_failure(username):
+    locked_for = get_login_limiter().failed(username)
+    if locked_for:
+        app.logger.warning(f"Login locked for {math.ceil(locked_for)}s after repeated failures")
+    return locked_for
+
+def record_login_success(username):
+    get_login_limiter().succeeded(username)
+
 # JWT Helpers
-def generate_tokens(username):
+# sid - идентификатор сессии входа: общий для access и refresh токенов и
+# сохраняется при обновлении; по нему находится открытый ключ хранилища
+def generate_tokens(username, session_id=None):
+    session_id = session_id or uuid.uuid4().hex
     try:
         access_token = jwt.encode({
             'username': username,
+            'sid': session_id,
             'exp': datetime.utcnow() + app.config['JWT_ACCESS_TOKEN_EXPIRES']
         }, app.config['SECRET_KEY'], algorithm='HS256')
 
         refresh_token = jwt.encode({
             'username': username,
+            'sid': session_id,
             'exp': datetime.utcnow() + app.config['JWT_REFRESH_TOKEN_EXPIRES']
         }, app.config['SECRET_KEY'], algorithm='HS256')
 
@@ -186,157 +758,511 @@ def generate_tokens(username):
         app.logger.error(f"Token generation error: {str(e)}")
         raise APIError('Token generation failed', 500)
 
+# Кэш проверенных токенов: ключ - SHA-256 от токена, запись живёт не дольше exp
+# (размеры и время жизни кэшей задаются в create_app)
+_token_cache = LRUTTLCache()
+# Отзывы хранятся в таблице revoked_tokens (общей для всех воркеров и
+# переживающей перезапуск), здесь - их копия процесса, чтобы не ходить в БД
+# повторно. Копия не вытесняет записи до истечения их exp.
+# TOKEN_REVOCATION_SIZE - порог, после которого удаляются истёкшие записи
+_revoked_tokens = LRUTTLCache(evict_unexpired=False)
+
+metrics.Counter('token_cache_hits_total', 'Protected requests served from the token cache',
+                lambda: _token_cache.hits)
+metrics.Counter('token_cache_misses_total', 'Protected requests that required jwt.decode',
+                lambda: _token_cache.misses)
+metrics.Gauge('token_cache_size', 'Verified tokens currently cached', lambda: len(_token_cache))
+metrics.Gauge('revoked_tokens', 'Revoked tokens kept until they expire', lambda: len(_revoked_tokens))
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def get_request_token():
+    if 'Authorization' in request.headers:
+        return request.headers['Authorization'].split(" ")[1]
+    return None
+
+@handle_db_errors
+def is_token_revoked(digest: str) -> bool:
+    with get_db_connection() as conn, conn.cursor() as cur:
+        return queries.is_token_revoked(cur, digest)
+
+@handle_db_errors
+def store_revoked_token(digest: str, expires_at: float):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        queries.insert_revoked_token(cur, digest, expires_at)
+        commit_db(conn)
+
+# Токен из кэша процесса без обращения к БД; None - нужна полная проверка
+def cached_token_claims(token: str):
+    digest = token_digest(token)
+    if digest in _revoked_tokens:
+        return None
+    return _token_cache.get(digest)
+
+def verify_token(token: str) -> dict:
+    digest = token_digest(token)
+    if digest in _revoked_tokens:
+        app.logger.warning("Revoked token attempt")
+        raise APIError('Token has been revoked', 401)
+
+    claims = _token_cache.get(digest)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        app.logger.warning("Expired token attempt")
+        raise APIError('Token has expired', 401)
+    except jwt.InvalidTokenError:
+        app.logger.warning("Invalid token attempt")
+        raise APIError('Token is invalid', 401)
+    except Exception as e:
+        app.logger.error(f"Token verification error: {str(e)}")
+        raise APIError('Token verification failed', 401)
+
+    # Токен мог быть отозван в другом воркере или до перезапуска
+    if is_token_revoked(digest):
+        _revoked_tokens.set(digest, True, ttl=claims['exp'] - time.time())
+        app.logger.warning("Revoked token attempt")
+        raise APIError('Token has been revoked', 401)
+
+    _token_cache.set(digest, claims, ttl=claims['exp'] - time.time())
+    return claims
+
+def revoke_token(token: str):
+    digest = token_digest(token)
+    _token_cache.pop(digest)
+    try:
+        claims = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return
+    store_revoked_token(digest, claims['exp'])
+    _revoked_tokens.set(digest, True, ttl=claims['exp'] - time.time())
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
+        token = get_request_token()
         
         if not token:
             app.logger.warning("Attempt to access protected route without token")
             raise APIError('Token is missing', 401)
         
-        try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = data['username']
-            app.logger.info(f"User {current_user} accessed protected route")
-        except jwt.ExpiredSignatureError:
-            app.logger.warning("Expired token attempt")
-            raise APIError('Token has expired', 401)
-        except jwt.InvalidTokenError:
-            app.logger.warning("Invalid token attempt")
+        data = verify_token(token)
+        current_user = data.get('username')
+        if not current_user:
+            app.logger.warning("Token without username claim")
             raise APIError('Token is invalid', 401)
-        except Exception as e:
-            app.logger.error(f"Token verification error: {str(e)}")
-            raise APIError('Token verification failed', 401)
+        # Токены, выданные до появления sid, - каждый сам себе сессия
+        g.session_id = data.get('sid') or token_digest(token)
+        app.logger.debug(f"User {current_user} accessed protected route")
         
         return f(current_user, *args, **kwargs)
     return decorated
 
 # Функции работы с пользователями
+# Точечные запросы по уникальному индексу users.username
+@handle_db_errors
+def get_user_by_name(username: str):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        row = queries.get_user(cur, username)
+    if not row:
+        return None
+    return {'username': row[0], 'password_hash': row[1]}
+
 @handle_db_errors
-def read_users():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT username, password_hash FROM users")
-    users = [{'username': row[0], 'password_hash': row[1]} for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return users
+def user_exists(username: str) -> bool:
+    with get_db_connection() as conn, conn.cursor() as cur:
+        return queries.user_exists(cur, username)
 
 @handle_db_errors
 def write_user(username: str, password: str):
     password_hash = hash_password(password)
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO users (username, password_hash) VALUES (%s, %s)",
-        (username, password_hash)
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn, conn.cursor() as cur:
+        queries.insert_user(cur, username, password_hash)
+        commit_db(conn)
     app.logger.info(f"New user created: {username}")
 
 # Функции работы с паролями сервисов
 @handle_db_errors
-def write_service_password(username: str, service: str, password: str):
+def write_service_password(username: str, service: str, password: str, secret: bytes = None):
+    # Один bcrypt и один запрос: CTE читает прежний хеш до upsert
     password_hash = hash_password(password)
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """INSERT INTO passwords (username, service, password_hash) 
-           VALUES (%s, %s, %s)
-           ON CONFLICT (username, service) 
-           DO UPDATE SET password_hash = EXCLUDED.password_hash""",
-        (username, service, password_hash)
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn, conn.cursor() as cur:
+        old_hash, version = queries.upsert_service_password(cur, username, service, password_hash, secret)
+        commit_db(conn)
+    on_commit(invalidate_services, username)
     app.logger.info(f"Password saved for service {service} by user {username}")
+    return password_hash, old_hash, version
+
+# Пакетная запись: один INSERT ... SELECT FROM VALUES в одной транзакции
+@handle_db_errors
+def write_service_passwords_bulk(username: str, entries: dict, secrets: dict = None):
+    services = list(entries)
+    hashes = hash_passwords([entries[service] for service in services])
+    secrets = secrets or {}
+    rows = [
+        (username, service, password_hash, secrets.get(service))
+        for service, password_hash in zip(services, hashes)
+    ]
+
+    with get_db_connection() as conn, conn.cursor() as cur:
+        saved = queries.bulk_upsert_service_passwords(cur, rows)
+        commit_db(conn)
+    on_commit(invalidate_services, username)
+    app.logger.info(f"Bulk saved {len(saved)} passwords for user {username}")
+    return saved
+
+# Обновление с проверкой версии: при расхождении - VersionConflict с
+# текущей версией, чтобы клиент перечитал запись, а не затёр чужое изменение
+@handle_db_errors
+def update_service_password(username: str, service: str, version: int,
+                            new_service: str, password: str = None, data_key: bytes = None):
+    password_hash = hash_password(password) if password else None
+    secret = None
+    if password and data_key is not None:
+        secret = vault.encrypt_secret(data_key, username, new_service, password)
+    with get_db_connection() as conn, conn.cursor() as cur:
+        if not password and new_service != service:
+            secret = reseal_secret(cur, username, service, version, new_service, data_key)
+        row = queries.update_service_password(
+            cur, username, service, version, new_service, password_hash, secret
+        )
+        if row is None:
+            current = queries.get_service_version(cur, username, service)
+            if current is None:
+                raise APIError('Password not found', 404)
+            raise VersionConflict(current)
+        commit_db(conn)
+    on_commit(invalidate_services, username)
+    app.logger.info(f"Password updated for service {new_service} by user {username}")
+    return row
+
+# Шифртекст привязан к имени сервиса, поэтому при переименовании без нового
+# пароля запись перешифровывается. Если версия уже другая, обновление всё
+# равно не пройдёт проверку, и перешифровывать нечего
+def reseal_secret(cur, username, service, version, new_service, data_key):
+    current = queries.get_service_secret(cur, username, service)
+    if current is None or current[0] != version or current[1] is None:
+        return None
+    if data_key is None:
+        if vault_enabled():
+            raise APIError('Vault is locked', 423, {'locked': True})
+        return None
+    try:
+        password = vault.decrypt_secret(data_key, username, service, current[1])
+    except vault.VaultError as e:
+        app.logger.error(f"Stored secret for service {service} of user {username} is unreadable: {str(e)}")
+        raise APIError('Stored password could not be decrypted', 500)
+    return vault.encrypt_secret(data_key, username, new_service, password)
+
+@handle_db_errors
+def read_password_history(username: str, service: str, limit: int):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        version = queries.get_service_version(cur, username, service)
+        rows = queries.list_password_history(cur, username, service, limit) if version else []
+    return version, rows
+
+# Выгрузка через серверный курсор, строки отдаются клиенту по мере чтения
+def iter_service_passwords(username: str):
+    with get_db_connection() as conn:
+        with conn.cursor(name='export_passwords') as cur:
+            cur.itersize = app.config['BULK_EXPORT_FETCH_SIZE']
+            queries.export_service_passwords(cur, username)
+            for row in cur:
+                yield row
+        conn.rollback()
 
 @handle_db_errors
 def verify_service_password(username: str, service: str, password: str) -> bool:
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT password_hash FROM passwords WHERE username = %s AND service = %s",
-        (username, service)
-    )
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn, conn.cursor() as cur:
+        password_hash = queries.get_service_password(cur, username, service)
     
-    if not result:
+    if not password_hash:
         app.logger.warning(f"Password verification failed - no record for {username} and {service}")
         return False
     
-    return check_password(result[0], password)
+    return check_password(password_hash, password)
+
+# Поколения (services, profile) пользователя: одно чтение по первичному ключу
+@handle_db_errors
+def read_cache_generations(username: str):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        return queries.get_cache_generations(cur, username)
 
 @handle_db_errors
 def get_user_services(username: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT service FROM passwords WHERE username = %s",
-        (username,)
-    )
-    services = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return services
+    with get_db_connection() as conn, conn.cursor() as cur:
+        return queries.list_services(cur, username)
+
+# Кэш списков сервисов: username -> ({services, versions}, etag, поколение).
+# Любое изменение записи меняет её версию, поэтому запись, обновление и
+# удаление пароля сбрасывают запись пользователя в этом воркере, а в
+# остальных её отбрасывает сверка поколения. Чтение, начатое до сброса, не
+# кладёт в кэш устаревший список: номер сброса сравнивается с номером,
+# взятым перед запросом к БД
+_services_cache = LRUTTLCache(
+    sizeof=lambda cached: 200 + sum(120 + 2 * len(service) for service in cached[0]['services'])
+)
+_services_invalidations = LRUTTLCache(ttl=60)
+_services_epoch = itertools.count(1)
+
+metrics.Counter('services_cache_hits_total', 'Service lists served from the cache',
+                lambda: _services_cache.hits)
+metrics.Counter('services_cache_misses_total', 'Service lists that queried the database',
+                lambda: _services_cache.misses)
+metrics.Gauge('services_cache_bytes', 'Estimated size of cached service lists',
+              lambda: _services_cache.bytes)
+
+def invalidate_services(username: str):
+    _services_invalidations.set(username, next(_services_epoch))
+    _services_cache.pop(username)
+
+def services_epoch() -> int:
+    return next(_services_epoch)
+
+# rows: (service, version); generation читается до rows
+def cache_services(username: str, rows, epoch: int, generation: int):
+    rows = sorted(rows)
+    listing = {
+        'services': [service for service, _ in rows],
+        'versions': {service: version for service, version in rows}
+    }
+    # Флаг хранилища входит в ETag: после смены VAULT_ENABLED клиент не
+    # получит 304 со старым ответом
+    body = json.dumps({**listing, 'vault': vault_enabled()}, sort_keys=True).encode('utf-8')
+    cached = (listing, hashlib.sha256(body).hexdigest()[:32], generation)
+    if _services_invalidations.get(username, 0) < epoch:
+        _services_cache.set(username, cached)
+    return cached
+
+def get_cached_services(username: str):
+    generation = read_cache_generations(username)[0]
+    cached = _services_cache.get(username)
+    if cached is None or cached[2] != generation:
+        epoch = services_epoch()
+        cached = cache_services(username, get_user_services(username), epoch, generation)
+    listing, etag, _ = cached
+    return listing, etag
 
 @handle_db_errors
 def delete_service_password(username: str, service: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "DELETE FROM passwords WHERE username = %s AND service = %s",
-        (username, service)
-    )
-    conn.commit()
-    deleted = cur.rowcount > 0
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn, conn.cursor() as cur:
+        old_hash = queries.delete_service_password(cur, username, service)
+        commit_db(conn)
     
-    if deleted:
+    if old_hash:
+        on_commit(invalidate_services, username)
         app.logger.info(f"Password deleted for service {service} by user {username}")
     else:
         app.logger.warning(f"Password deletion failed - no record for {username} and {service}")
     
-    return deleted
+    return old_hash
+
+# Зашифрованное хранилище. Открытые data key пользователей лежат в памяти
+# процесса: ключ (username, sid) -> data key, время жизни VAULT_KEY_CACHE_TTL
+# от открытия, без продления. Вывод ключа из мастер-пароля (scrypt) - один
+# на сессию входа, а не на каждую запись. У каждого воркера свой кэш: если
+# ключа нет, клиент получает 423 и открывает хранилище через /vault/unlock
+_vault_keys = LRUTTLCache()
+
+VAULT_KEY_DERIVATIONS = metrics.Counter(
+    'vault_key_derivations_total', 'Master password key derivations (one per vault unlock)'
+)
+metrics.Counter('vault_key_cache_hits_total', 'Vault operations served by a cached data key',
+                lambda: _vault_keys.hits)
+metrics.Counter('vault_key_cache_misses_total', 'Vault operations that found the vault locked',
+                lambda: _vault_keys.misses)
+metrics.Gauge('vault_key_cache_size', 'Unlocked vault sessions', lambda: len(_vault_keys))
+
+def vault_enabled():
+    return app.config['VAULT_ENABLED'] and vault.AVAILABLE
+
+def current_vault_key(username: str, required: bool = True):
+    if not vault_enabled():
+        return None
+    data_key = _vault_keys.get((username, g.session_id))
+    if data_key is None and required:
+        raise APIError('Vault is locked', 423, {'locked': True})
+    return data_key
+
+def lock_vault(username: str, session_id: str):
+    _vault_keys.pop((username, session_id))
+
+# Открытие хранилища мастер-паролем. У пользователя без ключа (зарегистрирован
+# до появления хранилища) ключ создаётся; в кэш он попадает только после
+# фиксации, чтобы не шифровать записи ключом, который не сохранился
+@handle_db_errors
+def unlock_vault(username: str, session_id: str, password: str):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        row = queries.get_vault_key(cur, username)
+    if row is not None:
+        release_idle_db_connection()
+        VAULT_KEY_DERIVATIONS.inc()
+        data_key = vault.unwrap_user_key(username, password, vault.KeyRecord(*row))
+        _vault_keys.set((username, session_id), data_key)
+        return data_key
+
+    # Новый ключ создаётся только для пароля, который подтверждён bcrypt
+    user = get_user_by_name(username)
+    if not user or not check_password(user['password_hash'], password):
+        raise vault.InvalidMasterPassword('Master password does not match the account password')
+    VAULT_KEY_DERIVATIONS.inc()
+
+    record, data_key = vault.create_user_key(
+        username, password, app.config['VAULT_KDF_N'], app.config['VAULT_KDF_R'],
+        app.config['VAULT_KDF_P']
+    )
+    with get_db_connection() as conn, conn.cursor() as cur:
+        created = queries.insert_vault_key(cur, username, record)
+        commit_db(conn)
+    if not created:
+        # Ключ одновременно создал другой вход
+        return unlock_vault(username, session_id, password)
+    on_commit(_vault_keys.set, (username, session_id), data_key)
+    app.logger.info(f"Vault key created for user {username}")
+    return data_key
+
+@handle_db_errors
+def read_service_secrets(username: str, services=None):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        return queries.list_service_secrets(cur, username, services)
 
 # Функции работы с профилями
+# Кэш профилей: username -> (profile, etag, поколение), сбрасывается в
+# write_profile и при смене поколения профиля
+_profile_cache = LRUTTLCache()
+
+metrics.Counter('profile_cache_hits_total', 'Profile reads served from the cache',
+                lambda: _profile_cache.hits)
+metrics.Counter('profile_cache_misses_total', 'Profile reads that queried the database',
+                lambda: _profile_cache.misses)
+
 @handle_db_errors
-def read_profiles():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT username, email, avatar_url FROM profiles")
-    profiles = [{'username': row[0], 'email': row[1], 'avatarUrl': row[2]} 
-               for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return profiles
+def read_profile(username: str):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        row = queries.get_profile(cur, username)
+    if not row:
+        return None
+    return {'username': row[0], 'email': row[1], 'avatarUrl': row[2]}
+
+def cache_profile(username: str, profile, generation: int):
+    profile = profile or {
+        'username': username,
+        'email': None,
+        'avatarUrl': None
+    }
+    body = json.dumps(profile, sort_keys=True).encode('utf-8')
+    cached = (profile, hashlib.sha256(body).hexdigest()[:32], generation)
+    _profile_cache.set(username, cached)
+    return cached
+
+def get_cached_profile(username: str):
+    generation = read_cache_generations(username)[1]
+    cached = _profile_cache.get(username)
+    if cached is None or cached[2] != generation:
+        cached = cache_profile(username, read_profile(username), generation)
+    profile, etag, _ = cached
+    return profile, etag
 
 @handle_db_errors
 def write_profile(username: str, email: str, avatar_url: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """INSERT INTO profiles (username, email, avatar_url) 
-           VALUES (%s, %s, %s)
-           ON CONFLICT (username) 
-           DO UPDATE SET email = EXCLUDED.email, avatar_url = EXCLUDED.avatar_url""",
-        (username, email, avatar_url)
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn, conn.cursor() as cur:
+        queries.upsert_profile(cur, username, email, avatar_url)
+        commit_db(conn)
+    on_commit(_profile_cache.pop, username)
     app.logger.info(f"Profile updated for user {username}")
 
+# Постраничное чтение логов по курсору (created_at, id)
+USER_LOG_FIELDS = (
+    ('action', 'action_type'),
+    ('ip_address', 'ip_address'),
+    ('device', 'user_agent'),
+    ('status', 'status'),
+    ('details', 'details'),
+)
+
+PASSWORD_LOG_FIELDS = (
+    ('service', 'service'),
+    ('action', 'action_type'),
+    ('status', 'status'),
+    ('details', 'details'),
+)
+
+def encode_log_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_log_cursor(cursor):
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeError):
+        raise APIError('Invalid cursor', 400)
+
+def parse_log_time(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise APIError(f'Invalid {name} timestamp', 400)
+
+def parse_page_size():
+    try:
+        limit = int(request.args.get('limit', app.config['LOGS_PAGE_SIZE']))
+    except ValueError:
+        raise APIError('Invalid limit', 400)
+    if limit < 1:
+        raise APIError('Invalid limit', 400)
+    return min(limit, app.config['LOGS_MAX_PAGE_SIZE'])
+
+@handle_db_errors
+def read_log_page(table, fields, username, filters=()):
+    limit = parse_page_size()
+    conditions = [sql.SQL("username = %s")]
+    params = [username]
+
+    for column in filters:
+        value = request.args.get(column)
+        if value:
+            conditions.append(sql.SQL("{} = %s").format(sql.Identifier(column)))
+            params.append(value)
+
+    since = parse_log_time('since')
+    if since:
+        conditions.append(sql.SQL("created_at >= %s"))
+        params.append(since)
+    until = parse_log_time('until')
+    if until:
+        conditions.append(sql.SQL("created_at < %s"))
+        params.append(until)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        conditions.append(sql.SQL("(created_at, id) < (%s, %s)"))
+        params.extend(decode_log_cursor(cursor))
+
+    query = queries.log_page(table, [column for _, column in fields], conditions)
+    params.append(limit + 1)
+
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    keys = [key for key, _ in fields]
+    logs = [
+        {**dict(zip(keys, row)), 'timestamp': row[-2].isoformat() if row[-2] else None}
+        for row in rows
+    ]
+    next_cursor = encode_log_cursor(rows[-1][-2], rows[-1][-1]) if has_more else None
+    return {'logs': logs, 'next_cursor': next_cursor}
+
 # API Endpoints
 @app.route('/register', methods=['POST'])
 def register():
@@ -356,9 +1282,9 @@ def register():
 
         if len(password) < 8:
             raise APIError('Password must be at least 8 characters', 400)
+        check_password_breached(password)
 
-        users = read_users()
-        if any(user['username'] == username for user in users):
+        if user_exists(username):
             raise APIError('User already exists', 409)
 
         write_user(username, password)
@@ -390,18 +1316,34 @@ def login():
         if not username or not password:
             raise APIError('Username and password are required', 400)
 
-        users = read_users()
-        user = next((user for user in users if user['username'] == username), None)
+        limited = check_login_rate(username, request.remote_addr)
+        if limited:
+            log_user_action(username, 'LOGIN', 'RATE_LIMITED', f"Retry after {limited.retry_after}s")
+            raise limited
+
+        user = get_user_by_name(username)
         
         if not user:
+            if record_login_failure(username):
+                log_user_action(username, 'LOGIN', 'LOCKED', 'Too many failed attempts')
             log_user_action(username, 'LOGIN', 'FAILED', 'User not found')
             raise APIError('Invalid credentials', 401)
 
         if not check_password(user['password_hash'], password):
+            if record_login_failure(username):
+                log_user_action(username, 'LOGIN', 'LOCKED', 'Too many failed attempts')
             log_user_action(username, 'LOGIN', 'FAILED', 'Invalid password')
             raise APIError('Invalid credentials', 401)
 
-        tokens = generate_tokens(username)
+        record_login_success(username)
+        session_id = uuid.uuid4().hex
+        tokens = generate_tokens(username, session_id)
+        # Пароль входа - он же мастер-пароль хранилища: ключ открывается сразу
+        if vault_enabled():
+            try:
+                unlock_vault(username, session_id, password)
+            except vault.InvalidMasterPassword:
+                app.logger.error(f"Vault key of user {username} does not open with the login password")
         log_user_action(username, 'LOGIN', 'SUCCESS')
         
         return jsonify({
@@ -411,6 +1353,8 @@ def login():
             'refresh_token': tokens['refresh_token']
         }), 200
 
+    except TooManyRequests:
+        raise
     except APIError as e:
         log_user_action(data.get('username'), 'LOGIN', 'FAILED', e.message)
         raise e
@@ -423,6 +1367,8 @@ def login():
 @token_required
 def logout(current_user):
     try:
+        revoke_token(get_request_token())
+        lock_vault(current_user, g.session_id)
         log_user_action(current_user, 'LOGOUT', 'SUCCESS')
         return jsonify({
             'message': 'Logged out successfully', 
@@ -437,38 +1383,14 @@ def logout(current_user):
 @token_required
 def get_user_logs(current_user):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute(
-            """SELECT action_type, ip_address, user_agent, status, 
-                      details, created_at 
-               FROM user_logs 
-               WHERE username = %s 
-               ORDER BY created_at DESC 
-               LIMIT 100""",
-            (current_user,)
+        page = read_log_page(
+            'user_logs', USER_LOG_FIELDS, current_user,
+            filters=('action_type', 'status')
         )
-        
-        logs = []
-        for row in cur.fetchall():
-            logs.append({
-                'action': row[0],
-                'ip_address': row[1],
-                'device': row[2],
-                'status': row[3],
-                'details': row[4],
-                'timestamp': row[5].isoformat() if row[5] else None
-            })
-            
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'logs': logs,
-            'status': 'success'
-        }), 200
-        
+        return jsonify({**page, 'status': 'success'}), 200
+
+    except APIError as e:
+        raise e
     except Exception as e:
         app.logger.error(f"Failed to get logs: {str(e)}")
         log_user_action(current_user, 'GET_LOGS', 'FAILED', str(e))
@@ -489,11 +1411,10 @@ def refresh():
             data = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=['HS256'])
             username = data['username']
             
-            users = read_users()
-            if not any(user['username'] == username for user in users):
+            if not user_exists(username):
                 raise APIError('User not found', 404)
                 
-            tokens = generate_tokens(username)
+            tokens = generate_tokens(username, data.get('sid'))
             return jsonify({
                 'access_token': tokens['access_token'],
                 'refresh_token': tokens['refresh_token'],
@@ -523,26 +1444,13 @@ def save_password(current_user):
 
         if not service or not password:
             raise APIError('Service and password are required', 400)
+        check_password_breached(password)
+        check_password_strength(password, current_user, service)
 
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT password_hash FROM passwords WHERE username = %s AND service = %s",
-            (current_user, service)
-        )
-        existing_password = cur.fetchone()
-        cur.close()
-        conn.close()
-
-        password_hash = hash_password(password)
-        write_service_password(current_user, service, password_hash)
-
-        if existing_password:
-            action = 'UPDATE'
-            old_hash = existing_password[0]
-        else:
-            action = 'CREATE'
-            old_hash = None
+        data_key = current_vault_key(current_user)
+        secret = vault.encrypt_secret(data_key, current_user, service, password) if data_key else None
+        password_hash, old_hash, version = write_service_password(current_user, service, password, secret)
+        action = 'UPDATE' if old_hash else 'CREATE'
 
         log_password_action(
             username=current_user,
@@ -555,6 +1463,7 @@ def save_password(current_user):
         
         return jsonify({
             'message': 'Password saved securely',
+            'version': version,
             'status': 'success'
         }), 201
 
@@ -578,6 +1487,135 @@ def save_password(current_user):
         )
         raise APIError('Password save failed', 500)
 
+# Поля oldService/newService/newPassword - прежний формат PasswordManager.vue
+@app.route('/update_password', methods=['POST'])
+@token_required
+def update_password(current_user):
+    data = None
+    try:
+        data = request.get_json()
+        if not data:
+            raise APIError('No input data provided', 400)
+
+        service = data.get('service') or data.get('oldService')
+        new_service = data.get('new_service') or data.get('newService') or service
+        password = data.get('password') or data.get('newPassword')
+        version = data.get('version')
+
+        if not service:
+            raise APIError('Service is required', 400)
+        if isinstance(version, bool) or not isinstance(version, int):
+            raise APIError('Current version is required', 400)
+        if not password and new_service == service:
+            raise APIError('Nothing to update', 400)
+        if password:
+            check_password_breached(password)
+            check_password_strength(password, current_user, new_service)
+
+        # Ключ обязателен для нового пароля; для переименования - если запись зашифрована
+        data_key = current_vault_key(current_user, required=bool(password))
+        new_version, old_hash, new_hash = update_service_password(
+            current_user, service, version, new_service, password, data_key
+        )
+        details = f"Renamed from {service}" if new_service != service else None
+        log_password_action(
+            username=current_user,
+            service=new_service,
+            action_type='UPDATE',
+            old_password_hash=old_hash if new_hash != old_hash else None,
+            new_password_hash=new_hash if new_hash != old_hash else None,
+            status='SUCCESS',
+            details=details
+        )
+        return jsonify({
+            'message': 'Password updated',
+            'service': new_service,
+            'version': new_version,
+            'status': 'success'
+        }), 200
+
+    except APIError as e:
+        log_password_action(
+            username=current_user,
+            service=(data or {}).get('service') or (data or {}).get('oldService'),
+            action_type='UPDATE',
+            status='FAILED',
+            details=e.message
+        )
+        raise e
+    except Exception as e:
+        app.logger.error(f"Password update error: {str(e)}\n{traceback.format_exc()}")
+        log_password_action(
+            username=current_user,
+            service=(data or {}).get('service') or (data or {}).get('oldService'),
+            action_type='UPDATE',
+            status='FAILED',
+            details='Internal error'
+        )
+        raise APIError('Password update failed', 500)
+
+# Версии записи без самих хешей
+@app.route('/password_history', methods=['GET'])
+@token_required
+def password_history(current_user):
+    try:
+        service = request.args.get('service')
+        if not service:
+            raise APIError('Service is required', 400)
+        limit = parse_page_size()
+        version, rows = read_password_history(current_user, service, limit)
+        if version is None:
+            raise APIError('Password not found', 404)
+        return jsonify({
+            'service': service,
+            'version': version,
+            'history': [
+                {'version': row[0], 'replaced_at': row[1].isoformat()} for row in rows
+            ],
+            'status': 'success'
+        }), 200
+    except APIError as e:
+        raise e
+    except Exception as e:
+        app.logger.error(f"Password history error: {str(e)}\n{traceback.format_exc()}")
+        raise APIError('Failed to get password history', 500)
+
+# Пароли из CSPRNG по политике запроса, с оценкой стойкости каждого
+@app.route('/generate_password', methods=['POST'])
+@token_required
+def generate_password(current_user):
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            policy = generator.parse_policy(
+                data,
+                max_length=app.config['GENERATE_MAX_LENGTH'],
+                max_count=app.config['GENERATE_MAX_COUNT']
+            )
+        except generator.PolicyError as e:
+            raise APIError(str(e), 400)
+
+        passwords = []
+        for password, entropy in generator.generate(policy, _passphrase_words):
+            strength = _strength_estimator.estimate(password)
+            passwords.append({
+                'password': password,
+                'entropy': round(entropy, 1),
+                'score': strength.score
+            })
+        response = jsonify({
+            'passwords': passwords,
+            'policy': policy,
+            'status': 'success'
+        })
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    except APIError as e:
+        raise e
+    except Exception as e:
+        app.logger.error(f"Password generation error: {str(e)}\n{traceback.format_exc()}")
+        raise APIError('Password generation failed', 500)
+
 @app.route('/verify_password', methods=['POST'])
 @token_required
 def verify_password(current_user):
@@ -608,11 +1646,18 @@ def verify_password(current_user):
 @token_required
 def get_services(current_user):
     try:
-        services = get_user_services(current_user)
-        return jsonify({
-            'services': services,
-            'status': 'success'
-        }), 200
+        listing, etag = get_cached_services(current_user)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = jsonify({
+                **listing,
+                'vault': vault_enabled(),
+                'status': 'success'
+            })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except APIError as e:
         raise e
     except Exception as e:
@@ -631,48 +1676,22 @@ def delete_password(current_user):
         if not service:
             raise APIError('Service is required', 400)
 
-        # Получаем текущий пароль перед удалением
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT password_hash FROM passwords WHERE username = %s AND service = %s",
-            (current_user, service)
-        )
-        existing_password = cur.fetchone()
-        
-        if not existing_password:
-            log_password_action(
-                username=current_user,
-                service=service,
-                action_type='DELETE',
-                status='FAILED',
-                details='Password not found'
-            )
+        # Прежний хеш для журнала возвращает сам DELETE
+        existing_hash = delete_service_password(current_user, service)
+        if not existing_hash:
             raise APIError('Password not found', 404)
 
-        deleted = delete_service_password(current_user, service)
-        
-        if deleted:
-            log_password_action(
-                username=current_user,
-                service=service,
-                action_type='DELETE',
-                old_password_hash=existing_password[0],
-                status='SUCCESS'
-            )
-            return jsonify({
-                'message': 'Password deleted',
-                'status': 'success'
-            }), 200
-        else:
-            log_password_action(
-                username=current_user,
-                service=service,
-                action_type='DELETE',
-                status='FAILED',
-                details='Deletion failed'
-            )
-            raise APIError('Deletion failed', 500)
+        log_password_action(
+            username=current_user,
+            service=service,
+            action_type='DELETE',
+            old_password_hash=existing_hash,
+            status='SUCCESS'
+        )
+        return jsonify({
+            'message': 'Password deleted',
+            'status': 'success'
+        }), 200
 
     except APIError as e:
         log_password_action(
@@ -695,25 +1714,209 @@ def delete_password(current_user):
         raise APIError('Password deletion failed', 500)
 
 
+@app.route('/passwords/bulk', methods=['POST'])
+@token_required
+def bulk_import_passwords(current_user):
+    try:
+        data = request.get_json()
+        if not data:
+            raise APIError('No input data provided', 400)
+
+        items = data.get('entries')
+        if not isinstance(items, list) or not items:
+            raise APIError('Entries are required', 400)
+        if len(items) > app.config['BULK_MAX_ENTRIES']:
+            raise APIError(f"At most {app.config['BULK_MAX_ENTRIES']} entries per request", 413)
+
+        # Повторяющиеся сервисы схлопываются, побеждает последняя запись.
+        # Проверяются все записи, в ответе - полный список отклонённых
+        entries = {}
+        rejected = []
+        for index, item in enumerate(items):
+            service = item.get('service') if isinstance(item, dict) else None
+            password = item.get('password') if isinstance(item, dict) else None
+            if not isinstance(service, str) or not isinstance(password, str) or not service or not password:
+                rejected.append({
+                    'index': index,
+                    'service': service if isinstance(service, str) else None,
+                    'message': 'Each entry needs a service and a password'
+                })
+                continue
+            entries[service] = password
+
+        # Те же проверки, что в /save_password
+        for service, password in entries.items():
+            try:
+                check_password_breached(password)
+                check_password_strength(password, current_user, service)
+            except APIError as e:
+                rejected.append({**(e.payload or {}), 'service': service, 'message': e.message})
+        if rejected:
+            raise APIError(f"{len(rejected)} of {len(items)} entries were rejected", 400,
+                           {'rejected': rejected})
+
+        data_key = current_vault_key(current_user)
+        secrets = vault.encrypt_secrets(data_key, current_user, entries) if data_key else None
+        saved = write_service_passwords_bulk(current_user, entries, secrets)
+
+        ip_address = request.remote_addr
+        user_agent = request.headers.get('User-Agent', '')
+        get_audit_writer().submit_many('password_logs', [
+            (current_user, service, 'UPDATE' if old_hash else 'CREATE', old_hash,
+             new_hash, ip_address, user_agent, 'SUCCESS', 'Bulk import')
+            for service, new_hash, old_hash in saved
+        ])
+        log_user_action(current_user, 'BULK_IMPORT', 'SUCCESS', f"{len(saved)} entries")
+
+        return jsonify({
+            'message': 'Passwords saved securely',
+            'saved': len(saved),
+            'status': 'success'
+        }), 201
+
+    except APIError as e:
+        log_user_action(current_user, 'BULK_IMPORT', 'FAILED', e.message)
+        raise e
+    except Exception as e:
+        app.logger.error(f"Bulk import error: {str(e)}\n{traceback.format_exc()}")
+        log_user_action(current_user, 'BULK_IMPORT', 'FAILED', 'Internal error')
+        raise APIError('Bulk import failed', 500)
+
+# Пакетная расшифровка: один запрос к БД и один открытый ключ на все записи;
+# без списка services - все записи пользователя
+@app.route('/passwords/decrypt', methods=['POST'])
+@token_required
+def decrypt_passwords(current_user):
+    try:
+        if not vault_enabled():
+            raise APIError('Vault storage is not enabled', 404)
+        data = request.get_json(silent=True) or {}
+        services = data.get('services')
+        if services is not None:
+            if not isinstance(services, list) or not all(isinstance(name, str) and name for name in services):
+                raise APIError('Services must be a list of service names', 400)
+            if len(services) > app.config['BULK_MAX_ENTRIES']:
+                raise APIError(f"At most {app.config['BULK_MAX_ENTRIES']} services per request", 413)
+            services = list(dict.fromkeys(services))
+
+        data_key = current_vault_key(current_user)
+        found = {service: (version, secret) for service, version, secret in read_service_secrets(current_user, services)}
+        opened = dict(vault.decrypt_secrets(
+            data_key, current_user,
+            ((service, secret) for service, (_, secret) in found.items() if secret is not None)
+        ))
+        failed = sorted(service for service, password in opened.items() if password is None)
+        if failed:
+            app.logger.error(f"{len(failed)} vault entries of user {current_user} failed authentication")
+        passwords = [
+            {'service': service, 'version': found[service][0], 'password': password}
+            for service, password in sorted(opened.items()) if password is not None
+        ]
+        log_user_action(current_user, 'VAULT_DECRYPT', 'SUCCESS', f"{len(passwords)} entries")
+
+        response = jsonify({
+            'passwords': passwords,
+            'missing': sorted(set(services or ()) - found.keys()),
+            'not_encrypted': sorted(service for service, (_, secret) in found.items() if secret is None),
+            'failed': failed,
+            'status': 'success'
+        })
+        response.headers['Cache-Control'] = 'no-store'
+        return response, 200
+
+    except APIError as e:
+        log_user_action(current_user, 'VAULT_DECRYPT', 'FAILED', e.message)
+        raise e
+    except Exception as e:
+        app.logger.error(f"Vault decrypt error: {str(e)}\n{traceback.format_exc()}")
+        log_user_action(current_user, 'VAULT_DECRYPT', 'FAILED', 'Internal error')
+        raise APIError('Failed to decrypt passwords', 500)
+
+# Повторное открытие хранилища: ключ истёк из кэша или запрос попал в другой
+# воркер. Подбор мастер-пароля ограничен теми же лимитами, что и вход
+@app.route('/vault/unlock', methods=['POST'])
+@token_required
+def vault_unlock(current_user):
+    try:
+        if not vault_enabled():
+            raise APIError('Vault storage is not enabled', 404)
+        data = request.get_json()
+        if not data:
+            raise APIError('No input data provided', 400)
+        password = data.get('password')
+        if not password:
+            raise APIError('Master password is required', 400)
+
+        limited = check_login_rate(current_user, request.remote_addr)
+        if limited:
+            log_user_action(current_user, 'VAULT_UNLOCK', 'RATE_LIMITED', f"Retry after {limited.retry_after}s")
+            raise limited
+        try:
+            unlock_vault(current_user, g.session_id, password)
+        except vault.InvalidMasterPassword:
+            if record_login_failure(current_user):
+                log_user_action(current_user, 'VAULT_UNLOCK', 'LOCKED', 'Too many failed attempts')
+            raise APIError('Invalid master password', 403)
+        record_login_success(current_user)
+        log_user_action(current_user, 'VAULT_UNLOCK', 'SUCCESS')
+
+        return jsonify({
+            'message': 'Vault unlocked',
+            'expires_in': int(app.config['VAULT_KEY_CACHE_TTL']),
+            'status': 'success'
+        }), 200
+
+    except TooManyRequests:
+        raise
+    except APIError as e:
+        log_user_action(current_user, 'VAULT_UNLOCK', 'FAILED', e.message)
+        raise e
+    except Exception as e:
+        app.logger.error(f"Vault unlock error: {str(e)}\n{traceback.format_exc()}")
+        log_user_action(current_user, 'VAULT_UNLOCK', 'FAILED', 'Internal error')
+        raise APIError('Vault unlock failed', 500)
+
+@app.route('/vault/lock', methods=['POST'])
+@token_required
+def vault_lock(current_user):
+    lock_vault(current_user, g.session_id)
+    log_user_action(current_user, 'VAULT_LOCK', 'SUCCESS')
+    return jsonify({
+        'message': 'Vault locked',
+        'status': 'success'
+    }), 200
+
+@app.route('/passwords/bulk', methods=['GET'])
+@token_required
+def bulk_export_passwords(current_user):
+    def generate():
+        yield '{"entries": ['
+        try:
+            for i, (service, password_hash) in enumerate(iter_service_passwords(current_user)):
+                entry = json.dumps({'service': service, 'password_hash': password_hash})
+                yield entry if i == 0 else ',' + entry
+        except Exception as e:
+            # Заголовки уже отправлены, поэтому ошибка попадает в конец документа
+            app.logger.error(f"Bulk export error: {str(e)}\n{traceback.format_exc()}")
+            yield '], "status": "error", "message": "Export failed"}'
+            return
+        yield '], "status": "success"}'
+
+    log_user_action(current_user, 'BULK_EXPORT', 'SUCCESS')
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
 def log_password_action(username, service, action_type, old_password_hash=None, 
                       new_password_hash=None, status='SUCCESS', details=None):
     try:
         ip_address = request.remote_addr
         user_agent = request.headers.get('User-Agent', '')
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """INSERT INTO password_logs 
-               (username, service, action_type, old_password_hash, 
-                new_password_hash, ip_address, user_agent, status, details) 
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+        get_audit_writer().submit(
+            'password_logs',
             (username, service, action_type, old_password_hash, 
              new_password_hash, ip_address, user_agent, status, details)
         )
-        conn.commit()
-        cur.close()
-        conn.close()
     except Exception as e:
         app.logger.error(f"Failed to log password action: {str(e)}")
 
@@ -722,37 +1925,15 @@ def log_password_action(username, service, action_type, old_password_hash=None,
 @token_required
 def get_password_logs(current_user):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
         # Получаем логи только для текущего пользователя
-        cur.execute(
-            """SELECT service, action_type, created_at, status, details 
-               FROM password_logs 
-               WHERE username = %s 
-               ORDER BY created_at DESC 
-               LIMIT 100""",
-            (current_user,)
+        page = read_log_page(
+            'password_logs', PASSWORD_LOG_FIELDS, current_user,
+            filters=('action_type', 'status', 'service')
         )
-        
-        logs = []
-        for row in cur.fetchall():
-            logs.append({
-                'service': row[0],
-                'action': row[1],
-                'timestamp': row[2].isoformat() if row[2] else None,
-                'status': row[3],
-                'details': row[4]
-            })
-            
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'logs': logs,
-            'status': 'success'
-        }), 200
-        
+        return jsonify({**page, 'status': 'success'}), 200
+
+    except APIError as e:
+        raise e
     except Exception as e:
         app.logger.error(f"Failed to get password logs: {str(e)}")
         log_user_action(current_user, 'GET_PASSWORD_LOGS', 'FAILED', str(e))
@@ -762,20 +1943,18 @@ def get_password_logs(current_user):
 @token_required
 def get_profile(current_user):
     try:
-        profiles = read_profiles()
-        profile = next((p for p in profiles if p['username'] == current_user), None)
-        if profile:
-            return jsonify({
-                **profile,
-                'status': 'success'
-            }), 200
+        profile, etag = get_cached_profile(current_user)
+        if etag in request.if_none_match:
+            response = Response(status=304)
         else:
-            return jsonify({
-                'username': current_user,
-                'email': None,
-                'avatarUrl': None,
+            response = jsonify({
+                **profile,
                 'status': 'success'
-            }), 200
+            })
+        response.set_etag(etag)
+        # Браузер обязан перепроверять профиль через If-None-Match
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except APIError as e:
         raise e
     except Exception as e:
@@ -786,14 +1965,21 @@ def get_profile(current_user):
 @token_required
 def update_profile(current_user):
     try:
-        email = request.form.get('email')
-        avatar = request.files.get('avatar')
+        # request.form/files читают и буферизуют всё тело, в том числе без
+        # Content-Length (chunked): предел на этот запрос прерывает разбор
+        # формы, как только прочитано больше аватара с запасом на поля
+        request.max_content_length = app.config['AVATAR_MAX_BYTES'] + 64 * 1024
+        try:
+            email = request.form.get('email')
+            avatar = request.files.get('avatar')
+        except RequestEntityTooLarge:
+            raise APIError('Avatar is too large', 413)
 
         avatar_url = None
+        avatar_urls = None
         if avatar:
-            filename = secure_filename(f"{current_user}_{avatar.filename}")
-            avatar.save(os.path.join(UPLOAD_FOLDER, filename))
-            avatar_url = f"http://localhost:5000/uploads/{filename}"
+            avatar_urls = save_avatar(avatar)
+            avatar_url = avatar_urls[str(app.config['AVATAR_PROFILE_SIZE'])]
 
         write_profile(current_user, email, avatar_url)
         log_user_action(current_user, 'UPDATE_PROFILE', 'SUCCESS')
@@ -801,6 +1987,7 @@ def update_profile(current_user):
         return jsonify({
             'message': 'Profile updated',
             'avatarUrl': avatar_url,
+            'avatarUrls': avatar_urls,
             'status': 'success'
         }), 200
 
@@ -812,6 +1999,32 @@ def update_profile(current_user):
         log_user_action(current_user, 'UPDATE_PROFILE', 'FAILED', 'Internal error')
         raise APIError('Profile update failed', 500)
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def save_avatar(avatar):
+    try:
+        _, names = avatar_store.save(avatar.stream, secure_filename(avatar.filename or ''))
+    except AvatarTooLarge:
+        raise APIError('Avatar is too large', 413)
+    except InvalidAvatar as e:
+        raise APIError(str(e), 400)
+    return {
+        str(size): url_for('serve_avatar', filename=name, _external=True)
+        for size, name in names.items()
+    }
+
+@app.route('/avatars/<filename>')
+def serve_avatar(filename):
+    # Содержимое файла определяется его именем, поэтому кэшируется навсегда
+    response = send_from_directory(
+        AVATAR_FOLDER, filename,
+        max_age=app.config['AVATAR_CACHE_MAX_AGE'], conditional=True, etag=True
+    )
+    response.headers['Cache-Control'] = f"public, max-age={app.config['AVATAR_CACHE_MAX_AGE']}, immutable"
+    return response
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     try:
@@ -821,4 +2034,4 @@ def uploaded_file(filename):
         raise APIError('File not found', 404)
 
 if __name__ == '__main__':
-    app.run(port=5000)
\ No newline at end of file
+    create_app().run(port=5000)
\ No newline at end of file
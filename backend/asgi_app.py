@@ -0,0 +1,447 @@
+import asyncio
+import json
+import time
+import traceback
+from urllib.parse import parse_qs
+
+import jwt
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg нужен только для асинхронного режима
+    asyncpg = None
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+import app as backend
+import queries
+from app import APIError
+from hashing import HashingBusy
+
+app = backend.app
+
+DB_ERRORS = (asyncpg.PostgresError,) if asyncpg is not None else ()
+
+# С включённым хранилищем эти маршруты обслуживает Flask: вход открывает
+# ключ хранилища, обновление токена сохраняет сессию, а запись шифрует
+# пароль ключом из кэша процесса
+VAULT_ROUTES = {('POST', '/login'), ('POST', '/refresh'), ('POST', '/save_password')}
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {
+            key.decode('latin-1').lower(): value.decode('latin-1')
+            for key, value in scope.get('headers', [])
+        }
+        self.args = {
+            key: values[-1]
+            for key, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()
+        }
+        self.body = body
+
+    @property
+    def remote_addr(self):
+        client = self.scope.get('client')
+        return client[0] if client else None
+
+    @property
+    def user_agent(self):
+        return self.headers.get('user-agent', '')
+
+    def get_json(self):
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            raise APIError('Invalid JSON body', 400)
+
+
+class JSONResponse:
+    def __init__(self, payload, status=200, headers=None):
+        self.body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        self.status = status
+        self.headers = dict(headers or {})
+
+    async def send(self, send):
+        headers = [(b'access-control-allow-origin', b'*')]
+        if self.body:
+            headers.append((b'content-type', b'application/json'))
+        headers.extend((k.lower().encode('latin-1'), str(v).encode('latin-1'))
+                       for k, v in self.headers.items())
+        headers.append((b'content-length', str(len(self.body)).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+def audit_user(request, username, action_type, status, details=None):
+    backend.get_audit_writer().submit(
+        'user_logs',
+        (username, action_type, request.remote_addr, request.user_agent, status, details)
+    )
+
+
+def audit_password(request, username, service, action_type, old_password_hash=None,
+                   new_password_hash=None, status='SUCCESS', details=None):
+    backend.get_audit_writer().submit(
+        'password_logs',
+        (username, service, action_type, old_password_hash, new_password_hash,
+         request.remote_addr, request.user_agent, status, details)
+    )
+
+
+async def hash_password(password):
+    try:
+        return await backend.get_hashing_executor().hash_async(password, app.config['BCRYPT_ROUNDS'])
+    except HashingBusy:
+        raise APIError('Server is busy, try again later', 503)
+
+
+async def check_password(hashed_password, password):
+    try:
+        return await backend.get_hashing_executor().check_async(hashed_password, password)
+    except HashingBusy:
+        raise APIError('Server is busy, try again later', 503)
+
+
+def require_json(request):
+    data = request.get_json()
+    if not data:
+        raise APIError('No input data provided', 400)
+    return data
+
+
+async def current_user(request):
+    authorization = request.headers.get('authorization', '')
+    parts = authorization.split(' ')
+    if len(parts) < 2 or not parts[1]:
+        raise APIError('Token is missing', 401)
+    # Полная проверка ходит в БД за отзывами (psycopg2), поэтому вне цикла событий
+    claims = backend.cached_token_claims(parts[1])
+    if claims is None:
+        claims = await asyncio.get_running_loop().run_in_executor(
+            None, backend.verify_token, parts[1]
+        )
+    username = claims.get('username')
+    if not username:
+        raise APIError('Token is invalid', 401)
+    return username
+
+
+# Асинхронные обработчики самых нагруженных маршрутов. Контракты JSON
+# совпадают с Flask-версией в app.py, остальные маршруты обслуживает Flask
+class AsyncAPI:
+    def __init__(self):
+        self.pool = None
+        self.routes = {
+            ('POST', '/register'): self.register,
+            ('POST', '/login'): self.login,
+            ('POST', '/refresh'): self.refresh,
+            ('GET', '/get_services'): self.get_services,
+            ('POST', '/verify_password'): self.verify_password,
+            ('POST', '/save_password'): self.save_password,
+            ('POST', '/delete_password'): self.delete_password,
+            ('GET', '/get_profile'): self.get_profile,
+        }
+
+    async def startup(self):
+        if asyncpg is None:
+            raise RuntimeError('asyncpg is required for the ASGI serving mode')
+        backend.create_app()
+        # Миграции и индексы (version, password_history) те же, что в server.py;
+        # init_db синхронный, поэтому выполняется вне цикла событий
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, backend.init_db)
+        except Exception as e:
+            app.logger.warning(f"Deferred database initialization: {str(e)}")
+        config = backend.DATABASE_CONFIG
+        self.pool = await asyncpg.create_pool(
+            database=config['dbname'],
+            user=config['user'],
+            password=config['password'],
+            host=config['host'],
+            port=int(config['port']),
+            min_size=app.config['ASYNC_DB_POOL_MIN_SIZE'],
+            max_size=app.config['ASYNC_DB_POOL_MAX_SIZE'],
+        )
+
+    async def shutdown(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def register(self, request):
+        data = require_json(request)
+        username = data.get('username')
+        password = data.get('password')
+        try:
+            if not username or not password:
+                raise APIError('Username and password are required', 400)
+            if len(username) < 4:
+                raise APIError('Username must be at least 4 characters', 400)
+            if len(password) < 8:
+                raise APIError('Password must be at least 8 characters', 400)
+            backend.check_password_breached(password)
+
+            exists = await self.pool.fetchval(queries.USER_EXISTS.numbered, username)
+            if exists:
+                raise APIError('User already exists', 409)
+
+            password_hash = await hash_password(password)
+            try:
+                await self.pool.execute(queries.INSERT_USER.numbered, username, password_hash)
+            except asyncpg.UniqueViolationError:
+                raise APIError('Resource already exists', 409)
+        except APIError as e:
+            audit_user(request, username, 'REGISTER', 'FAILED', e.message)
+            raise
+
+        app.logger.info(f"New user created: {username}")
+        audit_user(request, username, 'REGISTER', 'SUCCESS')
+        return JSONResponse({'message': 'Registration successful', 'status': 'success'}, 201)
+
+    async def login(self, request):
+        data = require_json(request)
+        username = data.get('username')
+        password = data.get('password')
+        if not username or not password:
+            audit_user(request, username, 'LOGIN', 'FAILED', 'Username and password are required')
+            raise APIError('Username and password are required', 400)
+
+        limited = backend.check_login_rate(username, request.remote_addr)
+        if limited:
+            audit_user(request, username, 'LOGIN', 'RATE_LIMITED', f"Retry after {limited.retry_after}s")
+            raise limited
+
+        row = await self.pool.fetchrow(queries.GET_USER.numbered, username)
+        if not row:
+            if backend.record_login_failure(username):
+                audit_user(request, username, 'LOGIN', 'LOCKED', 'Too many failed attempts')
+            audit_user(request, username, 'LOGIN', 'FAILED', 'User not found')
+            raise APIError('Invalid credentials', 401)
+        if not await check_password(row['password_hash'], password):
+            if backend.record_login_failure(username):
+                audit_user(request, username, 'LOGIN', 'LOCKED', 'Too many failed attempts')
+            audit_user(request, username, 'LOGIN', 'FAILED', 'Invalid password')
+            raise APIError('Invalid credentials', 401)
+
+        backend.record_login_success(username)
+        tokens = backend.generate_tokens(username)
+        audit_user(request, username, 'LOGIN', 'SUCCESS')
+        return JSONResponse({
+            'message': 'Login successful',
+            'status': 'success',
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens['refresh_token']
+        })
+
+    async def refresh(self, request):
+        data = require_json(request)
+        refresh_token = data.get('refresh_token')
+        if not refresh_token:
+            raise APIError('Refresh token is required', 400)
+        try:
+            claims = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            raise APIError('Refresh token has expired', 401)
+        except jwt.InvalidTokenError:
+            raise APIError('Invalid refresh token', 401)
+
+        username = claims['username']
+        exists = await self.pool.fetchval(queries.USER_EXISTS.numbered, username)
+        if not exists:
+            raise APIError('User not found', 404)
+
+        tokens = backend.generate_tokens(username, claims.get('sid'))
+        return JSONResponse({
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens['refresh_token'],
+            'status': 'success'
+        })
+
+    # (services, profile), как app.read_cache_generations
+    async def cache_generations(self, username):
+        row = await self.pool.fetchrow(queries.GET_CACHE_GENERATIONS.numbered, username)
+        return tuple(row) if row else (0, 0)
+
+    async def get_services(self, request):
+        username = await current_user(request)
+        generation = (await self.cache_generations(username))[0]
+        cached = backend._services_cache.get(username)
+        if cached is None or cached[2] != generation:
+            epoch = backend.services_epoch()
+            rows = await self.pool.fetch(queries.LIST_SERVICES.numbered, username)
+            cached = backend.cache_services(username, [tuple(row) for row in rows], epoch, generation)
+
+        listing, etag, _ = cached
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if f'"{etag}"' in [tag.strip() for tag in if_none_match.split(',')]:
+            return JSONResponse(None, 304, headers)
+        return JSONResponse({**listing, 'vault': backend.vault_enabled(), 'status': 'success'},
+                            200, headers)
+
+    async def verify_password(self, request):
+        username = await current_user(request)
+        data = require_json(request)
+        service = data.get('service')
+        password = data.get('password')
+        if not service or not password:
+            raise APIError('Service and password are required', 400)
+
+        password_hash = await self.pool.fetchval(
+            queries.GET_SERVICE_PASSWORD.numbered, username, service
+        )
+        is_valid = bool(password_hash) and await check_password(password_hash, password)
+        return JSONResponse({'valid': is_valid, 'status': 'success'})
+
+    async def save_password(self, request):
+        username = await current_user(request)
+        data = require_json(request)
+        service = data.get('service')
+        password = data.get('password')
+        try:
+            if not service or not password:
+                raise APIError('Service and password are required', 400)
+            backend.check_password_breached(password)
+            backend.check_password_strength(password, username, service)
+
+            # Сюда попадают только записи без хранилища (см. VAULT_ROUTES):
+            # шифртекст прежнего пароля заменяется на NULL
+            if backend.vault_enabled():
+                raise APIError('Vault storage requires the WSGI handler', 503)
+            password_hash = await hash_password(password)
+            old_hash, version = await self.pool.fetchrow(
+                queries.UPSERT_SERVICE_PASSWORD.numbered,
+                *queries.upsert_service_password_params(username, service, password_hash)
+            )
+        except APIError as e:
+            audit_password(request, username, service, 'CREATE_OR_UPDATE',
+                           status='FAILED', details=e.message)
+            raise
+
+        backend.invalidate_services(username)
+        audit_password(request, username, service, 'UPDATE' if old_hash else 'CREATE',
+                       old_password_hash=old_hash, new_password_hash=password_hash)
+        return JSONResponse({'message': 'Password saved securely', 'version': version,
+                             'status': 'success'}, 201)
+
+    async def delete_password(self, request):
+        username = await current_user(request)
+        data = require_json(request)
+        service = data.get('service')
+        if not service:
+            raise APIError('Service is required', 400)
+
+        old_hash = await self.pool.fetchval(
+            queries.DELETE_SERVICE_PASSWORD.numbered,
+            *queries.delete_service_password_params(username, service)
+        )
+        if old_hash is None:
+            audit_password(request, username, service, 'DELETE',
+                           status='FAILED', details='Password not found')
+            raise APIError('Password not found', 404)
+
+        backend.invalidate_services(username)
+        audit_password(request, username, service, 'DELETE', old_password_hash=old_hash)
+        return JSONResponse({'message': 'Password deleted', 'status': 'success'})
+
+    async def get_profile(self, request):
+        username = await current_user(request)
+        generation = (await self.cache_generations(username))[1]
+        cached = backend._profile_cache.get(username)
+        if cached is None or cached[2] != generation:
+            row = await self.pool.fetchrow(queries.GET_PROFILE.numbered, username)
+            profile = None
+            if row:
+                profile = {'username': row['username'], 'email': row['email'],
+                           'avatarUrl': row['avatar_url']}
+            cached = backend.cache_profile(username, profile, generation)
+
+        profile, etag, _ = cached
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if f'"{etag}"' in [tag.strip() for tag in if_none_match.split(',')]:
+            return JSONResponse(None, 304, headers)
+        return JSONResponse({**profile, 'status': 'success'}, 200, headers)
+
+
+class ASGIApplication:
+    def __init__(self):
+        self.api = AsyncAPI()
+        self.fallback = WsgiToAsgi(app) if WsgiToAsgi is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        handler = None
+        if scope['type'] == 'http':
+            route = (scope['method'], scope['path'])
+            handler = self.api.routes.get(route)
+            if route in VAULT_ROUTES and backend.vault_enabled():
+                handler = None
+        if handler is None:
+            if self.fallback is None:
+                return await JSONResponse(
+                    {'message': 'Resource not found', 'status': 'error'}, 404
+                ).send(send)
+            return await self.fallback(scope, receive, send)
+
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        request = Request(scope, body)
+        route, method = scope['path'], scope['method']
+        started = time.perf_counter()
+        backend.HTTP_IN_FLIGHT.inc(route=route)
+        try:
+            response = await handler(request)
+        except APIError as e:
+            headers = {'Retry-After': e.retry_after} if isinstance(e, backend.TooManyRequests) else None
+            response = JSONResponse(e.to_dict(), e.status_code, headers)
+        except DB_ERRORS as e:
+            app.logger.error(f"Database error: {str(e)}\n{traceback.format_exc()}")
+            response = JSONResponse(
+                {'message': 'Database operation failed', 'status': 'error'}, 500
+            )
+        except Exception as e:
+            app.logger.error(f"Server error: {str(e)}\n{traceback.format_exc()}")
+            response = JSONResponse({'message': 'Internal server error', 'status': 'error'}, 500)
+        finally:
+            backend.HTTP_IN_FLIGHT.dec(route=route)
+        backend.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=method)
+        backend.HTTP_REQUESTS.inc(route=route, method=method, status=response.status)
+        await response.send(send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.api.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.api.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = ASGIApplication()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run('asgi_app:application', host='127.0.0.1', port=5000)
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import metrics
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+AUDIT_EVENTS = metrics.Counter('audit_events_total', 'Audit events accepted into the queue')
+AUDIT_DROPPED = metrics.Counter('audit_dropped_total', 'Audit events dropped because the queue was full')
+AUDIT_WRITTEN = metrics.Counter('audit_written_total', 'Audit events written to the database')
+AUDIT_FAILED = metrics.Counter('audit_failed_total', 'Audit events lost because a batch insert failed')
+AUDIT_FLUSH_SECONDS = metrics.Histogram('audit_flush_seconds', 'Time spent writing one audit batch')
+AUDIT_QUEUE_DEPTH = metrics.Gauge('audit_queue_depth', 'Audit events waiting to be written')
+
+
+# Фоновая запись аудита: события копятся в памяти и пишутся пачками,
+# когда набирается batch_size или проходит flush_interval секунд
+class AuditWriter:
+    def __init__(self, flush, batch_size=200, flush_interval=0.5, max_queue=10000,
+                 overflow='drop_oldest', block_timeout=0.05, logger=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self._flush = flush  # flush(table, rows)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name='audit-writer', daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, table, row):
+        if self._thread is None:
+            self.start()
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == 'drop_oldest':
+                    self._queue.popleft()
+                    AUDIT_DROPPED.inc(policy=self.overflow)
+                elif self.overflow == 'block':
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            AUDIT_DROPPED.inc(policy=self.overflow)
+                            return False
+                        self._cond.wait(remaining)
+                else:
+                    AUDIT_DROPPED.inc(policy=self.overflow)
+                    return False
+
+            self._queue.append((table, row))
+            AUDIT_EVENTS.inc()
+            AUDIT_QUEUE_DEPTH.set(len(self._queue))
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    # Набор событий одной операции ставится в очередь целиком
+    def submit_many(self, table, rows):
+        accepted = 0
+        for row in rows:
+            accepted += self.submit(table, row)
+        return accepted
+
+    # Остановка с дозаписью всего, что осталось в очереди
+    def stop(self, timeout=5.0):
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def pending(self):
+        return len(self._queue)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft()
+                         for _ in range(min(self.batch_size, len(self._queue)))]
+                stopping = self._stopping
+                AUDIT_QUEUE_DEPTH.set(len(self._queue))
+                # Освобождаем ждущих при политике block
+                self._cond.notify_all()
+
+            if batch:
+                self._write(batch)
+            if stopping and not self._queue:
+                return
+
+    def _write(self, batch):
+        by_table = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+
+        for table, rows in by_table.items():
+            started = time.perf_counter()
+            try:
+                self._flush(table, rows)
+                AUDIT_WRITTEN.inc(len(rows), table=table)
+            except Exception as e:
+                AUDIT_FAILED.inc(len(rows), table=table)
+                self.logger.error(f"Failed to write {len(rows)} audit events to {table}: {str(e)}")
+            finally:
+                AUDIT_FLUSH_SECONDS.observe(time.perf_counter() - started, table=table)
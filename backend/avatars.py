@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:  # Pillow необязателен: без него миниатюры не создаются
+    Image = None
+    UnidentifiedImageError = None
+
+THUMBNAIL_SIZES = (64, 128, 256)
+CHUNK_SIZE = 64 * 1024
+ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+
+
+class AvatarError(Exception):
+    pass
+
+
+class AvatarTooLarge(AvatarError):
+    pass
+
+
+class InvalidAvatar(AvatarError):
+    pass
+
+
+# Копирует поток в файл частями, не превышая max_bytes, и считает SHA-256
+def stream_to_file(stream, path, max_bytes, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, 'wb') as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                raise AvatarTooLarge(f'Avatar exceeds {max_bytes} bytes')
+            digest.update(chunk)
+            f.write(chunk)
+    if written == 0:
+        raise InvalidAvatar('Avatar file is empty')
+    return digest.hexdigest()
+
+
+def thumbnail_name(digest, size):
+    return f"{digest}_{size}.webp"
+
+
+# Хранилище аватаров с адресацией по содержимому: одинаковые файлы
+# сохраняются один раз, имена файлов никогда не меняют содержимое
+class AvatarStore:
+    def __init__(self, folder, max_bytes=2 * 1024 * 1024, sizes=THUMBNAIL_SIZES,
+                 max_pixels=40_000_000):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.sizes = tuple(sorted(sizes))
+        self.max_pixels = max_pixels
+
+    def save(self, stream, filename=''):
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix='.upload-')
+        os.close(fd)
+        try:
+            digest = stream_to_file(stream, tmp_path, self.max_bytes)
+            if Image is None:
+                return self._store_original(tmp_path, digest, filename)
+
+            names = {size: thumbnail_name(digest, size) for size in self.sizes}
+            if all(os.path.exists(os.path.join(self.folder, name)) for name in names.values()):
+                return digest, names
+            self._write_thumbnails(tmp_path, names)
+            return digest, names
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _write_thumbnails(self, source, names):
+        try:
+            with Image.open(source) as opened:
+                if opened.width * opened.height > self.max_pixels:
+                    raise InvalidAvatar('Avatar dimensions are too large')
+                image = opened.convert('RGBA')
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise InvalidAvatar('Avatar is not a valid image')
+
+        for size, name in names.items():
+            thumb = image.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            self._atomic_write(name, lambda f: thumb.save(f, 'WEBP', quality=85))
+
+    def _store_original(self, source, digest, filename):
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            raise InvalidAvatar('Unsupported avatar format')
+        name = f"{digest}{ext}"
+        path = os.path.join(self.folder, name)
+        if not os.path.exists(path):
+            os.replace(source, path)
+        return digest, {size: name for size in self.sizes}
+
+    def _atomic_write(self, name, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix='.thumb-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(self.folder, name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
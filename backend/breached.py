@@ -0,0 +1,226 @@
+import argparse
+import getpass
+import gzip
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+# Формат индекса: заголовок, таблица смещений по первым двум байтам SHA-1
+# (65537 чисел uint64 - номер первой записи корзины) и отсортированные
+# записи фиксированной длины - следующие suffix_bytes байт хеша.
+# Файл отображается в память, поэтому RSS процесса не растёт вместе с
+# размером списка: страницы держит и вытесняет кэш ОС, общий для воркеров
+MAGIC = b'OPBREACH'
+VERSION = 1
+HEADER = struct.Struct('<8sHHQ')
+PREFIX_BYTES = 2
+BUCKETS = 1 << (8 * PREFIX_BYTES)
+OFFSETS = struct.Struct(f'<{BUCKETS + 1}Q')
+DEFAULT_SUFFIX_BYTES = 8
+DEFAULT_CHUNK_SIZE = 5_000_000
+
+
+class IndexFormatError(ValueError):
+    pass
+
+
+def sha1(password: str) -> bytes:
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+
+class BreachedIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mm) < HEADER.size + OFFSETS.size:
+                raise IndexFormatError(f"{path} is too short to be a breached password index")
+            magic, version, self.suffix_bytes, self.count = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise IndexFormatError(f"{path} is not a breached password index")
+            self._records = HEADER.size + OFFSETS.size
+            if len(self._mm) != self._records + self.count * self.suffix_bytes:
+                raise IndexFormatError(f"{path} is truncated")
+        except Exception:
+            self._mm.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def _bucket(self, prefix):
+        position = HEADER.size + prefix * 8
+        return struct.unpack_from('<2Q', self._mm, position)
+
+    # Двоичный поиск внутри корзины: в среднем count / 65536 записей,
+    # то есть около 13 сравнений на 500 млн хешей
+    def contains_digest(self, digest: bytes) -> bool:
+        lo, hi = self._bucket(int.from_bytes(digest[:PREFIX_BYTES], 'big'))
+        size = self.suffix_bytes
+        key = digest[PREFIX_BYTES:PREFIX_BYTES + size]
+        mm, base = self._mm, self._records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * size
+            record = mm[start:start + size]
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(sha1(password))
+
+    def close(self):
+        self._mm.close()
+
+
+def _open_text(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='ascii', errors='replace')
+    return open(path, encoding='ascii', errors='replace')
+
+
+# Строки вида "SHA1HEX" или "SHA1HEX:COUNT" (формат выгрузок Pwned Passwords)
+def _parse_digests(lines, stats):
+    for line in lines:
+        value = line.split(':', 1)[0].strip()
+        if len(value) != 40:
+            if value:
+                stats['skipped'] += 1
+            continue
+        try:
+            digest = bytes.fromhex(value)
+        except ValueError:
+            stats['skipped'] += 1
+            continue
+        stats['read'] += 1
+        yield digest
+
+
+def _write_run(records, directory):
+    records.sort()
+    run = tempfile.TemporaryFile(dir=directory)
+    run.write(b''.join(records))
+    run.seek(0)
+    return run
+
+
+def _read_run(run, size):
+    while True:
+        record = run.read(size)
+        if len(record) < size:
+            return
+        yield record
+
+
+# Внешняя сортировка: пачки по chunk_size записей сортируются в памяти и
+# пишутся во временные файлы, затем сливаются heapq.merge с удалением
+# повторов. Память ограничена размером одной пачки
+def build_index(inputs, output, suffix_bytes=DEFAULT_SUFFIX_BYTES, chunk_size=DEFAULT_CHUNK_SIZE,
+                tmp_dir=None):
+    if not 1 <= suffix_bytes <= 20 - PREFIX_BYTES:
+        raise ValueError(f"suffix_bytes must be between 1 and {20 - PREFIX_BYTES}")
+    record_size = PREFIX_BYTES + suffix_bytes
+    stats = {'read': 0, 'skipped': 0, 'count': 0}
+    runs, chunk = [], []
+    tmp_dir = tmp_dir or os.path.dirname(os.path.abspath(output))
+    try:
+        for path in inputs:
+            with _open_text(path) as lines:
+                for digest in _parse_digests(lines, stats):
+                    chunk.append(digest[:record_size])
+                    if len(chunk) >= chunk_size:
+                        runs.append(_write_run(chunk, tmp_dir))
+                        chunk = []
+        if chunk:
+            runs.append(_write_run(chunk, tmp_dir))
+            chunk = []
+
+        counts = [0] * BUCKETS
+        tmp_output = output + '.tmp'
+        with open(tmp_output, 'wb') as out:
+            out.write(b'\0' * (HEADER.size + OFFSETS.size))
+            previous = None
+            buffer = []
+            for record in heapq.merge(*(_read_run(run, record_size) for run in runs)):
+                if record == previous:
+                    continue
+                previous = record
+                counts[int.from_bytes(record[:PREFIX_BYTES], 'big')] += 1
+                buffer.append(record[PREFIX_BYTES:])
+                if len(buffer) >= 65536:
+                    out.write(b''.join(buffer))
+                    buffer = []
+            out.write(b''.join(buffer))
+
+            offsets = [0] * (BUCKETS + 1)
+            for prefix, count in enumerate(counts):
+                offsets[prefix + 1] = offsets[prefix] + count
+            stats['count'] = offsets[-1]
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, VERSION, suffix_bytes, stats['count']))
+            out.write(OFFSETS.pack(*offsets))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_output, output)
+    finally:
+        for run in runs:
+            run.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the offline breached password index')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build an index from SHA-1 hash lists')
+    build.add_argument('inputs', nargs='+', help="files with SHA1[:COUNT] lines, .gz allowed, '-' for stdin")
+    build.add_argument('--output', required=True)
+    build.add_argument('--suffix-bytes', type=int, default=DEFAULT_SUFFIX_BYTES,
+                       help='hash bytes stored per entry after the 2-byte prefix')
+    build.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                       help='hashes sorted in memory at once')
+    build.add_argument('--tmp-dir', help='directory for sorted runs (default: next to the output)')
+    check = commands.add_parser('check', help='check passwords read from stdin, one per line')
+    check.add_argument('--index', required=True)
+    info = commands.add_parser('info', help='show index statistics')
+    info.add_argument('--index', required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        stats = build_index(args.inputs, args.output, args.suffix_bytes, args.chunk_size, args.tmp_dir)
+        print(f"Read {stats['read']} hashes, skipped {stats['skipped']} lines, "
+              f"wrote {stats['count']} unique entries to {args.output}")
+        return 0
+
+    index = BreachedIndex(args.index)
+    try:
+        if args.command == 'info':
+            size = os.path.getsize(args.index)
+            print(f"{args.index}: {len(index)} entries, {PREFIX_BYTES + index.suffix_bytes}-byte "
+                  f"hash prefixes, {size / 1024 / 1024:.1f} MiB")
+            return 0
+        breached = False
+        passwords = sys.stdin if not sys.stdin.isatty() else [getpass.getpass('Password: ')]
+        for line in passwords:
+            password = line.rstrip('\n')
+            found = password in index
+            breached = breached or found
+            print('breached' if found else 'not found')
+        return 1 if breached else 0
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Потокобезопасный LRU-кэш с временем жизни записей. Если задан max_bytes,
+# размер записей (оценка sizeof(value)) ограничен и по сумме.
+# evict_unexpired=False - для записей, которые нельзя терять до истечения
+# (отзывы токенов): при переполнении удаляются только истёкшие, и maxsize
+# может быть превышен
+class LRUTTLCache:
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic, max_bytes=None, sizeof=None,
+                 evict_unexpired=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_unexpired = evict_unexpired
+        self._sizeof = sizeof or (lambda value: 0)
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at, size = item
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.bytes -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.pop(key)
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._data[key] = (value, self._clock() + ttl, size)
+            self.bytes += size
+            if not self.evict_unexpired:
+                if len(self._data) > self.maxsize:
+                    self._purge_expired()
+                return
+            while len(self._data) > self.maxsize or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def _purge_expired(self):
+        now = self._clock()
+        for key in [key for key, (_, expires_at, _) in self._data.items() if expires_at <= now]:
+            self.bytes -= self._data.pop(key)[2]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self.bytes -= item[2]
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
@@ -0,0 +1,213 @@
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2.extensions
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+# Пул соединений с PostgreSQL: ограниченный размер, проверка
+# "протухших" соединений и таймаут ожидания свободного соединения
+class ConnectionPool:
+    def __init__(self, connect, min_size=1, max_size=10, acquire_timeout=5.0,
+                 max_idle=30.0, track_checkouts=False):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size bounds')
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle = max_idle
+        self.track_checkouts = track_checkouts
+
+        self._idle = deque()  # (conn, время возврата в пул)
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._checkouts = {}
+
+        self.acquired_total = 0
+        self.timeouts_total = 0
+        self.discarded_total = 0
+        self.wait_seconds_total = 0.0
+
+        for _ in range(min_size):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic()))
+
+    # Получение соединения из пула
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        conn = None
+        last_used = None
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolError('Connection pool is closed')
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts_total += 1
+                        raise PoolTimeout(
+                            f'Timed out after {self.acquire_timeout}s waiting for a connection'
+                        )
+                    self._cond.wait(remaining)
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+
+        try:
+            if conn is not None and not self._is_alive(conn, last_used):
+                self._close_quietly(conn)
+                with self._cond:
+                    self.discarded_total += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.acquired_total += 1
+            self.wait_seconds_total += time.monotonic() - started
+            if self.track_checkouts:
+                self._checkouts[id(conn)] = (
+                    threading.get_ident(), time.monotonic(), traceback.format_stack()[:-1]
+                )
+        return conn
+
+    # Возврат соединения в пул
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            status = conn.get_transaction_status()
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            self._checkouts.pop(id(conn), None)
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self.discarded_total += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    # Контекстный менеджер: в пределах одного потока вложенные вызовы
+    # получают то же самое соединение
+    @contextmanager
+    def connection(self):
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn = self.getconn()
+        local.conn = conn
+        local.depth = 1
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+            raise
+        finally:
+            local.conn = None
+            local.depth = 0
+            self.putconn(conn, discard=discard)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    # Выданные и ещё не возвращённые соединения (при track_checkouts):
+    # id соединения -> (поток, секунд на руках, стек вызова getconn)
+    def checkouts(self, thread=None):
+        now = time.monotonic()
+        with self._cond:
+            return {
+                key: (owner, now - since, stack)
+                for key, (owner, since, stack) in self._checkouts.items()
+                if thread is None or owner == thread
+            }
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'acquired_total': self.acquired_total,
+                'timeouts_total': self.timeouts_total,
+                'discarded_total': self.discarded_total,
+                'wait_seconds_total': self.wait_seconds_total,
+            }
+
+    # Соединение, простоявшее дольше max_idle, проверяется запросом SELECT 1
+    def _is_alive(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.max_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
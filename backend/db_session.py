@@ -0,0 +1,68 @@
+import threading
+
+
+# Сессия БД на время одного запроса. Соединение берётся из пула при первом
+# обращении и возвращается один раз в close(); все функции, вызванные в
+# запросе, работают в одной транзакции. Запись фиксируется целиком в
+# commit() или отменяется в rollback()/close()
+class DBSession:
+    def __init__(self, get_pool):
+        self._get_pool = get_pool
+        self._pool = None
+        self._conn = None
+        self._after_commit = []
+        self.dirty = False
+        self.acquired = 0
+        self.thread = threading.get_ident()
+
+    @property
+    def active(self):
+        return self._conn is not None
+
+    def connection(self):
+        if self._conn is None:
+            self._pool = self._get_pool()
+            self._conn = self._pool.getconn()
+            self.acquired += 1
+        return self._conn
+
+    # Запрос что-то записал: без этого отметки commit() ничего не фиксирует
+    def mark_dirty(self):
+        self.dirty = True
+
+    # Действия, которые нельзя выполнять до фиксации (сброс кэшей): иначе
+    # параллельный запрос успеет закэшировать ещё не зафиксированное состояние
+    def after_commit(self, callback, *args):
+        self._after_commit.append((callback, args))
+
+    def commit(self):
+        if self._conn is not None and self.dirty:
+            self._conn.commit()
+        self.dirty = False
+        callbacks, self._after_commit = self._after_commit, []
+        for callback, args in callbacks:
+            callback(*args)
+
+    def rollback(self):
+        self.dirty = False
+        self._after_commit = []
+        if self._conn is not None and not self._conn.closed:
+            self._conn.rollback()
+
+    # Соединение без незафиксированной записи можно отдать обратно в пул,
+    # например перед bcrypt: следующий запрос к БД возьмёт его снова
+    def release_if_clean(self):
+        if self._conn is not None and not self.dirty:
+            self._release()
+
+    # Откат всего незафиксированного и возврат соединения; безопасно
+    # вызывать повторно и после ошибок
+    def close(self):
+        self.dirty = False
+        self._after_commit = []
+        if self._conn is not None:
+            self._release()
+
+    def _release(self):
+        conn, self._conn = self._conn, None
+        self._pool.putconn(conn)
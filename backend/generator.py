@@ -0,0 +1,120 @@
+import math
+import secrets
+import string
+
+import wordlists
+
+CLASSES = {
+    'lower': string.ascii_lowercase,
+    'upper': string.ascii_uppercase,
+    'digits': string.digits,
+    'symbols': '!@#$%^&*()-_=+[]{};:,.?/',
+}
+AMBIGUOUS = set('Il1O0o|')
+CONSONANTS = 'bcdfghjklmnprstvwxz'
+VOWELS = 'aeiou'
+MODES = ('random', 'pronounceable', 'passphrase')
+
+_random = secrets.SystemRandom()
+
+
+class PolicyError(ValueError):
+    pass
+
+
+# Политика генерации из JSON запроса; limits - верхние границы из конфигурации
+def parse_policy(data, max_length=128, max_words=12, max_count=100):
+    mode = data.get('mode', 'random')
+    if mode not in MODES:
+        raise PolicyError(f"mode must be one of: {', '.join(MODES)}")
+    classes = data.get('classes', list(CLASSES))
+    if (not isinstance(classes, list) or not classes
+            or any(name not in CLASSES for name in classes)):
+        raise PolicyError(f"classes must be a non-empty list of: {', '.join(CLASSES)}")
+    separator = data.get('separator', '-')
+    if not isinstance(separator, str) or len(separator) > 3:
+        raise PolicyError('separator must be a string of at most 3 characters')
+    policy = {
+        'mode': mode,
+        'length': _bounded(data, 'length', 16, 8, max_length),
+        'words': _bounded(data, 'words', 5, 3, max_words),
+        'count': _bounded(data, 'count', 1, 1, max_count),
+        'classes': list(dict.fromkeys(classes)),
+        'exclude_ambiguous': bool(data.get('exclude_ambiguous', False)),
+        'separator': separator,
+        'capitalize': bool(data.get('capitalize', False)),
+    }
+    if mode == 'random' and policy['length'] < len(policy['classes']):
+        raise PolicyError('length is shorter than the number of required classes')
+    if mode == 'pronounceable' and not {'lower', 'upper'} & set(policy['classes']):
+        raise PolicyError('pronounceable mode needs the lower or upper class')
+    return policy
+
+
+def _bounded(data, key, default, low, high):
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise PolicyError(f"{key} must be an integer between {low} and {high}")
+    return value
+
+
+def _alphabet(chars, exclude_ambiguous):
+    if exclude_ambiguous:
+        return ''.join(char for char in chars if char not in AMBIGUOUS)
+    return chars
+
+
+# По символу каждого обязательного класса, остальное из объединения
+# классов, затем перемешивание. Энтропия оценивается по объединению
+def random_password(length, classes, exclude_ambiguous=False):
+    alphabets = [_alphabet(CLASSES[name], exclude_ambiguous) for name in classes]
+    pool = ''.join(alphabets)
+    chars = [_random.choice(alphabet) for alphabet in alphabets]
+    chars += [_random.choice(pool) for _ in range(length - len(chars))]
+    _random.shuffle(chars)
+    return ''.join(chars), length * math.log2(len(pool))
+
+
+# Чередование согласных и гласных; регистр букв, цифры и символ в конце - по
+# классам. Без lower все буквы заглавные
+def pronounceable_password(length, classes, exclude_ambiguous=False):
+    consonants = _alphabet(CONSONANTS, exclude_ambiguous)
+    vowels = _alphabet(VOWELS, exclude_ambiguous)
+    tail = []
+    if 'digits' in classes:
+        tail += [_alphabet(CLASSES['digits'], exclude_ambiguous)] * min(2, length // 4)
+    if 'symbols' in classes:
+        tail.append(_alphabet(CLASSES['symbols'], exclude_ambiguous))
+    mixed_case = 'upper' in classes and 'lower' in classes
+    chars, entropy = [], 0.0
+    for i in range(length - len(tail)):
+        alphabet = consonants if i % 2 == 0 else vowels
+        char = _random.choice(alphabet)
+        entropy += math.log2(len(alphabet))
+        if 'lower' not in classes or mixed_case and _random.random() < 0.5:
+            char = char.upper()
+        chars.append(char)
+    if mixed_case:
+        entropy += length - len(tail)
+    chars += [_random.choice(alphabet) for alphabet in tail]
+    entropy += sum(math.log2(len(alphabet)) for alphabet in tail)
+    return ''.join(chars), entropy
+
+
+def passphrase(words, separator='-', capitalize=False, word_list=wordlists.WORDS):
+    chosen = [_random.choice(word_list) for _ in range(words)]
+    if capitalize:
+        chosen = [word.capitalize() for word in chosen]
+    return separator.join(chosen), words * math.log2(len(word_list))
+
+
+def generate(policy, word_list=wordlists.WORDS):
+    mode = policy['mode']
+    for _ in range(policy['count']):
+        if mode == 'passphrase':
+            yield passphrase(policy['words'], policy['separator'], policy['capitalize'], word_list)
+        elif mode == 'pronounceable':
+            yield pronounceable_password(policy['length'], policy['classes'],
+                                         policy['exclude_ambiguous'])
+        else:
+            yield random_password(policy['length'], policy['classes'], policy['exclude_ambiguous'])
@@ -0,0 +1,200 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+import metrics
+
+
+class HashingBusy(Exception):
+    pass
+
+
+BCRYPT_SECONDS = metrics.Histogram(
+    'bcrypt_seconds', 'Time spent computing bcrypt in the hashing executor'
+)
+BCRYPT_WAIT_SECONDS = metrics.Histogram(
+    'bcrypt_queue_wait_seconds', 'Time bcrypt jobs spent queued before and after computation'
+)
+BCRYPT_REJECTED = metrics.Counter(
+    'bcrypt_rejected_total', 'bcrypt jobs rejected because the hashing queue was full'
+)
+BCRYPT_TIMEOUTS = metrics.Counter(
+    'bcrypt_timeouts_total', 'bcrypt jobs whose result was not ready within the result timeout'
+)
+
+
+# Функции выполняются в дочерних процессах, поэтому объявлены на уровне модуля
+def _bcrypt_hash(password: bytes, rounds: int):
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+    return hashed.decode('utf-8'), time.perf_counter() - started
+
+
+def _bcrypt_hash_many(passwords, rounds: int):
+    started = time.perf_counter()
+    hashed = [bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+              for password in passwords]
+    return hashed, time.perf_counter() - started
+
+
+def _bcrypt_check(password: bytes, hashed: bytes):
+    started = time.perf_counter()
+    ok = bcrypt.checkpw(password, hashed)
+    return ok, time.perf_counter() - started
+
+
+# Пул для bcrypt: ограниченная очередь, при переполнении или истечении
+# result_timeout - HashingBusy.
+# Пакетное хеширование занимает не больше bulk_workers воркеров одновременно
+# и отправляется небольшими пачками по bulk_batch паролей: интерактивные
+# hash/check встают в очередь между пачками, а не за всем импортом
+class HashingExecutor:
+    def __init__(self, workers=None, max_queue=None, queue_timeout=0.1,
+                 result_timeout=30.0, kind='process', bulk_workers=None, bulk_batch=4):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 4 if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout
+        self.result_timeout = result_timeout
+        self.kind = kind
+        self.bulk_workers = bulk_workers or max(1, self.workers // 2)
+        self.bulk_batch = max(1, bulk_batch)
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == 'thread':
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix='bcrypt'
+                        )
+                    else:
+                        # fork небезопасен при работающих потоках (аудит, логи,
+                        # запросы): дочерние процессы порождает forkserver, в
+                        # котором заранее импортирован только этот модуль
+                        methods = multiprocessing.get_all_start_methods()
+                        if 'forkserver' in methods:
+                            context = multiprocessing.get_context('forkserver')
+                            context.set_forkserver_preload([__name__])
+                        else:
+                            context = multiprocessing.get_context('spawn')
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=context
+                        )
+        return self._executor
+
+    def _submit(self, op, fn, *args, wait=True):
+        acquired = (self._slots.acquire(timeout=self.queue_timeout) if wait
+                    else self._slots.acquire(blocking=False))
+        if not acquired:
+            BCRYPT_REJECTED.inc(op=op)
+            raise HashingBusy('Hashing queue is full')
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @staticmethod
+    def _observe(op, started, elapsed):
+        BCRYPT_SECONDS.observe(elapsed, op=op)
+        BCRYPT_WAIT_SECONDS.observe(max(0.0, time.perf_counter() - started - elapsed), op=op)
+
+    def _result(self, op, future, started, timeout):
+        try:
+            result, elapsed = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            BCRYPT_TIMEOUTS.inc(op=op)
+            raise HashingBusy('Hashing result timed out')
+        self._observe(op, started, elapsed)
+        return result
+
+    def _run(self, op, fn, *args):
+        started = time.perf_counter()
+        future = self._submit(op, fn, *args)
+        return self._result(op, future, started, self.result_timeout)
+
+    def hash(self, password: str, rounds: int = 12) -> str:
+        return self._run('hash', _bcrypt_hash, password.encode('utf-8'), rounds)
+
+    # Следующая пачка отправляется, только когда освободился один из
+    # bulk_workers слотов, поэтому в очереди пула перед интерактивным
+    # запросом не больше bulk_workers пачек
+    def _submit_bulk(self, chunk, rounds):
+        if not self._bulk_slots.acquire(timeout=self.result_timeout):
+            BCRYPT_REJECTED.inc(op='hash_many')
+            raise HashingBusy('Bulk hashing slots are busy')
+        try:
+            future = self._submit('hash_many', _bcrypt_hash_many, chunk, rounds)
+        except Exception:
+            self._bulk_slots.release()
+            raise
+        future.add_done_callback(lambda _: self._bulk_slots.release())
+        return future
+
+    def hash_many(self, passwords, rounds: int = 12):
+        if not passwords:
+            return []
+        chunks = [
+            [password.encode('utf-8') for password in passwords[i:i + self.bulk_batch]]
+            for i in range(0, len(passwords), self.bulk_batch)
+        ]
+        futures = []
+        hashed = []
+        try:
+            for chunk in chunks:
+                futures.append((time.perf_counter(), self._submit_bulk(chunk, rounds)))
+            for started, future in futures:
+                hashed.extend(self._result('hash_many', future, started, self.result_timeout))
+        except HashingBusy:
+            for _, future in futures:
+                future.cancel()
+            raise
+        return hashed
+
+    def check(self, hashed_password: str, password: str) -> bool:
+        return self._run(
+            'check', _bcrypt_check,
+            password.encode('utf-8'), hashed_password.encode('utf-8')
+        )
+
+    # Варианты для asyncio: слот очереди берётся без ожидания,
+    # чтобы не блокировать цикл событий
+    async def _run_async(self, op, fn, *args):
+        started = time.perf_counter()
+        future = self._submit(op, fn, *args, wait=False)
+        try:
+            result, elapsed = await asyncio.wait_for(asyncio.wrap_future(future), self.result_timeout)
+        except asyncio.TimeoutError:
+            BCRYPT_TIMEOUTS.inc(op=op)
+            raise HashingBusy('Hashing result timed out')
+        self._observe(op, started, elapsed)
+        return result
+
+    async def hash_async(self, password: str, rounds: int = 12) -> str:
+        return await self._run_async('hash', _bcrypt_hash, password.encode('utf-8'), rounds)
+
+    async def check_async(self, hashed_password: str, password: str) -> bool:
+        return await self._run_async(
+            'check', _bcrypt_check,
+            password.encode('utf-8'), hashed_password.encode('utf-8')
+        )
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
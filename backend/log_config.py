@@ -0,0 +1,142 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+
+# Добавляет к записи данные текущего запроса. Выполняется в потоке запроса,
+# до того как запись попадёт в очередь
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.route = request.url_rule.rule if request.url_rule else request.path
+            record.method = request.method
+            started = getattr(g, 'request_started', None)
+            if started is not None and not hasattr(record, 'latency_ms'):
+                record.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        return True
+
+
+# Пропускает только долю записей уровня INFO и ниже
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+# При переполнении очереди запись отбрасывается, поток запроса не ждёт
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    FIELDS = ('request_id', 'route', 'method', 'status_code', 'latency_ms')
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+# Разбор строки вида "app=INFO,audit=WARNING,werkzeug=ERROR"
+def parse_levels(value):
+    levels = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+# Запись в файл выполняет один поток QueueListener, потоки запросов
+# только кладут записи в очередь.
+# rotation='size' - файл ротирует сам процесс (RotatingFileHandler), годится
+# только для одного процесса: несколько процессов переименовывали бы файл
+# друг у друга. rotation='external' - файл ротирует logrotate и т.п., а
+# WatchedFileHandler переоткрывает его после переименования; процессы
+# дописывают строки в конец одного файла (O_APPEND)
+def setup_logging(app, filename='app.log', max_bytes=10 * 1024 * 1024, backup_count=5,
+                  fmt='json', levels=None, sample_rate=1.0, max_queue=10000, console=True,
+                  rotation='size'):
+    if rotation == 'external':
+        file_handler = WatchedFileHandler(filename)
+    elif rotation == 'size':
+        file_handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count)
+    else:
+        raise ValueError(f"Unknown log rotation: {rotation}")
+    file_handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(max_queue)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    queue_handler.addFilter(RequestContextFilter())
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler.listener = listener
+
+    # Стандартный обработчик Flask пишет в stderr прямо из потока запроса
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(queue_handler)
+    app.logger.setLevel(logging.INFO)
+
+    for name, level in (levels or {}).items():
+        logger = app.logger if name == 'app' else logging.getLogger(name)
+        logger.setLevel(level)
+        if logger is not app.logger and queue_handler not in logger.handlers:
+            logger.addHandler(queue_handler)
+
+    return queue_handler
+
+
+# Поток QueueListener не переживает fork: в дочернем процессе создаются
+# новая очередь и новый поток записи с теми же обработчиками
+def restart_after_fork(queue_handler):
+    old = queue_handler.listener
+    atexit.unregister(old.stop)
+    queue_handler.queue = queue.Queue(old.queue.maxsize)
+    listener = QueueListener(queue_handler.queue, *old.handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler.listener = listener
@@ -0,0 +1,230 @@
+import bisect
+import threading
+import time
+from functools import wraps
+
+
+# Минимальный реестр метрик в текстовом формате Prometheus
+class Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, help_text, registry=None):
+        self.name = name
+        self.help_text = help_text
+        (registry or REGISTRY).register(self)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+# Значения по потокам: каждый поток пишет только в свой словарь и не берёт
+# блокировку. При чтении словари суммируются; словари завершившихся потоков
+# сливаются в общий, чтобы их число не росло вместе с числом потоков
+class _Shards:
+    def __init__(self, merge):
+        self._merge = merge
+        self._local = threading.local()
+        self._shards = []  # (поток, словарь)
+        self._merged = {}
+        self._lock = threading.Lock()
+
+    def local(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._fold_finished()
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _fold_finished(self):
+        alive = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                alive.append((thread, values))
+            else:
+                for key, value in values.items():
+                    self._merged[key] = self._merge(self._merged.get(key), value)
+        self._shards = alive
+
+    def snapshot(self):
+        with self._lock:
+            self._fold_finished()
+            totals = dict(self._merged)
+            shards = [values for _, values in self._shards]
+        for values in shards:
+            for key, value in list(values.items()):
+                totals[key] = self._merge(totals.get(key), value)
+        return totals
+
+
+def _add(total, value):
+    return value if total is None else total + value
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, fn=None, registry=None):
+        super().__init__(name, help_text, registry)
+        self._fn = fn
+        self._shards = _Shards(_add)
+
+    def inc(self, amount=1, **labels):
+        values = self._shards.local()
+        key = tuple(sorted(labels.items())) if labels else ()
+        values[key] = values.get(key, 0) + amount
+
+    def value(self, **labels):
+        if self._fn is not None:
+            return self._fn()
+        return self._shards.snapshot().get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        if self._fn is not None:
+            return [('', {}, self._fn())]
+        return [('', dict(key), value) for key, value in self._shards.snapshot().items()]
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, fn=None, registry=None):
+        super().__init__(name, help_text, registry)
+        self._fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        if self._fn is not None:
+            return self._fn()
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        if self._fn is not None:
+            return [('', {}, self._fn())]
+        with self._lock:
+            items = list(self._values.items())
+        return [('', dict(key), value) for key, value in items]
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _add_states(total, state):
+    if total is None:
+        return list(state)
+    return [a + b for a, b in zip(total, state)]
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, help_text, registry)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [counts по корзинам..., sum, count]
+        self._shards = _Shards(_add_states)
+
+    def observe(self, value, **labels):
+        values = self._shards.local()
+        key = tuple(sorted(labels.items())) if labels else ()
+        state = values.get(key)
+        if state is None:
+            state = values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    # Декоратор: время выполнения функции, в том числе завершившейся исключением
+    def time(self, **labels):
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return decorated
+        return decorator
+
+    def count(self, **labels):
+        state = self._shards.snapshot().get(tuple(sorted(labels.items())))
+        return state[-1] if state else 0
+
+    def samples(self):
+        result = []
+        for key, state in self._shards.snapshot().items():
+            labels = dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), state):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                result.append(('_bucket', {**labels, 'le': le}, cumulative))
+            result.append(('_sum', labels, state[-2]))
+            result.append(('_count', labels, state[-1]))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in sorted(labels.items()):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
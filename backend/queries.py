@@ -0,0 +1,702 @@
+import re
+from typing import List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import errors as pg_errors, sql
+from psycopg2.extras import execute_values
+
+
+# Соединение помнит, какие запросы на нём уже подготовлены (PREPARE живёт
+# до конца сессии и не откатывается вместе с транзакцией)
+class PreparingConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+# text - запрос для psycopg2 (%s), numbered - тот же запрос с $1..$n для
+# PREPARE и для asyncpg (asgi_app.py): оба входа выполняют один текст
+class Query:
+    def __init__(self, name, text, prepare=True):
+        self.name = name
+        self.text = text
+        self.prepare = prepare
+        count = text.count('%s')
+        numbers = iter(range(1, count + 1))
+        self.numbered = re.sub(r'%s', lambda _: f"${next(numbers)}", text).replace('%%', '%')
+        self.prepare_sql = f"PREPARE {name} AS {self.numbered}"
+        self.execute_sql = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * count)})" if count else '')
+
+
+# Реестр всех запросов backend/app.py: имя -> Query
+QUERIES = {}
+
+
+def register(name, text, prepare=True):
+    if name in QUERIES:
+        raise ValueError(f"Query {name} is already registered")
+    QUERIES[name] = query = Query(name, text, prepare)
+    return query
+
+
+# Запрос готовится один раз на соединение, дальше выполняется через EXECUTE.
+# Соединения без prepared_statements получают обычный текст запроса
+def run(cur, query, params=()):
+    prepared = getattr(cur.connection, 'prepared_statements', None)
+    if not query.prepare or prepared is None:
+        cur.execute(query.text, params)
+        return cur
+    if query.name not in prepared:
+        cur.execute(query.prepare_sql)
+        prepared.add(query.name)
+    try:
+        cur.execute(query.execute_sql, params)
+    except pg_errors.InvalidSqlStatementName:
+        # Сессия потеряла подготовленный запрос: он будет подготовлен заново
+        # при следующем вызове, когда транзакция будет откачена
+        prepared.discard(query.name)
+        raise
+    return cur
+
+
+# Пользователи
+GET_USER = register(
+    'get_user', "SELECT username, password_hash FROM users WHERE username = %s"
+)
+USER_EXISTS = register(
+    'user_exists', "SELECT EXISTS (SELECT 1 FROM users WHERE username = %s)"
+)
+INSERT_USER = register(
+    'insert_user', "INSERT INTO users (username, password_hash) VALUES (%s, %s)"
+)
+
+# Номера изменений (поколения) списка сервисов и профиля пользователя.
+# Запросы, меняющие пароли или профиль, увеличивают номер в той же
+# транзакции (CTE generation); кэши воркеров сверяют с ним свои записи
+GET_CACHE_GENERATIONS = register(
+    'get_cache_generations',
+    "SELECT services, profile FROM cache_generations WHERE username = %s"
+)
+
+# Пароли сервисов
+GET_SERVICE_PASSWORD = register(
+    'get_service_password',
+    "SELECT password_hash FROM passwords WHERE username = %s AND service = %s"
+)
+GET_SERVICE_SECRET = register(
+    'get_service_secret',
+    "SELECT version, secret FROM passwords WHERE username = %s AND service = %s"
+)
+# Зашифрованные записи (vault.py) для пакетной расшифровки
+LIST_SERVICE_SECRETS = register(
+    'list_service_secrets',
+    """SELECT service, version, secret FROM passwords
+       WHERE username = %s AND service = ANY(%s)"""
+)
+LIST_ALL_SERVICE_SECRETS = register(
+    'list_all_service_secrets',
+    "SELECT service, version, secret FROM passwords WHERE username = %s"
+)
+LIST_SERVICES = register(
+    'list_services', "SELECT service, version FROM passwords WHERE username = %s"
+)
+GET_SERVICE_VERSION = register(
+    'get_service_version',
+    "SELECT version FROM passwords WHERE username = %s AND service = %s"
+)
+# Вместе с паролем удаляется и его история: сервис с тем же именем,
+# созданный позже, начинает версии заново
+DELETE_SERVICE_PASSWORD = register(
+    'delete_service_password',
+    """WITH history AS (
+           DELETE FROM password_history WHERE username = %s AND service = %s
+       ),
+       generation AS (
+           INSERT INTO cache_generations (username, services) VALUES (%s, 1)
+           ON CONFLICT (username) DO UPDATE SET services = cache_generations.services + 1
+       )
+       DELETE FROM passwords WHERE username = %s AND service = %s
+       RETURNING password_hash"""
+)
+# Один запрос: CTE читает прежний хеш до upsert и переносит его в историю
+UPSERT_SERVICE_PASSWORD = register(
+    'upsert_service_password',
+    """WITH previous AS (
+           SELECT password_hash, version FROM passwords
+           WHERE username = %s AND service = %s
+           FOR UPDATE
+       ),
+       history AS (
+           INSERT INTO password_history (username, service, version, password_hash)
+           SELECT %s, %s, version, password_hash FROM previous
+       ),
+       generation AS (
+           INSERT INTO cache_generations (username, services) VALUES (%s, 1)
+           ON CONFLICT (username) DO UPDATE SET services = cache_generations.services + 1
+       )
+       INSERT INTO passwords (username, service, password_hash, secret)
+       VALUES (%s, %s, %s, %s)
+       ON CONFLICT (username, service)
+       DO UPDATE SET password_hash = EXCLUDED.password_hash, secret = EXCLUDED.secret,
+                     version = passwords.version + 1
+       RETURNING (SELECT password_hash FROM previous), version"""
+)
+# Сравнение с обменом: запись меняется, только если её версия равна
+# ожидаемой клиентом. Новый хеш (NULL - оставить прежний), шифртекст и
+# новое имя сервиса применяются одним UPDATE; прежний хеш уходит в историю, а при
+# переименовании история переезжает вместе с записью.
+# Пустой результат - записи нет или версия уже другая
+UPDATE_SERVICE_PASSWORD = register(
+    'update_service_password',
+    """WITH previous AS (
+           SELECT password_hash FROM passwords
+           WHERE username = %s AND service = %s AND version = %s
+           FOR UPDATE
+       ),
+       updated AS (
+           UPDATE passwords
+           SET service = %s, password_hash = COALESCE(%s, password_hash),
+               secret = CASE WHEN %s::boolean THEN %s ELSE secret END,
+               version = version + 1
+           WHERE username = %s AND service = %s AND version = %s
+           RETURNING version, password_hash
+       ),
+       renamed AS (
+           UPDATE password_history SET service = %s
+           WHERE username = %s AND service = %s AND %s::boolean
+             AND EXISTS (SELECT 1 FROM updated)
+       ),
+       history AS (
+           INSERT INTO password_history (username, service, version, password_hash)
+           SELECT %s, %s, %s, previous.password_hash FROM previous, updated
+           WHERE updated.password_hash <> previous.password_hash
+       ),
+       generation AS (
+           INSERT INTO cache_generations (username, services)
+           SELECT %s, 1 FROM updated
+           ON CONFLICT (username) DO UPDATE SET services = cache_generations.services + 1
+       )
+       SELECT updated.version, previous.password_hash, updated.password_hash
+       FROM updated, previous"""
+)
+LIST_PASSWORD_HISTORY = register(
+    'list_password_history',
+    """SELECT version, replaced_at FROM password_history
+       WHERE username = %s AND service = %s
+       ORDER BY version DESC, id DESC
+       LIMIT %s"""
+)
+# Число строк VALUES меняется от вызова к вызову, поэтому без PREPARE
+BULK_UPSERT_SERVICE_PASSWORDS = register(
+    'bulk_upsert_service_passwords',
+    """WITH incoming (username, service, password_hash, secret) AS (VALUES %s),
+       previous AS (
+           SELECT p.username, p.service, p.password_hash, p.version FROM passwords p
+           JOIN incoming i ON p.username = i.username AND p.service = i.service
+           FOR UPDATE OF p
+       ),
+       history AS (
+           INSERT INTO password_history (username, service, version, password_hash)
+           SELECT username, service, version, password_hash FROM previous
+       ),
+       generation AS (
+           INSERT INTO cache_generations (username, services)
+           SELECT DISTINCT username, 1 FROM incoming
+           ON CONFLICT (username) DO UPDATE SET services = cache_generations.services + 1
+       )
+       INSERT INTO passwords (username, service, password_hash, secret)
+       SELECT username, service, password_hash, secret FROM incoming
+       ON CONFLICT (username, service)
+       DO UPDATE SET password_hash = EXCLUDED.password_hash, secret = EXCLUDED.secret,
+                     version = passwords.version + 1
+       RETURNING service, password_hash,
+                 (SELECT password_hash FROM previous
+                  WHERE previous.service = passwords.service)""",
+    prepare=False
+)
+# Серверный курсор (DECLARE) не может выполнить EXECUTE
+EXPORT_SERVICE_PASSWORDS = register(
+    'export_service_passwords',
+    "SELECT service, password_hash FROM passwords WHERE username = %s ORDER BY service",
+    prepare=False
+)
+
+# Ключи зашифрованного хранилища
+GET_VAULT_KEY = register(
+    'get_vault_key',
+    "SELECT kdf_salt, kdf_n, kdf_r, kdf_p, wrapped_key FROM vault_keys WHERE username = %s"
+)
+INSERT_VAULT_KEY = register(
+    'insert_vault_key',
+    """INSERT INTO vault_keys (username, kdf_salt, kdf_n, kdf_r, kdf_p, wrapped_key)
+       VALUES (%s, %s, %s, %s, %s, %s)
+       ON CONFLICT (username) DO NOTHING
+       RETURNING username"""
+)
+
+# Отозванные через /logout токены: общие для всех процессов сервера.
+# Хранится SHA-256 токена и момент истечения его exp
+INSERT_REVOKED_TOKEN = register(
+    'insert_revoked_token',
+    """INSERT INTO revoked_tokens (token_digest, expires_at)
+       VALUES (%s, to_timestamp(%s))
+       ON CONFLICT (token_digest) DO NOTHING"""
+)
+IS_TOKEN_REVOKED = register(
+    'is_token_revoked',
+    """SELECT EXISTS (SELECT 1 FROM revoked_tokens
+                      WHERE token_digest = %s AND expires_at > now())"""
+)
+PURGE_REVOKED_TOKENS = register(
+    'purge_revoked_tokens', "DELETE FROM revoked_tokens WHERE expires_at <= now()"
+)
+
+# Профили
+GET_PROFILE = register(
+    'get_profile', "SELECT username, email, avatar_url FROM profiles WHERE username = %s"
+)
+UPSERT_PROFILE = register(
+    'upsert_profile',
+    """WITH generation AS (
+           INSERT INTO cache_generations (username, profile) VALUES (%s, 1)
+           ON CONFLICT (username) DO UPDATE SET profile = cache_generations.profile + 1
+       )
+       INSERT INTO profiles (username, email, avatar_url)
+       VALUES (%s, %s, %s)
+       ON CONFLICT (username)
+       DO UPDATE SET email = EXCLUDED.email, avatar_url = EXCLUDED.avatar_url"""
+)
+
+# Аудит: пачки разного размера, без PREPARE
+AUDIT_INSERTS = {
+    'user_logs': register(
+        'insert_user_logs',
+        """INSERT INTO user_logs
+           (username, action_type, ip_address, user_agent, status, details)
+           VALUES %s""",
+        prepare=False
+    ),
+    'password_logs': register(
+        'insert_password_logs',
+        """INSERT INTO password_logs
+           (username, service, action_type, old_password_hash,
+            new_password_hash, ip_address, user_agent, status, details)
+           VALUES %s""",
+        prepare=False
+    ),
+}
+
+# Секции таблиц логов (секционирование по created_at): имя, границы в
+# текстовом виде (FROM (...) TO (...) или DEFAULT), число строк по статистике
+LIST_LOG_PARTITIONS = register(
+    'list_log_partitions',
+    """SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples::bigint
+       FROM pg_inherits
+       JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+       JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+       WHERE parent.relname = %s AND parent.relnamespace = 'public'::regnamespace
+       ORDER BY child.relname""",
+    prepare=False
+)
+TRY_RETENTION_LOCK = register(
+    'try_retention_lock', "SELECT pg_try_advisory_lock(hashtext('onepassword_log_retention'))",
+    prepare=False
+)
+IS_PARTITIONED = register(
+    'is_partitioned',
+    """SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt
+                      JOIN pg_class c ON c.oid = pt.partrelid
+                      WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace)""",
+    prepare=False
+)
+
+# Изменения схемы, которые применяет init_db перед созданием индексов
+SCHEMA_CHANGES = [
+    register(
+        'add_passwords_version',
+        "ALTER TABLE passwords ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        prepare=False
+    ),
+    # Шифртекст записи (vault.py); NULL - хранится только bcrypt-хеш
+    register(
+        'add_passwords_secret',
+        "ALTER TABLE passwords ADD COLUMN IF NOT EXISTS secret BYTEA",
+        prepare=False
+    ),
+    # data key пользователя, зашифрованный ключом из мастер-пароля
+    register(
+        'create_vault_keys',
+        """CREATE TABLE IF NOT EXISTS vault_keys (
+               username VARCHAR(255) PRIMARY KEY,
+               kdf_salt BYTEA NOT NULL,
+               kdf_n INTEGER NOT NULL,
+               kdf_r INTEGER NOT NULL,
+               kdf_p INTEGER NOT NULL,
+               wrapped_key BYTEA NOT NULL,
+               created_at TIMESTAMP NOT NULL DEFAULT now()
+           )""",
+        prepare=False
+    ),
+    register(
+        'create_cache_generations',
+        """CREATE TABLE IF NOT EXISTS cache_generations (
+               username VARCHAR(255) PRIMARY KEY,
+               services BIGINT NOT NULL DEFAULT 0,
+               profile BIGINT NOT NULL DEFAULT 0
+           )""",
+        prepare=False
+    ),
+    register(
+        'create_revoked_tokens',
+        """CREATE TABLE IF NOT EXISTS revoked_tokens (
+               token_digest CHAR(64) PRIMARY KEY,
+               expires_at TIMESTAMPTZ NOT NULL
+           )""",
+        prepare=False
+    ),
+]
+HAS_PASSWORD_HISTORY = register(
+    'has_password_history', "SELECT to_regclass('password_history') IS NOT NULL", prepare=False
+)
+CREATE_PASSWORD_HISTORY = register(
+    'create_password_history',
+    """CREATE TABLE password_history (
+           id BIGSERIAL PRIMARY KEY,
+           username VARCHAR(255) NOT NULL,
+           service VARCHAR(255) NOT NULL,
+           version INTEGER NOT NULL,
+           password_hash VARCHAR(255) NOT NULL,
+           replaced_at TIMESTAMP NOT NULL DEFAULT now()
+       )""",
+    prepare=False
+)
+# Историю до появления таблицы восстанавливает журнал password_logs:
+# каждое успешное UPDATE хранит прежний хеш. Версии нумеруются по порядку
+# изменений, текущая запись получает следующую
+BACKFILL_PASSWORD_HISTORY = register(
+    'backfill_password_history',
+    """WITH changes AS (
+           SELECT l.username, l.service, l.old_password_hash, l.created_at,
+                  row_number() OVER (PARTITION BY l.username, l.service
+                                     ORDER BY l.created_at, l.id) AS version
+           FROM password_logs l
+           JOIN passwords p ON p.username = l.username AND p.service = l.service
+           WHERE l.action_type = 'UPDATE' AND l.status = 'SUCCESS'
+             AND l.old_password_hash IS NOT NULL
+       ),
+       inserted AS (
+           INSERT INTO password_history (username, service, version, password_hash, replaced_at)
+           SELECT username, service, version, old_password_hash, created_at FROM changes
+           RETURNING username, service, version
+       )
+       UPDATE passwords p SET version = latest.version + 1
+       FROM (SELECT username, service, max(version) AS version
+             FROM inserted GROUP BY username, service) latest
+       WHERE p.username = latest.username AND p.service = latest.service""",
+    prepare=False
+)
+
+# Индексы, которые создаёт init_db: уникальность имени пользователя,
+# курсорная пагинация и фильтры логов
+SCHEMA_INDEXES = [
+    register(name, text, prepare=False) for name, text in (
+        ('index_users_username',
+         "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)"),
+        ('index_user_logs_user_created',
+         """CREATE INDEX IF NOT EXISTS idx_user_logs_user_created
+            ON user_logs (username, created_at DESC, id DESC)"""),
+        ('index_user_logs_user_action_created',
+         """CREATE INDEX IF NOT EXISTS idx_user_logs_user_action_created
+            ON user_logs (username, action_type, created_at DESC, id DESC)"""),
+        ('index_password_logs_user_created',
+         """CREATE INDEX IF NOT EXISTS idx_password_logs_user_created
+            ON password_logs (username, created_at DESC, id DESC)"""),
+        ('index_password_logs_user_service_created',
+         """CREATE INDEX IF NOT EXISTS idx_password_logs_user_service_created
+            ON password_logs (username, service, created_at DESC, id DESC)"""),
+        ('index_password_history_user_service',
+         """CREATE INDEX IF NOT EXISTS idx_password_history_user_service
+            ON password_history (username, service, version DESC)"""),
+    )
+]
+
+
+def get_user(cur, username: str) -> Optional[Tuple[str, str]]:
+    return run(cur, GET_USER, (username,)).fetchone()
+
+
+def user_exists(cur, username: str) -> bool:
+    return run(cur, USER_EXISTS, (username,)).fetchone()[0]
+
+
+def insert_user(cur, username: str, password_hash: str) -> None:
+    run(cur, INSERT_USER, (username, password_hash))
+
+
+# (поколение списка сервисов, поколение профиля); (0, 0) - изменений не было
+def get_cache_generations(cur, username: str) -> Tuple[int, int]:
+    row = run(cur, GET_CACHE_GENERATIONS, (username,)).fetchone()
+    return tuple(row) if row else (0, 0)
+
+
+def get_service_password(cur, username: str, service: str) -> Optional[str]:
+    row = run(cur, GET_SERVICE_PASSWORD, (username, service)).fetchone()
+    return row[0] if row else None
+
+
+# (service, version)
+def list_services(cur, username: str) -> List[Tuple[str, int]]:
+    return run(cur, LIST_SERVICES, (username,)).fetchall()
+
+
+def get_service_version(cur, username: str, service: str) -> Optional[int]:
+    row = run(cur, GET_SERVICE_VERSION, (username, service)).fetchone()
+    return row[0] if row else None
+
+
+# Возвращает хеш удалённого пароля или None, если записи не было
+# Параметры запросов с повторяющимися значениями собираются в одном месте
+# для psycopg2 и asyncpg
+def delete_service_password_params(username: str, service: str) -> tuple:
+    return (username, service, username, username, service)
+
+
+def delete_service_password(cur, username: str, service: str) -> Optional[str]:
+    row = run(cur, DELETE_SERVICE_PASSWORD, delete_service_password_params(username, service)).fetchone()
+    return row[0] if row else None
+
+
+def upsert_service_password_params(username: str, service: str, password_hash: str,
+                                   secret: Optional[bytes] = None) -> tuple:
+    return (username, service, username, service, username,
+            username, service, password_hash, secret)
+
+
+# Возвращает (прежний хеш или None, если пароль сохраняется впервые; новую версию)
+# secret - шифртекст пароля или None, если хранилище выключено
+def upsert_service_password(cur, username: str, service: str, password_hash: str,
+                            secret: Optional[bytes] = None) -> Tuple[Optional[str], int]:
+    run(cur, UPSERT_SERVICE_PASSWORD,
+        upsert_service_password_params(username, service, password_hash, secret))
+    return cur.fetchone()
+
+
+# (новая версия, прежний хеш, новый хеш) или None при несовпадении версии.
+# Шифртекст заменяется вместе с новым паролем (None без хранилища) или,
+# при переименовании, перешифрованным под новое имя
+def update_service_password(cur, username: str, service: str, version: int,
+                            new_service: str, password_hash: Optional[str],
+                            secret: Optional[bytes] = None):
+    renaming = new_service != service
+    replace_secret = password_hash is not None or secret is not None
+    return run(cur, UPDATE_SERVICE_PASSWORD, (
+        username, service, version,
+        new_service, password_hash, replace_secret, secret, username, service, version,
+        new_service, username, service, renaming,
+        username, new_service, version,
+        username,
+    )).fetchone()
+
+
+# (версия, шифртекст или None) или None, если записи нет
+def get_service_secret(cur, username: str, service: str):
+    return run(cur, GET_SERVICE_SECRET, (username, service)).fetchone()
+
+
+# (service, version, secret); services=None - все записи пользователя
+def list_service_secrets(cur, username: str, services=None):
+    if services is None:
+        return run(cur, LIST_ALL_SERVICE_SECRETS, (username,)).fetchall()
+    return run(cur, LIST_SERVICE_SECRETS, (username, list(services))).fetchall()
+
+
+def get_vault_key(cur, username: str):
+    return run(cur, GET_VAULT_KEY, (username,)).fetchone()
+
+
+# False, если запись уже создал параллельный запрос
+def insert_vault_key(cur, username: str, record) -> bool:
+    return run(cur, INSERT_VAULT_KEY, (username, *record)).fetchone() is not None
+
+
+# expires_at - exp токена (секунды Unix); заодно удаляются истёкшие отзывы
+def insert_revoked_token(cur, digest: str, expires_at: float) -> None:
+    run(cur, PURGE_REVOKED_TOKENS)
+    run(cur, INSERT_REVOKED_TOKEN, (digest, expires_at))
+
+
+def is_token_revoked(cur, digest: str) -> bool:
+    return run(cur, IS_TOKEN_REVOKED, (digest,)).fetchone()[0]
+
+
+def list_password_history(cur, username: str, service: str, limit: int):
+    return run(cur, LIST_PASSWORD_HISTORY, (username, service, limit)).fetchall()
+
+
+# rows: (username, service, password_hash, secret); возвращает (service, new_hash, old_hash)
+def bulk_upsert_service_passwords(cur, rows) -> List[Tuple[str, str, Optional[str]]]:
+    return execute_values(cur, BULK_UPSERT_SERVICE_PASSWORDS.text, rows,
+                          template='(%s, %s, %s, %s::bytea)', page_size=len(rows), fetch=True)
+
+
+def export_service_passwords(cur, username: str) -> None:
+    run(cur, EXPORT_SERVICE_PASSWORDS, (username,))
+
+
+def get_profile(cur, username: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+    return run(cur, GET_PROFILE, (username,)).fetchone()
+
+
+def upsert_profile(cur, username: str, email: Optional[str], avatar_url: Optional[str]) -> None:
+    run(cur, UPSERT_PROFILE, (username, username, email, avatar_url))
+
+
+def insert_audit_rows(cur, table: str, rows) -> None:
+    execute_values(cur, AUDIT_INSERTS[table].text, rows, page_size=len(rows))
+
+
+def create_indexes(cur) -> None:
+    for query in SCHEMA_INDEXES:
+        run(cur, query)
+
+
+def migrate_schema(cur) -> None:
+    for query in SCHEMA_CHANGES:
+        run(cur, query)
+    if not run(cur, HAS_PASSWORD_HISTORY).fetchone()[0]:
+        run(cur, CREATE_PASSWORD_HISTORY)
+        run(cur, BACKFILL_PASSWORD_HISTORY)
+
+
+def list_log_partitions(cur, table: str) -> List[Tuple[str, str, int]]:
+    return run(cur, LIST_LOG_PARTITIONS, (table,)).fetchall()
+
+
+def is_partitioned(cur, table: str) -> bool:
+    return run(cur, IS_PARTITIONED, (table,)).fetchone()[0]
+
+
+def try_retention_lock(cur) -> bool:
+    return run(cur, TRY_RETENTION_LOCK).fetchone()[0]
+
+
+def max_log_created_at(cur, table: str):
+    cur.execute(sql.SQL("SELECT max(created_at) FROM {}").format(sql.Identifier(table)))
+    return cur.fetchone()[0]
+
+
+def _bound_check(table: str) -> sql.Identifier:
+    return sql.Identifier(f"{table}_partition_bound")
+
+
+# Ограничение, из которого PostgreSQL выводит границу будущей секции: с ним
+# ATTACH PARTITION не перечитывает таблицу под ACCESS EXCLUSIVE. NOT VALID
+# добавляется без проверки строк, а VALIDATE читает таблицу под SHARE UPDATE
+# EXCLUSIVE и не останавливает запись. Выполняется в отдельной транзакции
+# до partition_log_table
+def add_log_bound_check(cur, table: str, upper) -> None:
+    check = _bound_check(table)
+    cur.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}").format(
+        sql.Identifier(table), check))
+    cur.execute(sql.SQL(
+        "ALTER TABLE {} ADD CONSTRAINT {} CHECK (created_at IS NOT NULL AND created_at < %s) NOT VALID"
+    ).format(sql.Identifier(table), check), (upper,))
+    cur.execute(sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(
+        sql.Identifier(table), check))
+
+
+# Перевод таблицы логов в секционированную без копирования строк: старая
+# таблица становится секцией (MINVALUE, upper), новые строки идут в секции
+# по периодам. Индексы старой таблицы переименовываются, чтобы CREATE INDEX
+# IF NOT EXISTS создал их на новой родительской таблице, а PostgreSQL
+# подключил к ним существующие индексы секции. Ограничение из
+# add_log_bound_check нужно только на время ATTACH: родительская таблица
+# не должна его унаследовать
+def partition_log_table(cur, table: str, legacy: str, upper) -> None:
+    cur.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(sql.Identifier(table)))
+    cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+    sequence = cur.fetchone()[0]
+    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+        sql.Identifier(table), sql.Identifier(legacy)))
+    cur.execute(
+        """SELECT indexname FROM pg_indexes
+           WHERE schemaname = 'public' AND tablename = %s AND indexname LIKE 'idx\_%%'""",
+        (legacy,)
+    )
+    for (index,) in cur.fetchall():
+        cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(index), sql.Identifier(f"{index}_legacy")))
+    cur.execute(sql.SQL(
+        """CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+           PARTITION BY RANGE (created_at)"""
+    ).format(sql.Identifier(table), sql.Identifier(legacy)))
+    cur.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}").format(
+        sql.Identifier(table), _bound_check(table)))
+    if sequence:
+        cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.id").format(
+            sql.SQL(sequence), sql.Identifier(table)))
+    cur.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (MINVALUE) TO (%s)").format(
+        sql.Identifier(table), sql.Identifier(legacy)), (upper,))
+    cur.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}").format(
+        sql.Identifier(legacy), _bound_check(table)))
+    cur.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(
+        sql.Identifier(f"{table}_default"), sql.Identifier(table)))
+
+
+def create_log_partition(cur, table: str, partition: str, start, end) -> None:
+    cur.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+        sql.Identifier(partition), sql.Identifier(table)), (start, end))
+
+
+# Строки периода, попавшие в секцию по умолчанию, переносятся в новую
+# секцию: пока они там лежат, создать секцию на этот период нельзя
+def create_log_partition_from_default(cur, table: str, partition: str, start, end) -> int:
+    default = sql.Identifier(f"{table}_default")
+    parent = sql.Identifier(table)
+    cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(parent, default))
+    create_log_partition(cur, table, partition, start, end)
+    cur.execute(sql.SQL(
+        """WITH moved AS (
+               DELETE FROM {default} WHERE created_at >= %s AND created_at < %s RETURNING *
+           )
+           INSERT INTO {parent} SELECT * FROM moved"""
+    ).format(default=default, parent=parent), (start, end))
+    moved = cur.rowcount
+    cur.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} DEFAULT").format(parent, default))
+    return moved
+
+
+def default_partition_has_rows(cur, table: str, start, end) -> bool:
+    cur.execute(sql.SQL(
+        "SELECT EXISTS (SELECT 1 FROM {} WHERE created_at >= %s AND created_at < %s)"
+    ).format(sql.Identifier(f"{table}_default")), (start, end))
+    return cur.fetchone()[0]
+
+
+def copy_log_partition(cur, partition: str, file) -> None:
+    cur.copy_expert(
+        sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.Identifier(partition)),
+        file
+    )
+
+
+def drop_log_partition(cur, table: str, partition: str) -> None:
+    cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+        sql.Identifier(table), sql.Identifier(partition)))
+    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition)))
+
+
+# Страница логов: условия собираются из фильтров запроса, поэтому текст
+# запроса меняется и готовить его нельзя
+def log_page(table: str, columns, conditions) -> sql.Composed:
+    return sql.SQL(
+        """SELECT {columns}, created_at, id
+           FROM {table}
+           WHERE {conditions}
+           ORDER BY created_at DESC, id DESC
+           LIMIT %s"""
+    ).format(
+        columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+        table=sql.Identifier(table),
+        conditions=sql.SQL(' AND ').join(conditions)
+    )
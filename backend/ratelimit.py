@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ('window_start', 'previous', 'current', 'strikes', 'locked_until', 'last_seen')
+
+    def __init__(self, now):
+        self.window_start = now
+        self.previous = 0
+        self.current = 0
+        self.strikes = 0
+        self.locked_until = 0.0
+        self.last_seen = now
+
+
+# Хранилище счётчиков скользящего окна в памяти процесса.
+# Окно приближается двумя соседними интервалами: предыдущий учитывается
+# пропорционально перекрытию со скользящим окном. Число ключей ограничено,
+# давно не использованные вытесняются.
+#
+# Общее для нескольких процессов хранилище (например, Redis) должно
+# реализовать те же методы hit/retry_after/reset атомарно.
+class MemoryRateLimitStore:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _entry(self, key, now, window, max_lockout):
+        entry = self._entries.get(key)
+        if entry is None or (now - entry.last_seen > 2 * window
+                             and now > entry.locked_until + max_lockout):
+            entry = _Entry(now)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        self._entries.move_to_end(key)
+        elapsed = now - entry.window_start
+        if elapsed >= window:
+            # Предыдущий интервал учитывается, только если он соседний
+            entry.previous = entry.current if elapsed < 2 * window else 0
+            entry.current = 0
+            entry.window_start = now - elapsed % window
+        entry.last_seen = now
+        return entry
+
+    @staticmethod
+    def _count(entry, now, window):
+        overlap = 1.0 - (now - entry.window_start) / window
+        return entry.previous * overlap + entry.current
+
+    def hit(self, key, now, limit, window, lockout, max_lockout):
+        with self._lock:
+            entry = self._entry(key, now, window, max_lockout)
+            if entry.locked_until > now:
+                return entry.locked_until - now
+            entry.current += 1
+            if self._count(entry, now, window) <= limit:
+                return 0.0
+            # Каждая следующая блокировка вдвое длиннее предыдущей
+            entry.strikes += 1
+            duration = min(lockout * 2 ** (entry.strikes - 1), max_lockout)
+            entry.locked_until = now + duration
+            entry.previous = entry.current = 0
+            return duration
+
+    def retry_after(self, key, now, limit, window, max_lockout):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0.0
+            entry = self._entry(key, now, window, max_lockout)
+            if entry.locked_until > now:
+                return entry.locked_until - now
+            return 0.0
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, store, prefix, limit, window, lockout=30.0, max_lockout=3600.0,
+                 clock=time.monotonic):
+        self.store = store
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self.lockout = lockout
+        self.max_lockout = max_lockout
+        self._clock = clock
+
+    # Учитывает событие; возвращает 0 или число секунд до снятия блокировки
+    def hit(self, key):
+        return self.store.hit(f"{self.prefix}:{key}", self._clock(), self.limit,
+                              self.window, self.lockout, self.max_lockout)
+
+    # Проверяет блокировку, не учитывая событие
+    def retry_after(self, key):
+        return self.store.retry_after(f"{self.prefix}:{key}", self._clock(), self.limit,
+                                      self.window, self.max_lockout)
+
+    def reset(self, key):
+        self.store.reset(f"{self.prefix}:{key}")
+
+
+# Ограничение входа: по IP считаются все попытки, по имени пользователя -
+# только неудачные. Решение принимается до запроса к БД и bcrypt
+class LoginRateLimiter:
+    def __init__(self, store, ip_limit=30, ip_window=60.0, user_limit=5, user_window=300.0,
+                 lockout=30.0, max_lockout=3600.0, clock=time.monotonic):
+        self.by_ip = SlidingWindowLimiter(store, 'login_ip', ip_limit, ip_window,
+                                          lockout, max_lockout, clock)
+        self.by_user = SlidingWindowLimiter(store, 'login_user', user_limit, user_window,
+                                            lockout, max_lockout, clock)
+
+    # Возвращает (scope, retry_after); retry_after == 0 - попытка разрешена
+    def check(self, username, ip_address):
+        retry_after = self.by_user.retry_after(username)
+        if retry_after:
+            return 'user', retry_after
+        if ip_address:
+            retry_after = self.by_ip.hit(ip_address)
+            if retry_after:
+                return 'ip', retry_after
+        return None, 0.0
+
+    def failed(self, username):
+        return self.by_user.hit(username)
+
+    def succeeded(self, username):
+        self.by_user.reset(username)
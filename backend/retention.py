@@ -0,0 +1,262 @@
+import argparse
+import gzip
+import logging
+import os
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import psycopg2
+
+import queries
+
+LOG_TABLES = ('user_logs', 'password_logs')
+INTERVALS = ('day', 'week', 'month')
+
+# start/end - None для MINVALUE/MAXVALUE; у секции по умолчанию оба None
+Partition = namedtuple('Partition', 'name start end rows default')
+
+
+def period_start(moment: datetime, interval: str) -> datetime:
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == 'day':
+        return day
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown partition interval: {interval}")
+
+
+def next_period(start: datetime, interval: str) -> datetime:
+    if interval == 'day':
+        return start + timedelta(days=1)
+    if interval == 'week':
+        return start + timedelta(weeks=1)
+    if interval == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    raise ValueError(f"Unknown partition interval: {interval}")
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m%d}"
+
+
+_BOUND = re.compile(r"FOR VALUES FROM \((.+)\) TO \((.+)\)")
+
+
+# Граница в формате вывода PostgreSQL: смещение пояса может быть коротким
+# (+00, +05:30), дробная часть - любой длины; fromisoformat в Python 3.9
+# такое не разбирает
+_TIMESTAMP = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}(?::\d{2})?)(?:\.(\d{1,6}))?(?:[+-]\d{2}(?::?\d{2}){0,2})?"
+)
+
+
+def _bound_value(text):
+    text = text.strip()
+    if text in ('MINVALUE', 'MAXVALUE'):
+        return None
+    match = _TIMESTAMP.fullmatch(text.strip("'"))
+    if not match:
+        raise ValueError(f"Unsupported partition bound value: {text}")
+    date, clock, fraction = match.groups()
+    # Для timestamptz граница выводится в часовом поясе сессии; сравнивается
+    # она с localtimestamp той же сессии, поэтому смещение отбрасывается
+    value = f"{date}T{clock}" + (f".{fraction.ljust(6, '0')}" if fraction else '')
+    return datetime.fromisoformat(value)
+
+
+def parse_partition(name: str, bound: str, rows: int) -> Partition:
+    if bound == 'DEFAULT':
+        return Partition(name, None, None, rows, True)
+    match = _BOUND.fullmatch(bound)
+    if not match:
+        raise ValueError(f"Unsupported partition bound for {name}: {bound}")
+    return Partition(name, _bound_value(match.group(1)), _bound_value(match.group(2)), rows, False)
+
+
+def _overlaps(partition, start, end):
+    return ((partition.start is None or partition.start < end) and
+            (partition.end is None or partition.end > start))
+
+
+# Что сделать с таблицей: секции на текущий и ahead следующих периодов,
+# которых ещё нет, и секции, целиком старше срока хранения
+def plan(partitions, now, interval, ahead, retention_days):
+    ranged = [p for p in partitions if not p.default]
+    create = []
+    start = period_start(now, interval)
+    for _ in range(ahead + 1):
+        end = next_period(start, interval)
+        if not any(_overlaps(p, start, end) for p in ranged):
+            create.append((start, end))
+        start = end
+    cutoff = now - timedelta(days=retention_days)
+    archive = [p for p in ranged if p.end is not None and p.end <= cutoff]
+    return create, archive
+
+
+class LogRetention:
+    def __init__(self, conn, archive_dir, interval='month', ahead=2, retention_days=180, logger=None):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown partition interval: {interval}")
+        self.conn = conn
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.ahead = ahead
+        self.retention_days = retention_days
+        self.logger = logger or logging.getLogger(__name__)
+
+    def now(self) -> datetime:
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT localtimestamp")
+            return cur.fetchone()[0]
+
+    def partitions(self, table):
+        with self.conn.cursor() as cur:
+            rows = queries.list_log_partitions(cur, table)
+        return [parse_partition(*row) for row in rows]
+
+    def is_partitioned(self, table) -> bool:
+        with self.conn.cursor() as cur:
+            return queries.is_partitioned(cur, table)
+
+    # Однократный перевод таблицы в секционированную. Строки не копируются;
+    # старая таблица проверяется один раз до блокировки (add_log_bound_check),
+    # и ATTACH под ACCESS EXCLUSIVE её уже не читает
+    def partition(self, table) -> bool:
+        if self.is_partitioned(table):
+            return False
+        with self.conn.cursor() as cur:
+            newest = max(filter(None, (queries.max_log_created_at(cur, table), self.now())))
+            upper = next_period(period_start(newest, self.interval), self.interval)
+            queries.add_log_bound_check(cur, table, upper)
+        self.conn.commit()
+        with self.conn.cursor() as cur:
+            queries.partition_log_table(cur, table, f"{table}_legacy", upper)
+            queries.migrate_schema(cur)
+            queries.create_indexes(cur)
+        self.conn.commit()
+        self.logger.info(f"Partitioned {table}: existing rows kept in {table}_legacy up to {upper}")
+        return True
+
+    def run(self, table, dry_run=False):
+        create, archive = plan(self.partitions(table), self.now(), self.interval,
+                               self.ahead, self.retention_days)
+        if dry_run:
+            return create, archive
+        for start, end in create:
+            self.create_partition(table, start, end)
+        for partition in archive:
+            self.archive(table, partition)
+        return create, archive
+
+    def create_partition(self, table, start, end):
+        name = partition_name(table, start)
+        with self.conn.cursor() as cur:
+            if queries.default_partition_has_rows(cur, table, start, end):
+                moved = queries.create_log_partition_from_default(cur, table, name, start, end)
+                self.logger.warning(f"Moved {moved} rows from {table}_default to new partition {name}")
+            else:
+                queries.create_log_partition(cur, table, name, start, end)
+        self.conn.commit()
+        self.logger.info(f"Created partition {name} for {start:%Y-%m-%d} - {end:%Y-%m-%d}")
+
+    # Сначала выгрузка в файл (секция старая, в неё уже не пишут), потом
+    # короткая транзакция DETACH + DROP. Если процесс прервётся между ними,
+    # следующий запуск выгрузит секцию заново
+    def archive(self, table, partition):
+        directory = os.path.join(self.archive_dir, table)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{partition.name}.csv.gz")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(filename=os.path.basename(path)[:-3], mode='wb', fileobj=raw) as gz:
+                with self.conn.cursor() as cur:
+                    queries.copy_log_partition(cur, partition.name, gz)
+            raw.flush()
+            os.fsync(raw.fileno())
+        self.conn.rollback()
+        os.replace(tmp_path, path)
+
+        with self.conn.cursor() as cur:
+            queries.drop_log_partition(cur, table, partition.name)
+        self.conn.commit()
+        self.logger.info(f"Archived partition {partition.name} ({partition.rows} rows) to {path}")
+        return path
+
+    # Два одновременных запуска (cron) не должны делить одни секции
+    def try_lock(self) -> bool:
+        with self.conn.cursor() as cur:
+            locked = queries.try_retention_lock(cur)
+        self.conn.commit()
+        return locked
+
+
+def _format_bound(value):
+    return '-' if value is None else f"{value:%Y-%m-%d %H:%M}"
+
+
+def main(argv=None):
+    import app as backend
+
+    application = backend.create_app()
+    config = application.config
+    parser = argparse.ArgumentParser(
+        description='Partition, archive and expire user_logs and password_logs'
+    )
+    parser.add_argument('command', choices=('partition', 'run', 'status'),
+                        help='partition: convert the tables once and create partitions; '
+                             'run: create upcoming partitions and archive expired ones; '
+                             'status: list partitions')
+    parser.add_argument('--table', action='append', choices=LOG_TABLES,
+                        help='limit to one table (may be repeated)')
+    parser.add_argument('--interval', choices=INTERVALS, default=config['LOG_PARTITION_INTERVAL'])
+    parser.add_argument('--ahead', type=int, default=config['LOG_PARTITIONS_AHEAD'])
+    parser.add_argument('--retention-days', type=int, default=config['LOG_RETENTION_DAYS'])
+    parser.add_argument('--archive-dir', default=config['LOG_ARCHIVE_DIR'])
+    parser.add_argument('--dry-run', action='store_true', help='show the plan without changing anything')
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(**backend.DATABASE_CONFIG)
+    try:
+        job = LogRetention(conn, args.archive_dir, args.interval, args.ahead, args.retention_days,
+                           logger=application.logger)
+        tables = args.table or LOG_TABLES
+        if args.command == 'status':
+            for table in tables:
+                if not job.is_partitioned(table):
+                    print(f"{table}: not partitioned")
+                    continue
+                for p in job.partitions(table):
+                    bounds = 'DEFAULT' if p.default else f"{_format_bound(p.start)} .. {_format_bound(p.end)}"
+                    print(f"{table:<14}{p.name:<32}{bounds:<38}~{p.rows} rows")
+            return 0
+
+        if not job.try_lock():
+            print('Another retention run is in progress')
+            return 1
+        for table in tables:
+            if not job.is_partitioned(table):
+                if args.command != 'partition':
+                    print(f"{table}: not partitioned, run 'partition' first")
+                    continue
+                if args.dry_run:
+                    print(f"{table}: would partition")
+                    continue
+                job.partition(table)
+            create, archive = job.run(table, dry_run=args.dry_run)
+            prefix = 'would ' if args.dry_run else ''
+            for start, _ in create:
+                print(f"{table}: {prefix}create {partition_name(table, start)}")
+            for partition in archive:
+                print(f"{table}: {prefix}archive {partition.name} (~{partition.rows} rows)")
+        return 0
+    finally:
+        conn.close()
+        backend.release_resources()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
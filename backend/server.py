@@ -0,0 +1,96 @@
+import argparse
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# Предварительно загруженный мастер gunicorn: app.py (dotenv, конфигурация,
+# init_db) импортируется один раз, воркеры получают его через fork.
+# max_requests - перезапуск воркера после заданного числа запросов.
+# SIGHUP плавно заменяет воркеров, но из-за preload_app новые воркеры
+# получают код и конфигурацию, уже загруженные в мастере: чтобы применить
+# новый код или .env, мастер нужно перезапустить (или заменить через USR2)
+class OnePasswordServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        import app as backend
+
+        application = backend.create_app()
+        if backend.vault_enabled() and self.options['workers'] > 1:
+            application.logger.warning(
+                "VAULT_ENABLED with several workers: unlocked vault keys are cached per worker, "
+                "clients will be asked for the master password on each worker they reach"
+            )
+        # Схема проверяется в мастере, воркеры наследуют флаг и не ходят в БД
+        # при запуске. Если база ещё недоступна, это сделает первый запрос
+        try:
+            backend.init_db()
+        except Exception as e:
+            application.logger.warning(f"Deferred database initialization: {str(e)}")
+        backend.release_resources()
+        return application
+
+
+def post_fork(server, worker):
+    import app as backend
+
+    backend.reinit_after_fork()
+
+
+def build_options(args):
+    return {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'preload_app': True,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'post_fork': post_fork,
+        'accesslog': None,
+        'errorlog': '-',
+        'proc_name': 'onepassword',
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the OnePassword API with pre-forked workers')
+    parser.add_argument('--bind', default=os.getenv('SERVER_BIND', '127.0.0.1:5000'))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.getenv('SERVER_WORKERS', str(default_workers()))))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SERVER_THREADS', '4')))
+    parser.add_argument('--max-requests', type=int,
+                        default=int(os.getenv('SERVER_MAX_REQUESTS', '5000')))
+    parser.add_argument('--max-requests-jitter', type=int,
+                        default=int(os.getenv('SERVER_MAX_REQUESTS_JITTER', '500')))
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('SERVER_TIMEOUT', '30')))
+    parser.add_argument('--graceful-timeout', type=int,
+                        default=int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30')))
+    args = parser.parse_args(argv)
+
+    # Воркеров уже столько, сколько ядер: отдельный пул процессов для bcrypt
+    # в каждом воркере только умножил бы число процессов
+    os.environ.setdefault('HASHING_EXECUTOR', 'thread')
+    # Все воркеры пишут в один файл журнала: ротацию выполняет не процесс
+    if args.workers > 1:
+        os.environ.setdefault('LOG_ROTATION', 'external')
+
+    OnePasswordServer(build_options(args)).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import math
+import re
+from collections import namedtuple
+
+import wordlists
+
+Strength = namedtuple('Strength', 'score entropy warnings')
+
+# Границы оценки 0-4 в битах энтропии
+SCORE_THRESHOLDS = (28, 36, 60, 80)
+
+KEYBOARD_ROWS = ('qwertyuiop', 'asdfghjkl', 'zxcvbnm', '1234567890', 'qazwsxedc', 'йцукенгшщзхъ')
+LEET = str.maketrans('@4310$5!7|+', 'aaeiossitlt')
+YEAR = re.compile(r'(19|20)\d\d')
+
+# Длина проверяемых подстрок: длинные записи внешнего словаря не
+# участвуют, чтобы число поисков на символ оставалось постоянным
+MIN_MATCH = 3
+MAX_MATCH = 20
+
+LETTER_BITS = math.log2(26)
+DIGIT_BITS = math.log2(10)
+SYMBOL_BITS = math.log2(33)
+
+
+def _char_bits(char):
+    if char.isalpha():
+        return LETTER_BITS
+    if char.isdigit():
+        return DIGIT_BITS
+    return SYMBOL_BITS
+
+
+# Оценка стойкости без внешних зависимостей: пароль покрывается
+# найденными шаблонами (словарь, последовательность, повтор, год), остальное
+# считается перебором по классу символа, и выбирается самое дешёвое покрытие.
+# Словари разворачиваются в один dict при создании, поэтому оценка - это
+# несколько сотен поисков в хеш-таблице
+class StrengthEstimator:
+    def __init__(self, ranked_passwords=wordlists.COMMON_PASSWORDS, words=wordlists.WORDS,
+                 max_length=64):
+        self.max_length = max_length
+        self._ranks = {}
+        for rank, word in enumerate(ranked_passwords, 1):
+            if MIN_MATCH <= len(word) <= MAX_MATCH:
+                self._ranks.setdefault(word.lower(), (rank, 'common'))
+        for rank, word in enumerate(words, len(self._ranks) + 1):
+            if MIN_MATCH < len(word) <= MAX_MATCH:
+                self._ranks.setdefault(word.lower(), (rank, 'word'))
+        for row in KEYBOARD_ROWS:
+            for walk in (row, row[::-1]):
+                for size in range(4, len(walk) + 1):
+                    for start in range(len(walk) - size + 1):
+                        self._ranks.setdefault(walk[start:start + size], (size, 'keyboard'))
+        self._longest = max((len(word) for word in self._ranks), default=0)
+
+    def __len__(self):
+        return len(self._ranks)
+
+    def estimate(self, password, user_inputs=()):
+        head, tail = password[:self.max_length], password[self.max_length:]
+        lowered = head.lower()
+        normalized = lowered.translate(LEET)
+        inputs = {value.lower() for value in user_inputs if value and len(value) >= MIN_MATCH}
+        length = len(head)
+
+        # matches[end] - (start, bits, kind) для шаблонов, заканчивающихся в end
+        matches = [[] for _ in range(length + 1)]
+        sources = (lowered,) if normalized == lowered else (lowered, normalized)
+        ranks = self._ranks
+        for start in range(length):
+            for end in range(start + MIN_MATCH, min(length, start + self._longest) + 1):
+                for source in sources:
+                    text = source[start:end]
+                    if source is normalized and text == lowered[start:end]:
+                        continue
+                    if text in inputs:
+                        matches[end].append((start, 1.0, 'personal'))
+                    found = ranks.get(text)
+                    if found:
+                        rank, kind = found
+                        bits = math.log2(rank) + 1
+                        if head[start:end] != lowered[start:end]:
+                            bits += 1
+                        if source is normalized:
+                            bits += 1
+                        matches[end].append((start, bits, kind))
+        self._sequences(lowered, matches)
+        self._repeated_blocks(head, matches)
+        for match in YEAR.finditer(head):
+            matches[match.end()].append((match.start(), math.log2(120), 'year'))
+
+        best = [0.0] * (length + 1)
+        used = [None] * (length + 1)
+        for end in range(1, length + 1):
+            best[end] = best[end - 1] + _char_bits(head[end - 1])
+            used[end] = None
+            for start, bits, kind in matches[end]:
+                if best[start] + bits < best[end]:
+                    best[end] = best[start] + bits
+                    used[end] = (start, kind)
+
+        kinds = set()
+        end = length
+        while end > 0:
+            if used[end] is None:
+                end -= 1
+            else:
+                end, kind = used[end]
+                kinds.add(kind)
+
+        entropy = best[length] + sum(_char_bits(char) for char in tail)
+        score = sum(entropy >= threshold for threshold in SCORE_THRESHOLDS)
+        warnings = [WARNINGS[kind] for kind in WARNING_ORDER if kind in kinds]
+        if len(password) < 8:
+            warnings.insert(0, 'Password is shorter than 8 characters')
+        return Strength(score, round(entropy, 1), warnings)
+
+    # Повторы (aaa) и шаги с постоянной разностью (abc, 975)
+    @staticmethod
+    def _sequences(text, matches):
+        start = 0
+        while start < len(text) - 1:
+            step = ord(text[start + 1]) - ord(text[start])
+            end = start + 2
+            while end < len(text) and ord(text[end]) - ord(text[end - 1]) == step:
+                end += 1
+            if end - start >= MIN_MATCH and abs(step) <= 2:
+                kind = 'repeat' if step == 0 else 'sequence'
+                bits = _char_bits(text[start]) + math.log2(end - start) + (0 if step == 0 else 2)
+                matches[end].append((start, bits, kind))
+            start = end - 1
+
+
+    # Повторы блоков из нескольких символов (aB3$aB3$): цена - перебор одного
+    # блока и число его копий. Блок, который сам состоит из повторов (abab),
+    # пропускается: его копии дешевле покрывает меньший блок, а одиночные
+    # символы - _sequences
+    @staticmethod
+    def _repeated_blocks(text, matches):
+        length = len(text)
+        for start in range(length):
+            for size in range(2, (length - start) // 2 + 1):
+                block = text[start:start + size]
+                if text.startswith(block, start + size) and block not in (block + block)[1:-1]:
+                    bits = sum(_char_bits(char) for char in block)
+                    copies = 2
+                    while True:
+                        end = start + size * copies
+                        matches[end].append((start, bits + math.log2(copies), 'repeat'))
+                        if not text.startswith(block, end):
+                            break
+                        copies += 1
+
+
+WARNING_ORDER = ('common', 'personal', 'word', 'keyboard', 'sequence', 'repeat', 'year')
+WARNINGS = {
+    'common': 'Contains a commonly used password',
+    'personal': 'Contains the username or service name',
+    'word': 'Contains a dictionary word',
+    'keyboard': 'Contains a keyboard pattern',
+    'sequence': 'Contains a predictable sequence',
+    'repeat': 'Contains repeated characters',
+    'year': 'Contains a year',
+}
+
+
+def load_ranked(path):
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        return [line.strip() for line in f if line.strip()]
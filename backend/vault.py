@@ -0,0 +1,108 @@
+import hashlib
+import os
+from collections import namedtuple
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # cryptography нужен только для зашифрованного хранилища
+    AESGCM = None
+
+AVAILABLE = AESGCM is not None
+
+# Ключи: data key пользователя (AES-256) шифрует записи, сам он хранится
+# зашифрованным ключом, выведенным scrypt из мастер-пароля. Смена параметров
+# KDF не ломает старые записи: параметры лежат рядом с солью.
+# Формат шифртекста: байт версии, 12 байт nonce, AES-GCM (данные и тег)
+FORMAT = 1
+NONCE_BYTES = 12
+TAG_BYTES = 16
+KEY_BYTES = 32
+SALT_BYTES = 16
+DEFAULT_KDF_N = 2 ** 15
+DEFAULT_KDF_R = 8
+DEFAULT_KDF_P = 1
+
+KeyRecord = namedtuple('KeyRecord', 'salt kdf_n kdf_r kdf_p wrapped_key')
+
+
+class VaultError(Exception):
+    pass
+
+
+class InvalidMasterPassword(VaultError):
+    pass
+
+
+def derive_key(password: str, salt: bytes, n=DEFAULT_KDF_N, r=DEFAULT_KDF_R, p=DEFAULT_KDF_P) -> bytes:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * (n + p), dklen=KEY_BYTES)
+
+
+def seal(cipher, plaintext: bytes, aad: bytes) -> bytes:
+    nonce = os.urandom(NONCE_BYTES)
+    return bytes([FORMAT]) + nonce + cipher.encrypt(nonce, plaintext, aad)
+
+
+def unseal(cipher, blob: bytes, aad: bytes) -> bytes:
+    blob = bytes(blob)
+    if len(blob) < 1 + NONCE_BYTES + TAG_BYTES or blob[0] != FORMAT:
+        raise VaultError('Unsupported ciphertext format')
+    try:
+        return cipher.decrypt(blob[1:1 + NONCE_BYTES], blob[1 + NONCE_BYTES:], aad)
+    except InvalidTag:
+        raise VaultError('Ciphertext failed authentication')
+
+
+# Дополнительные данные AEAD привязывают шифртекст к владельцу и сервису:
+# запись, перенесённую в чужую строку таблицы, расшифровать не получится
+def _key_aad(username):
+    return b'key\0' + username.encode('utf-8')
+
+
+def _entry_aad(username, service):
+    return b'entry\0' + username.encode('utf-8') + b'\0' + service.encode('utf-8')
+
+
+def create_user_key(username: str, password: str, n=DEFAULT_KDF_N, r=DEFAULT_KDF_R,
+                    p=DEFAULT_KDF_P):
+    salt = os.urandom(SALT_BYTES)
+    data_key = AESGCM.generate_key(bit_length=8 * KEY_BYTES)
+    wrapping = AESGCM(derive_key(password, salt, n, r, p))
+    return KeyRecord(salt, n, r, p, seal(wrapping, data_key, _key_aad(username))), data_key
+
+
+def unwrap_user_key(username: str, password: str, record: KeyRecord) -> bytes:
+    wrapping = AESGCM(derive_key(password, bytes(record.salt), record.kdf_n, record.kdf_r,
+                                 record.kdf_p))
+    try:
+        return unseal(wrapping, record.wrapped_key, _key_aad(username))
+    except VaultError:
+        raise InvalidMasterPassword('Master password does not unlock the vault')
+
+
+def encrypt_secret(data_key: bytes, username: str, service: str, secret: str) -> bytes:
+    return seal(AESGCM(data_key), secret.encode('utf-8'), _entry_aad(username, service))
+
+
+def decrypt_secret(data_key: bytes, username: str, service: str, blob: bytes) -> str:
+    return unseal(AESGCM(data_key), blob, _entry_aad(username, service)).decode('utf-8')
+
+
+# Пакетное шифрование и расшифровка: один объект AESGCM на пакет
+def encrypt_secrets(data_key: bytes, username: str, entries: dict) -> dict:
+    cipher = AESGCM(data_key)
+    return {
+        service: seal(cipher, secret.encode('utf-8'), _entry_aad(username, service))
+        for service, secret in entries.items()
+    }
+
+
+# rows: (service, blob); для повреждённых записей вместо текста - None
+def decrypt_secrets(data_key: bytes, username: str, rows):
+    cipher = AESGCM(data_key)
+    for service, blob in rows:
+        try:
+            yield service, unseal(cipher, blob, _entry_aad(username, service)).decode('utf-8')
+        except VaultError:
+            yield service, None
@@ -0,0 +1,214 @@
+# Встроенные словари: распространённые пароли (по убыванию частоты) и
+# слова для парольных фраз. Больший список паролей можно подключить через
+# PASSWORD_DICTIONARY_FILE, слов - через PASSPHRASE_WORDS_FILE
+
+
+def _split(text):
+    return tuple(dict.fromkeys(text.split()))
+
+
+COMMON_PASSWORDS = _split("""
+123456 password 12345678 qwerty 123456789 12345 1234 111111 1234567 dragon
+123123 baseball abc123 football monkey letmein 696969 shadow master 666666
+qwertyuiop 123321 mustang 1234567890 michael 654321 superman 1qaz2wsx 7777777
+121212 000000 qazwsx 123qwe killer trustno1 jordan jennifer zxcvbnm asdfgh
+hunter buster soccer harley batman andrew tigger sunshine iloveyou 2000
+charlie robert thomas hockey ranger daniel starwars klaster 112233 george
+computer michelle jessica pepper 1111 zxcvbn 555555 11111111 131313 freedom
+777777 pass maggie 159753 aaaaaa ginger princess joshua cheese amanda summer
+love ashley nicole chelsea biteme matthew access yankees 987654321 dallas
+austin thunder taylor matrix mobilemail mom monitor monitoring montana moon
+moscow william corvette hello martin heather secret merlin diamond 1234qwer
+gfhjkm hammer silver 222222 88888888 anthony justin test bailey q1w2e3r4t5
+patrick internet scooter orange 11111 golfer cookie richard samantha bigdog
+guitar jackson whatever mickey chicken sparky snoopy maverick phoenix camaro
+peanut morgan welcome falcon cowboy ferrari samsung andrea smokey steelers
+joseph mercedes dakota arsenal eagles melissa boomer booboo spider nascar
+monster tigers yellow xxxxxx 123123123 gateway marina diablo bulldog qwer1234
+compaq purple hardcore banana junior hannah 123654 porsche lakers iceman
+money cowboys 987654 london tennis 999999 ncc1701 coffee scooby 0000 miller
+boston q1w2e3r4 brandon yamaha chester mother forever johnny edward 333333
+oliver redsox player nikita knight fender barney midnight please brandy
+chicago badboy slayer rangers charles angel flower rabbit wizard
+jasper enter rachel chris steven winner adidas victoria natasha 1q2w3e4r
+jasmine winter prince marine ghbdtn fishing cocacola casper james
+232323 raiders 888888 marlboro gandalf asdfasdf crystal 87654321 12344321
+golden 8675309 dolphin 1q2w3e sandra kimberly marlin hello123 lovely
+password1 password123 password12 passw0rd p@ssword p@ssw0rd qwerty123
+qwerty1 admin admin123 administrator root toor guest login changeme default
+welcome1 letmein1 abc12345 iloveyou1 monkey1 dragon1 trustno1 sunshine1
+football1 baseball1 master1 shadow1 superman1 princess1 azerty 1qazxsw2
+zaq12wsx qazwsxedc 1qaz2wsx3edc asdfghjkl asdf1234 zxcvbnm1 qwertyu
+11223344 123abc abcdef abcd1234 a1b2c3 aa123456 1234abcd 000000000 121314
+test123 test1 testing demo temp temp123 secret1 love123 hello1 hi123
+123456a 123456q a123456 q123456 654321a 159357 147258 147258369 258456
+789456 456789 147852 963852 741852963 135790 102030 112358 314159
+""")
+
+WORDS = _split("""
+able about above accept account acid across act action active actor add
+address adult advice afraid after again age agent agree ahead air alarm
+album alert alien alive alley allow almost alone along alpha already also
+always amber amount anchor angle animal ankle answer anyone apart apple
+april arch arctic area arena argue arm armor army around arrow art artist
+ask aspect atom attic audio august aunt author auto autumn avenue award
+aware away baby back bacon badge bag baker ball bamboo band bank banner
+barn barrel base basin basket batch bath battle beach beam bean bear beard
+beauty become bed bee beef before begin behind bell belt bench berry best
+better beyond bicycle big bike bird birth bitter black blade blanket blast
+blend bless blind block blood bloom blue blunt board boat body boil bold
+bolt bone bonus book boost boot border borrow boss bottle bottom bounce
+bowl box boy brain brand brass brave bread break breeze brick bridge brief
+bright bring broad bronze brook brother brown brush bubble bucket budget
+buffalo build bulb bulk bullet bundle bunny burden burger burst bus bush
+busy butter button buyer cabin cable cactus cage cake call calm camel
+camera camp canal candle candy cannon canoe canvas canyon capital captain
+car carbon card cargo carpet carrot cart case cash castle casual cat
+catch cattle cause cave ceiling celery cell cement census century cereal
+chain chair chalk champion change channel chapter charge chase cheap check
+cheese chef cherry chest chicken chief child chimney choice chorus cider
+cigar cinema circle citizen city civil claim clap clay clean clerk clever
+click client cliff climb clinic clock close cloth cloud clown club cluster
+coach coast coconut code coffee coil coin cold collect color column combine
+comet comfort comic common company concert conduct confirm copper copy
+coral core corn corner cost cotton couch country couple course cousin
+cover coyote crab craft crane crash crater crazy cream credit creek crew
+cricket crisp critic crop cross crowd crown cruise crumble crunch crush
+crystal cube culture cup cupboard curious current curtain curve cushion
+custom cycle dad damp dance danger daring dash daughter dawn day deal
+debate decade december decide deer defense degree delay delta demand dense
+deny depart depth deputy derive desert design desk detail device dial
+diamond diary diesel diet digital dinner dinosaur direct dirt discover
+dish dismiss display distance divide doctor document dog doll dolphin
+domain donkey door dose double dove draft dragon drama draw dream dress
+drift drill drink drip drive drop drum dry duck dune during dust duty
+dwarf eager eagle early earn earth easily east easy echo ecology edge
+edit educate effort egg eight elbow elder electric elegant element
+elephant elevator elite else embark ember emerge empty enact end endless
+energy engine enjoy enough enrich enter entire entry envelope episode
+equal equip erase erode error escape essay estate eternal evening event
+evidence evil evolve exact example excess exchange excite exercise exhaust
+exile exist exit exotic expand expect expert explain express extend extra
+eye fabric face fact fade faint faith fall false fame family famous fan
+fancy fantasy farm fashion fat father fault favorite feather february
+fence festival fever few fiber fiction field figure file film filter final
+find finger finish fire firm first fiscal fish fit fitness flag flame
+flash flat flavor flight flip float flock floor flower fluid flush fly
+foam focus fog foil fold follow food foot force forest forget fork fortune
+forum forward fossil foster found fox fragile frame frequent fresh friend
+fringe frog front frost frozen fruit fuel fun funny furnace fury future
+gadget gain galaxy gallery game gap garage garden garlic garment gas gate
+gather gauge gaze general genius genre gentle genuine gesture ghost giant
+gift giggle ginger giraffe girl give glad glance glare glass glide glimpse
+globe gloom glory glove glow glue goat goddess gold good goose gorilla
+gospel gossip govern gown grab grace grain grant grape grass gravity great
+green grid grief grit grocery group grow grunt guard guess guide guilt
+guitar gun gym habit hair half hammer hamster hand happy harbor hard harsh
+harvest hat have hawk hazard head health heart heavy hedgehog height hello
+helmet help hen hero hidden high hill hint hip hire history hobby hockey
+hold hole holiday hollow home honey hood hope horn horse hospital host
+hotel hour hover hub huge human humble humor hundred hungry hunt hurdle
+hurry hurt husband hybrid ice icon idea identify idle ignore ill illegal
+image imitate immense immune impact impose improve impulse inch include
+income increase index indicate indoor industry infant inflict inform
+inhale inherit initial inject injury inmate inner innocent input inquiry
+insane insect inside inspire install intact interest into invest invite
+involve iron island isolate issue item ivory jacket jaguar jar jazz
+jealous jeans jelly jewel job join joke journey joy judge juice jump
+jungle junior junk just kangaroo keen keep ketchup key kick kid kidney
+kind kingdom kiss kit kitchen kite kitten kiwi knee knife knock know lab
+label labor ladder lady lake lamp language laptop large later latin laugh
+laundry lava law lawn lawsuit layer lazy leader leaf learn leave lecture
+left leg legal legend leisure lemon lend length lens leopard lesson letter
+level liberty library license life lift light like limb limit link lion
+liquid list little live lizard load loan lobster local lock logic lonely
+long loop lottery loud lounge love loyal lucky luggage lumber lunar lunch
+luxury lyrics machine mad magic magnet maid mail main major make mammal
+man manage mandate mango mansion manual maple marble march margin marine
+market marriage mask mass master match material math matrix matter maximum
+maze meadow mean measure meat mechanic medal media melody melt member
+memory mention menu mercy merge merit merry mesh message metal method
+middle midnight milk million mimic mind minimum minor minute miracle
+mirror misery miss mistake mix mixed mixture mobile model modify mom
+moment monitor monkey monster month moon moral more morning mosquito
+mother motion motor mountain mouse move movie much muffin mule multiply
+muscle museum mushroom music must mutual myself mystery myth naive name
+napkin narrow nasty nation nature near neck need negative neglect neither
+nephew nerve nest net network neutral never news next nice night noble
+noise nominee noodle normal north nose notable note nothing notice novel
+now nuclear number nurse nut oak obey object oblige obscure observe obtain
+obvious occur ocean october odor off offer office often oil okay old olive
+olympic omit once one onion online only open opera opinion oppose option
+orange orbit orchard order ordinary organ orient original orphan ostrich
+other outdoor outer output outside oval oven over own owner oxygen oyster
+ozone pact paddle page pair palace palm panda panel panic panther paper
+parade parent park parrot party pass patch path patient patrol pattern
+pause pave payment peace peanut pear peasant pelican pen penalty pencil
+people pepper perfect permit person pet phone photo phrase physical piano
+picnic picture piece pig pigeon pill pilot pink pioneer pipe pistol pitch
+pizza place planet plastic plate play please pledge pluck plug plunge poem
+poet point polar pole police pond pony pool popular portion position
+possible post potato pottery poverty powder power practice praise predict
+prefer prepare present pretty prevent price pride primary print priority
+prison private prize problem process produce profit program project
+promote proof property prosper protect proud provide public pudding pull
+pulp pulse pumpkin punch pupil puppy purchase purity purpose purse push
+put puzzle pyramid quality quantum quarter question quick quit quiz quote
+rabbit raccoon race rack radar radio rail rain raise rally ramp ranch
+random range rapid rare rate rather raven raw razor ready real reason
+rebel rebuild recall receive recipe record recycle reduce reflect reform
+refuse region regret regular reject relax release relief rely remain
+remember remind remove render renew rent reopen repair repeat replace
+report require rescue resemble resist resource response result retire
+retreat return reunion reveal review reward rhythm rib ribbon rice rich
+ride ridge rifle right rigid ring riot ripple risk ritual rival river road
+roast robot robust rocket romance roof rookie room rose rotate rough round
+route royal rubber rude rug rule run runway rural sad saddle sadness safe
+sail salad salmon salon salt salute same sample sand satisfy satoshi sauce
+sausage save say scale scan scare scatter scene scheme school science
+scissors scorpion scout scrap screen script scrub sea search season seat
+second secret section security seed seek segment select sell seminar
+senior sense sentence series service session settle setup seven shadow
+shaft shallow share shed shell sheriff shield shift shine ship shiver
+shock shoe shoot shop short shoulder shove shrimp shrug shuffle shy
+sibling sick side siege sight sign silent silk silly silver similar
+simple since sing siren sister situate six size skate sketch ski skill
+skin skirt skull slab slam sleep slender slice slide slight slim slogan
+slot slow slush small smart smile smoke smooth snack snake snap sniff
+snow soap soccer social sock soda soft solar soldier solid solution solve
+someone song soon sorry sort soul sound soup source south space spare
+spatial spawn speak special speed spell spend sphere spice spider spike
+spin spirit split spoil sponsor spoon sport spot spray spread spring spy
+square squeeze squirrel stable stadium staff stage stairs stamp stand
+start state stay steak steel stem step stereo stick still sting stock
+stomach stone stool story stove strategy street strike strong struggle
+student stuff stumble style subject submit subway success such sudden
+suffer sugar suggest suit summer sun sunny sunset super supply supreme
+sure surface surge surprise surround survey suspect sustain swallow swamp
+swap swarm swear sweet swift swim swing switch sword symbol symptom syrup
+system table tackle tag tail talent talk tank tape target task taste
+tattoo taxi teach team tell ten tenant tennis tent term test text thank
+that theme then theory there they thing this thought three thrive throw
+thumb thunder ticket tide tiger tilt timber time tiny tip tired tissue
+title toast tobacco today toddler toe together toilet token tomato
+tomorrow tone tongue tonight tool tooth top topic topple torch tornado
+tortoise toss total tourist toward tower town toy track trade traffic
+tragic train transfer trap trash travel tray treat tree trend trial tribe
+trick trigger trim trip trophy trouble truck true truly trumpet trust
+truth try tube tuition tumble tuna tunnel turkey turn turtle twelve
+twenty twice twin twist two type typical ugly umbrella unable unaware
+uncle uncover under undo unfair unfold unhappy uniform unique unit
+universe unknown unlock until unusual unveil update upgrade uphold upon
+upper upset urban urge usage use used useful useless usual utility vacant
+vacuum vague valid valley valve van vanish vapor various vast vault
+vehicle velvet vendor venture venue verb verify version very vessel
+veteran viable vibrant vicious victory video view village vintage violin
+virtual virus visa visit visual vital vivid vocal voice void volcano
+volume vote voyage wage wagon wait walk wall walnut want warfare warm
+warrior wash wasp waste water wave way wealth weapon wear weasel weather
+web wedding weekend weird welcome west wet whale what wheat wheel when
+where whip whisper wide width wife wild will win window wine wing wink
+winner winter wire wisdom wise wish witness wolf woman wonder wood wool
+word work world worry worth wrap wreck wrestle wrist write wrong yard year
+yellow you young youth zebra zero zone zoo
+""")
@@ -4,5 +4,17 @@ setup(
     name="onepassword",
     version="0.1",
     packages=find_packages(),
+    package_dir={'': 'backend'},
+    py_modules=[
+        'app', 'asgi_app', 'audit', 'avatars', 'breached', 'cache', 'db_pool', 'db_session',
+        'generator', 'hashing', 'log_config', 'metrics', 'queries', 'ratelimit', 'retention',
+        'server', 'strength', 'vault', 'wordlists',
+    ],
+    entry_points={
+        'console_scripts': [
+            'onepassword-server = server:main',
+            'onepassword-logs = retention:main',
+            'onepassword-breached = breached:main',
+        ],
+    },
 )
-
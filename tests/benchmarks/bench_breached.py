@@ -0,0 +1,59 @@
+"""Индекс утёкших паролей: время сборки, задержка поиска и RSS процесса
+после открытия индекса и серии поисков.
+
+Запуск: python tests/benchmarks/bench_breached.py [--hashes 2000000] [--lookups 100000]
+Синтетический список хешей пишется во временный каталог и удаляется.
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from bench_common import time_calls, write_results
+import breached
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hashes', type=int, default=2_000_000)
+    parser.add_argument('--lookups', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, default=breached.DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'hashes.txt')
+        with open(source, 'w') as f:
+            for i in range(args.hashes):
+                f.write(f"{hashlib.sha1(f'leaked-{i}'.encode()).hexdigest().upper()}:1\n")
+        path = os.path.join(tmp, 'breached.idx')
+        started = time.perf_counter()
+        breached.build_index([source], path, chunk_size=args.chunk_size)
+        results = {'hashes': args.hashes, 'build_s': time.perf_counter() - started,
+                   'index_mb': os.path.getsize(path) / 1024 / 1024, 'rss_before_mb': rss_mb()}
+
+        index = breached.BreachedIndex(path)
+        results['rss_opened_mb'] = rss_mb()
+        hits = [(f"leaked-{i * 7919 % args.hashes}",) for i in range(args.lookups)]
+        misses = [(f"unknown-{i}",) for i in range(args.lookups)]
+        results['lookup_hit'] = time_calls(index.__contains__, hits)
+        results['lookup_miss'] = time_calls(index.__contains__, misses)
+        results['rss_after_lookups_mb'] = rss_mb()
+        index.close()
+
+    print(json.dumps(results, indent=2))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+DB_CONFIG = {
+    'dbname': os.getenv("DB_NAME", "OneBad"),
+    'user': os.getenv("DB_USER", "ivanmerzov"),
+    'password': os.getenv("DB_PASSWORD", "Vania_505"),
+    'host': os.getenv("DB_HOST", "localhost"),
+    'port': os.getenv("DB_PORT", "5432")
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples_ms, elapsed=None):
+    result = {
+        'count': len(samples_ms),
+        'mean_ms': statistics.mean(samples_ms),
+        'p50_ms': percentile(samples_ms, 50),
+        'p95_ms': percentile(samples_ms, 95),
+        'p99_ms': percentile(samples_ms, 99),
+    }
+    if elapsed:
+        result['rps'] = len(samples_ms) / elapsed
+    return result
+
+
+def time_calls(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+# Запускает fn(worker, i) в concurrency потоках, всего requests вызовов
+def run_concurrent(fn, requests, concurrency):
+    samples = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker(worker_id):
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            fn(worker_id, i)
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def write_results(path, results):
+    if path:
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Одноразовый экземпляр PostgreSQL во временном каталоге: initdb, запуск на
+# свободном порту с unix-сокетом в том же каталоге, схема из schema.sql.
+# Нужны initdb и pg_ctl в PATH или в каталоге pg_bin
+@contextmanager
+def disposable_postgres(pg_bin=None):
+    import psycopg2
+
+    initdb = shutil.which('initdb', path=pg_bin)
+    pg_ctl = shutil.which('pg_ctl', path=pg_bin)
+    if not initdb or not pg_ctl:
+        raise RuntimeError('initdb and pg_ctl are required for a disposable PostgreSQL instance')
+
+    datadir = tempfile.mkdtemp(prefix='bench-pg-')
+    port = _free_port()
+    try:
+        subprocess.run([initdb, '-D', datadir, '-U', 'bench', '--auth=trust', '-E', 'UTF8'],
+                       check=True, capture_output=True)
+        subprocess.run([pg_ctl, '-D', datadir, '-l', os.path.join(datadir, 'server.log'), '-w',
+                        '-o', f"-p {port} -k {datadir} -c listen_addresses=''", 'start'],
+                       check=True, capture_output=True)
+        config = {'dbname': 'postgres', 'user': 'bench', 'password': '',
+                  'host': datadir, 'port': str(port)}
+        conn = psycopg2.connect(**config)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute('CREATE DATABASE bench')
+        conn.close()
+
+        config['dbname'] = 'bench'
+        conn = psycopg2.connect(**config)
+        with conn, conn.cursor() as cur, open(SCHEMA_FILE) as f:
+            cur.execute(f.read())
+        conn.close()
+        yield config
+    finally:
+        subprocess.run([pg_ctl, '-D', datadir, '-m', 'fast', 'stop'], capture_output=True)
+        shutil.rmtree(datadir, ignore_errors=True)
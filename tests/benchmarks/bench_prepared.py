@@ -0,0 +1,76 @@
+"""Задержка запросов verify_service_password и get_user_services:
+текст запроса при каждом вызове против PREPARE один раз на соединение.
+
+Запуск: python tests/benchmarks/bench_prepared.py [--calls 5000] [--services 50]
+Тестовый пользователь bench_prepared_user удаляется в конце.
+"""
+import argparse
+import json
+
+import psycopg2
+
+from bench_common import DB_CONFIG, time_calls, write_results
+import queries  # после bench_common: он добавляет backend/ в sys.path
+
+USERNAME = 'bench_prepared_user'
+FAKE_HASH = '$2b$12$' + 'x' * 53
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--services', type=int, default=50)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    plain = psycopg2.connect(**DB_CONFIG)
+    prepared = psycopg2.connect(**DB_CONFIG, connection_factory=queries.PreparingConnection)
+    try:
+        with plain.cursor() as cur:
+            cur.execute(
+                """INSERT INTO passwords (username, service, password_hash)
+                   SELECT %s, 'svc_' || g, %s FROM generate_series(0, %s) AS g
+                   ON CONFLICT DO NOTHING""",
+                (USERNAME, FAKE_HASH, args.services - 1)
+            )
+        plain.commit()
+
+        lookups = [(f"svc_{i % args.services}",) for i in range(args.calls)]
+        results = {}
+        for name, conn in (('text', plain), ('prepared', prepared)):
+            with conn.cursor() as cur:
+                if name == 'text':
+                    def service_password(service):
+                        cur.execute(queries.GET_SERVICE_PASSWORD.text, (USERNAME, service))
+                        return cur.fetchone()
+
+                    def services():
+                        cur.execute(queries.LIST_SERVICES.text, (USERNAME,))
+                        return cur.fetchall()
+                else:
+                    def service_password(service):
+                        return queries.get_service_password(cur, USERNAME, service)
+
+                    def services():
+                        return queries.list_services(cur, USERNAME)
+
+                # Прогрев: первое выполнение готовит запрос
+                service_password('svc_0')
+                services()
+                results[name] = {
+                    'verify_service_password': time_calls(service_password, lookups),
+                    'get_user_services': time_calls(services, [()] * args.calls),
+                }
+            conn.rollback()
+        print(json.dumps(results, indent=2))
+        write_results(args.output, results)
+    finally:
+        with plain.cursor() as cur:
+            cur.execute("DELETE FROM passwords WHERE username = %s", (USERNAME,))
+        plain.commit()
+        plain.close()
+        prepared.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Бенчмарк /save_password: прежняя схема (три соединения, два bcrypt)
+против текущей (одна транзакция, один bcrypt, аудит в фоне).
+
+Запуск: python tests/benchmarks/bench_save_password.py [--requests 200 --concurrency 8]
+"""
+import argparse
+import json
+import os
+
+import bcrypt
+import psycopg2
+
+from bench_common import DB_CONFIG, run_concurrent, write_results
+
+USERNAME = 'bench_save_user'
+
+
+# Повторяет поток запросов до изменения: SELECT, hash(hash(password)), upsert, аудит
+def legacy_save(service, password, rounds):
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT password_hash FROM passwords WHERE username = %s AND service = %s",
+        (USERNAME, service)
+    )
+    existing = cur.fetchone()
+    cur.close()
+    conn.close()
+
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    double_hash = bcrypt.hashpw(password_hash.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute(
+        """INSERT INTO passwords (username, service, password_hash)
+           VALUES (%s, %s, %s)
+           ON CONFLICT (username, service)
+           DO UPDATE SET password_hash = EXCLUDED.password_hash""",
+        (USERNAME, service, double_hash)
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute(
+        """INSERT INTO password_logs
+           (username, service, action_type, old_password_hash, new_password_hash, status)
+           VALUES (%s, %s, %s, %s, %s, %s)""",
+        (USERNAME, service, 'UPDATE' if existing else 'CREATE',
+         existing[0] if existing else None, password_hash, 'SUCCESS')
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def setup(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO users (username, password_hash) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (USERNAME, 'x')
+        )
+    conn.commit()
+
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM password_logs WHERE username = %s", (USERNAME,))
+        cur.execute("DELETE FROM passwords WHERE username = %s", (USERNAME,))
+        cur.execute("DELETE FROM users WHERE username = %s", (USERNAME,))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--services', type=int, default=20)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    # Токен выдаётся без входа, поэтому ключ хранилища не открыт
+    os.environ.setdefault('VAULT_ENABLED', '0')
+    import app as backend
+
+    backend.create_app()
+
+    rounds = backend.app.config['BCRYPT_ROUNDS']
+    token = backend.generate_tokens(USERNAME)['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    clients = [backend.app.test_client() for _ in range(args.concurrency)]
+
+    def current(worker, i):
+        response = clients[worker].post('/save_password', headers=headers, json={
+            'service': f'service-{i % args.services}',
+            'password': f'Bench#Vault-7q2Lx9-{i}'
+        })
+        assert response.status_code == 201, response.get_json()
+
+    def legacy(worker, i):
+        legacy_save(f'service-{i % args.services}', f'Bench#Vault-7q2Lx9-{i}', rounds)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        setup(conn)
+        results = {
+            'legacy': run_concurrent(legacy, args.requests, args.concurrency),
+            'current': run_concurrent(current, args.requests, args.concurrency),
+        }
+        results['speedup'] = results['current']['rps'] / results['legacy']['rps']
+        print(json.dumps(results, indent=2))
+    finally:
+        backend.get_audit_writer().stop()
+        cleanup(conn)
+        conn.close()
+
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
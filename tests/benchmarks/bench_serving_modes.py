@@ -0,0 +1,78 @@
+"""Нагрузочное сравнение режимов WSGI (Flask) и ASGI (asgi_app.py).
+
+Оба сервера запускаются заранее на одной базе, например:
+    python backend/app.py                                       # :5000
+    uvicorn asgi_app:application --app-dir backend --port 5001  # :5001
+Запуск: python tests/benchmarks/bench_serving_modes.py \\
+            --wsgi-url http://localhost:5000 --asgi-url http://localhost:5001
+"""
+import argparse
+import json
+import threading
+
+import requests
+
+from bench_common import run_concurrent, write_results
+
+USERNAME = 'bench_modes_user'
+PASSWORD = 'Bench#Vault-7q2Lx9'
+
+
+def login(base_url):
+    requests.post(f'{base_url}/register', json={'username': USERNAME, 'password': PASSWORD}, timeout=30)
+    response = requests.post(f'{base_url}/login', json={'username': USERNAME, 'password': PASSWORD}, timeout=30)
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def drive(base_url, token, endpoint, requests_total, concurrency):
+    local = threading.local()
+    headers = {'Authorization': f'Bearer {token}'}
+    failures = []
+
+    def call(worker, i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        if endpoint == '/get_services':
+            response = session.get(f'{base_url}/get_services', headers=headers, timeout=30)
+        elif endpoint == '/verify_password':
+            response = session.post(f'{base_url}/verify_password', headers=headers, timeout=30,
+                                    json={'service': 'bench', 'password': PASSWORD})
+        else:
+            response = session.post(f'{base_url}/login', timeout=30,
+                                    json={'username': USERNAME, 'password': PASSWORD})
+        if response.status_code >= 400:
+            failures.append(response.status_code)
+
+    result = run_concurrent(call, requests_total, concurrency)
+    result['errors'] = len(failures)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wsgi-url', default='http://localhost:5000')
+    parser.add_argument('--asgi-url', default='http://localhost:5001')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', default='16,64,256')
+    parser.add_argument('--endpoints', default='/get_services,/verify_password,/login')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    token = login(args.wsgi_url)
+    results = []
+    for endpoint in args.endpoints.split(','):
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            requests_total = args.requests if endpoint == '/get_services' else args.requests // 10
+            row = {'endpoint': endpoint, 'concurrency': concurrency}
+            for mode, url in (('wsgi', args.wsgi_url), ('asgi', args.asgi_url)):
+                row[mode] = drive(url, token, endpoint, requests_total, concurrency)
+            results.append(row)
+            print(json.dumps(row))
+
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Время холодного старта: импорт app.py, create_app() и первый запрос.
+
+Каждый замер - отдельный процесс интерпретатора. База не нужна:
+первый запрос идёт на /metrics, который к ней не обращается.
+Запуск: python tests/benchmarks/bench_startup.py [--runs 20]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_common import BACKEND_DIR, summarize, write_results
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import app as backend
+imported = time.perf_counter()
+backend.create_app()
+created = time.perf_counter()
+backend.app.test_client().get('/metrics')
+served = time.perf_counter()
+print(json.dumps([(imported - started) * 1000, (created - started) * 1000,
+                  (served - started) * 1000]))
+"""
+
+
+def cold_start():
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD.format(backend=os.path.abspath(BACKEND_DIR))],
+            cwd=cwd, env=dict(os.environ, LOG_CONSOLE='0'),
+            capture_output=True, text=True, check=True
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    runs = [cold_start() for _ in range(args.runs)]
+    results = {
+        'import': summarize([run[0] for run in runs]),
+        'create_app': summarize([run[1] for run in runs]),
+        'first_request': summarize([run[2] for run in runs]),
+    }
+    print(json.dumps(results, indent=2))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Задержка оценки стойкости (проверка в /save_password) и генерации
+паролей по политикам /generate_password. База данных не нужна.
+
+Запуск: python tests/benchmarks/bench_strength.py [--calls 20000]
+"""
+import argparse
+import json
+import time
+
+from bench_common import time_calls, write_results
+import generator
+from strength import StrengthEstimator
+
+SAMPLES = ('password-5', 'P@ssw0rd2024', 'Bench#Vault-7q2Lx9', 'correct-horse-battery-staple',
+           'Xk9#mQ2$vL8@pR4!wZ6^', 'qwertyuiop1234567890')
+POLICIES = {
+    'random_16': {'mode': 'random', 'length': 16},
+    'random_64': {'mode': 'random', 'length': 64},
+    'pronounceable_16': {'mode': 'pronounceable', 'length': 16},
+    'passphrase_6': {'mode': 'passphrase', 'words': 6},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    estimator = StrengthEstimator()
+    results = {'build_ms': (time.perf_counter() - started) * 1000, 'entries': len(estimator)}
+
+    calls = [(SAMPLES[i % len(SAMPLES)], ('alice', 'mail')) for i in range(args.calls)]
+    results['estimate'] = time_calls(estimator.estimate, calls)
+    for name, data in POLICIES.items():
+        policy = generator.parse_policy(data)
+        results[f'generate_{name}'] = time_calls(lambda: list(generator.generate(policy)),
+                                                 [()] * (args.calls // 10))
+    print(json.dumps(results, indent=2))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Нагрузочный набор для эндпоинтов входа и хранилища паролей.
+
+Заполняет базу пользователями, сервисами и строками логов (префикс
+bench_suite_), прогоняет сценарии при фиксированной конкурентности и
+пишет пропускную способность и перцентили задержки в JSON для сравнения
+между коммитами.
+
+Режимы:
+    python tests/benchmarks/bench_suite.py --output before.json
+        приложение в этом же процессе (Flask test client), база из DB_*
+    python tests/benchmarks/bench_suite.py --disposable --output before.json
+        то же на временном экземпляре PostgreSQL (нужны initdb и pg_ctl)
+    python tests/benchmarks/bench_suite.py --base-url http://localhost:5000
+        запущенный сервер; ограничение частоты входа нужно поднять, например
+        LOGIN_RATE_LIMIT_IP=1000000 LOGIN_RATE_LIMIT_USER=1000000
+
+Сравнение: python tests/benchmarks/bench_suite.py ... --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import threading
+import time
+
+import bcrypt
+import psycopg2
+
+from bench_common import DB_CONFIG, disposable_postgres, git_revision, run_concurrent, write_results
+
+PREFIX = 'bench_suite_'
+PASSWORD = 'Bench#Vault-7q2Lx9'
+TABLES = ('users', 'passwords', 'profiles', 'user_logs', 'password_logs')
+
+# Сценарии с bcrypt на порядок медленнее, для них запросов в 10 раз меньше
+BCRYPT_SCENARIOS = {'register', 'login', 'save_password', 'verify_password'}
+ALL_SCENARIOS = ('register', 'login', 'save_password', 'verify_password',
+                 'get_services', 'get_user_logs', 'get_password_logs')
+
+
+def username(n):
+    return f"{PREFIX}u{n}"
+
+
+def seed(conn, users, services, log_rows, rounds):
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    with conn.cursor() as cur:
+        cur.execute(
+            """INSERT INTO users (username, password_hash)
+               SELECT %s || 'u' || g, %s FROM generate_series(0, %s) AS g""",
+            (PREFIX, password_hash, users - 1)
+        )
+        cur.execute(
+            """INSERT INTO passwords (username, service, password_hash)
+               SELECT %s || 'u' || u, 'svc_' || s, %s
+               FROM generate_series(0, %s) AS u, generate_series(0, %s) AS s""",
+            (PREFIX, password_hash, users - 1, services - 1)
+        )
+        cur.execute(
+            """INSERT INTO user_logs
+               (username, action_type, ip_address, user_agent, status, created_at)
+               SELECT %s || 'u' || (g %% %s), 'LOGIN', '127.0.0.1', 'bench', 'SUCCESS',
+                      now() - g * interval '1 second'
+               FROM generate_series(0, %s) AS g""",
+            (PREFIX, users, users * log_rows - 1)
+        )
+        cur.execute(
+            """INSERT INTO password_logs
+               (username, service, action_type, ip_address, user_agent, status, created_at)
+               SELECT %s || 'u' || (g %% %s), 'svc_' || (g %% %s), 'CREATE_OR_UPDATE',
+                      '127.0.0.1', 'bench', 'SUCCESS', now() - g * interval '1 second'
+               FROM generate_series(0, %s) AS g""",
+            (PREFIX, users, services, users * log_rows - 1)
+        )
+        for table in TABLES:
+            cur.execute(f"ANALYZE {table}")
+    conn.commit()
+
+
+def cleanup(conn):
+    pattern = PREFIX.replace('_', r'\_') + '%'
+    with conn.cursor() as cur:
+        for table in TABLES:
+            cur.execute(f"DELETE FROM {table} WHERE username LIKE %s", (pattern,))
+    conn.commit()
+
+
+class InProcessDriver:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None, token=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        response = client.open(path, method=method, json=payload, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpDriver:
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self._requests = requests
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None, token=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        response = session.request(method, self.base_url + path, json=payload,
+                                   headers=headers, timeout=60)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+
+def make_scenarios(users, services, tokens, run_id):
+    def token(i):
+        return tokens[i % len(tokens)]
+
+    return {
+        'register': lambda d, i: d.request('POST', '/register', {
+            'username': f"{PREFIX}new_{run_id}_{i}", 'password': PASSWORD}),
+        'login': lambda d, i: d.request('POST', '/login', {
+            'username': username(i % users), 'password': PASSWORD}),
+        'save_password': lambda d, i: d.request('POST', '/save_password', {
+            'service': f"new_{run_id}_{i}", 'password': PASSWORD}, token(i)),
+        'verify_password': lambda d, i: d.request('POST', '/verify_password', {
+            'service': f"svc_{i % services}", 'password': PASSWORD}, token(i)),
+        'get_services': lambda d, i: d.request('GET', '/get_services', token=token(i)),
+        'get_user_logs': lambda d, i: d.request('GET', '/get_user_logs?limit=50', token=token(i)),
+        'get_password_logs': lambda d, i: d.request('GET', '/get_password_logs?limit=50',
+                                                    token=token(i)),
+    }
+
+
+def drive(driver, scenario, requests_total, concurrency):
+    statuses = {}
+    lock = threading.Lock()
+
+    def call(worker, i):
+        status, _ = scenario(driver, i)
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+
+    result = run_concurrent(call, requests_total, concurrency)
+    result['errors'] = sum(count for status, count in statuses.items() if status >= 400)
+    result['status_counts'] = {str(status): count for status, count in sorted(statuses.items())}
+    return result
+
+
+def compare(previous_path, results):
+    with open(previous_path) as f:
+        previous = {(row['scenario'], row['concurrency']): row for row in json.load(f)['results']}
+    print(f"{'scenario':<20}{'conc':>6}{'rps':>22}{'p99 ms':>18}")
+    for row in results:
+        old = previous.get((row['scenario'], row['concurrency']))
+        if old is None:
+            continue
+        rps = f"{old['rps']:.1f} -> {row['rps']:.1f}"
+        p99 = f"{old['p99_ms']:.1f} -> {row['p99_ms']:.1f}"
+        change = (row['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100 if old['p99_ms'] else 0.0
+        print(f"{row['scenario']:<20}{row['concurrency']:>6}{rps:>22}{p99:>18} ({change:+.0f}%)")
+
+
+def run(args, db_config):
+    rounds = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    conn = psycopg2.connect(**db_config)
+    backend = None
+    try:
+        cleanup(conn)
+        seed(conn, args.users, args.services, args.log_rows, rounds)
+        seeded_users = [username(n) for n in random.sample(range(args.users), min(args.users, 32))]
+
+        if args.base_url:
+            driver = HttpDriver(args.base_url)
+            tokens = []
+            for name in seeded_users:
+                status, body = driver.request('POST', '/login', {'username': name, 'password': PASSWORD})
+                if status != 200:
+                    raise RuntimeError(f"Login for {name} failed with {status}: {body}")
+                tokens.append(body['access_token'])
+        else:
+            # Приложение в этом процессе: те же параметры БД, вход без ограничений
+            os.environ.setdefault('LOGIN_RATE_LIMIT_IP', '1000000000')
+            os.environ.setdefault('LOGIN_RATE_LIMIT_USER', '1000000000')
+            os.environ.setdefault('LOG_CONSOLE', '0')
+            # Токены выдаются без входа, ключ хранилища не открыт
+            os.environ.setdefault('VAULT_ENABLED', '0')
+            import app as backend
+
+            backend.DATABASE_CONFIG.update(db_config)
+            driver = InProcessDriver(backend.create_app())
+            tokens = [backend.generate_tokens(name)['access_token'] for name in seeded_users]
+
+        run_id = int(time.time())
+        scenarios = make_scenarios(args.users, args.services, tokens, run_id)
+        results = []
+        for name in args.scenarios.split(','):
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                requests_total = args.requests // 10 if name in BCRYPT_SCENARIOS else args.requests
+                row = {'scenario': name, 'concurrency': concurrency,
+                       **drive(driver, scenarios[name], max(1, requests_total), concurrency)}
+                results.append(row)
+                print(json.dumps(row))
+        return results
+    finally:
+        if backend is not None:
+            backend.release_resources()
+        if not args.keep_data:
+            cleanup(conn)
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', help='benchmark a running server instead of the app in-process')
+    parser.add_argument('--disposable', action='store_true',
+                        help='run against a temporary PostgreSQL instance (in-process mode only)')
+    parser.add_argument('--pg-bin', help='directory with initdb and pg_ctl')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--services', type=int, default=20)
+    parser.add_argument('--log-rows', type=int, default=50, help='user and password log rows per user')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--scenarios', default=','.join(ALL_SCENARIOS))
+    parser.add_argument('--keep-data', action='store_true', help='do not delete seeded rows')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    args = parser.parse_args()
+    if args.disposable and args.base_url:
+        parser.error('--disposable only works with the in-process mode')
+
+    meta = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'mode': 'http' if args.base_url else 'in-process',
+        'disposable': args.disposable,
+        'users': args.users,
+        'services': args.services,
+        'log_rows': args.log_rows,
+        'requests': args.requests,
+        'bcrypt_rounds': int(os.getenv('BCRYPT_ROUNDS', '12')),
+    }
+    if args.disposable:
+        with disposable_postgres(args.pg_bin) as db_config:
+            results = run(args, db_config)
+    else:
+        results = run(args, DB_CONFIG)
+
+    write_results(args.output, {'meta': meta, 'results': results})
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
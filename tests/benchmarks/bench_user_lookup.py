@@ -0,0 +1,82 @@
+"""Бенчмарк поиска пользователя при росте таблицы users (1k -> 1M строк).
+
+Запуск: python tests/benchmarks/bench_user_lookup.py [--sizes 1000,10000,100000,1000000]
+Тестовые пользователи создаются с префиксом bench_user_ и удаляются в конце.
+"""
+import argparse
+import json
+import random
+
+import psycopg2
+
+from bench_common import DB_CONFIG, time_calls, write_results
+
+PREFIX = 'bench_user_'
+# Хеш не проверяется, важен только размер строки
+FAKE_HASH = '$2b$12$' + 'x' * 53
+
+
+def seed_users(conn, start, stop):
+    with conn.cursor() as cur:
+        cur.execute(
+            """INSERT INTO users (username, password_hash)
+               SELECT %s || g, %s FROM generate_series(%s, %s) AS g
+               ON CONFLICT DO NOTHING""",
+            (PREFIX, FAKE_HASH, start, stop - 1)
+        )
+        cur.execute("ANALYZE users")
+    conn.commit()
+
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM users WHERE username LIKE %s", (PREFIX.replace('_', r'\_') + '%',))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--full-scan-limit', type=int, default=100000,
+                        help='largest table size to also time the old read_users() scan on')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    import app as backend
+
+    backend.create_app()
+
+    def full_scan(name):
+        with backend.get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT username, password_hash FROM users")
+            users = [{'username': row[0], 'password_hash': row[1]} for row in cur.fetchall()]
+        return next((user for user in users if user['username'] == name), None)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    results = []
+    seeded = 0
+    try:
+        for size in sorted(int(s) for s in args.sizes.split(',')):
+            seed_users(conn, seeded, size)
+            seeded = size
+            names = [(PREFIX + str(random.randrange(size)),) for _ in range(args.lookups)]
+
+            row = {
+                'users': size,
+                'get_user_by_name': time_calls(backend.get_user_by_name, names),
+                'user_exists': time_calls(backend.user_exists, names),
+            }
+            if size <= args.full_scan_limit:
+                row['full_scan'] = time_calls(full_scan, names[:max(1, args.lookups // 50)])
+            results.append(row)
+            print(json.dumps(row))
+    finally:
+        cleanup(conn)
+        conn.close()
+
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Расшифровка записей хранилища: вывод ключа из мастер-пароля на каждую
+запись против одного открытия ключа на сессию (кэш /passwords/decrypt).
+База данных не нужна, требуется пакет cryptography.
+
+Запуск: python tests/benchmarks/bench_vault.py [--entries 200]
+"""
+import argparse
+import json
+import time
+
+from bench_common import time_calls, write_results
+import vault
+
+MASTER_PASSWORD = 'Bench#Vault-7q2Lx9'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=200)
+    parser.add_argument('--kdf-n', type=int, default=vault.DEFAULT_KDF_N)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+    if not vault.AVAILABLE:
+        raise SystemExit('cryptography is not installed')
+
+    record, data_key = vault.create_user_key('alice', MASTER_PASSWORD, n=args.kdf_n)
+    secrets = vault.encrypt_secrets(data_key, 'alice', {
+        f'service-{i}': f'secret-{i}' for i in range(args.entries)
+    })
+    rows = list(secrets.items())
+
+    results = {'entries': args.entries, 'kdf_n': args.kdf_n}
+    results['unlock'] = time_calls(vault.unwrap_user_key, [('alice', MASTER_PASSWORD, record)] * 5)
+
+    # Без кэша: каждая запись открывается своим выводом ключа; замер на 20
+    # записях, пересчитанный на все
+    started = time.perf_counter()
+    for service, blob in rows[:20]:
+        vault.decrypt_secret(vault.unwrap_user_key('alice', MASTER_PASSWORD, record), 'alice', service, blob)
+    results['per_entry_kdf_estimated_ms'] = (time.perf_counter() - started) * 1000 / min(20, len(rows)) * len(rows)
+
+    # С кэшем: один вывод ключа, затем пакет
+    started = time.perf_counter()
+    key = vault.unwrap_user_key('alice', MASTER_PASSWORD, record)
+    list(vault.decrypt_secrets(key, 'alice', rows))
+    results['session_key_ms'] = (time.perf_counter() - started) * 1000
+    results['batch_decrypt'] = time_calls(lambda: list(vault.decrypt_secrets(data_key, 'alice', rows)),
+                                          [()] * 50)
+    print(json.dumps(results, indent=2))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+-- Схема для одноразового экземпляра PostgreSQL (bench_suite.py --disposable).
+-- Восстановлена по запросам backend/app.py; индексы создаёт init_db().
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS passwords (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(255) NOT NULL,
+    service VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    UNIQUE (username, service)
+);
+
+CREATE TABLE IF NOT EXISTS profiles (
+    username VARCHAR(255) PRIMARY KEY,
+    email VARCHAR(255),
+    avatar_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_logs (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(255),
+    action_type VARCHAR(50) NOT NULL,
+    ip_address VARCHAR(64),
+    user_agent TEXT,
+    status VARCHAR(20) NOT NULL,
+    details TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS password_logs (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(255),
+    service VARCHAR(255),
+    action_type VARCHAR(50) NOT NULL,
+    old_password_hash VARCHAR(255),
+    new_password_hash VARCHAR(255),
+    ip_address VARCHAR(64),
+    user_agent TEXT,
+    status VARCHAR(20) NOT NULL,
+    details TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
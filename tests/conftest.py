@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+# Тесты с create_app не пишут лог в консоль: фоновые потоки (аудит) могут
+# писать в него уже после того, как pytest закрыл перехваченный stderr
+os.environ.setdefault('LOG_CONSOLE', '0')
+
+import pytest
+
+import app as backend
+
+
+# Приложение с конфигурацией из окружения; файлы (логи) пишутся во временный каталог
+@pytest.fixture
+def flask_app(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    backend.create_app()
+    return backend.app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+# Заголовок с access-токеном: make_auth_headers('bob', 'session-2')
+@pytest.fixture
+def make_auth_headers(flask_app):
+    def make(username='alice', session_id=None):
+        token = backend.generate_tokens(username, session_id)['access_token']
+        return {'Authorization': f'Bearer {token}'}
+    return make
+
+
+@pytest.fixture
+def auth_headers(make_auth_headers):
+    return make_auth_headers()
+
+
+# Таблица revoked_tokens без PostgreSQL: отзывы общие для всего теста,
+# как у нескольких воркеров одной БД
+@pytest.fixture(autouse=True)
+def revoked_tokens(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(backend, 'is_token_revoked', lambda digest: digest in stored)
+    monkeypatch.setattr(backend, 'store_revoked_token', stored.__setitem__)
+    backend._token_cache.clear()
+    backend._revoked_tokens.clear()
+    yield stored
+    backend._token_cache.clear()
+    backend._revoked_tokens.clear()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+
+import bcrypt
+import pytest
+
+pytest.importorskip('asgiref')
+
+import app as backend
+import asgi_app
+import queries
+from hashing import HashingExecutor
+
+
+# Пул asyncpg с заранее заданными ответами; запросы запоминаются
+class FakePool:
+    def __init__(self, **results):
+        self.results = results
+        self.calls = []
+
+    async def _answer(self, method, query, args):
+        self.calls.append((method, ' '.join(query.split()), args))
+        result = self.results.get(method)
+        return result(*args) if callable(result) else result
+
+    async def fetchval(self, query, *args):
+        return await self._answer('fetchval', query, args)
+
+    async def fetchrow(self, query, *args):
+        return await self._answer('fetchrow', query, args)
+
+    async def fetch(self, query, *args):
+        return await self._answer('fetch', query, args)
+
+    async def execute(self, query, *args):
+        return await self._answer('execute', query, args)
+
+
+def call(application, method, path, body=None, headers=None):
+    payload = b'' if body is None else json.dumps(body).encode('utf-8')
+    headers = dict(headers or {})
+    if body is not None:
+        headers.update({'Content-Type': 'application/json', 'Content-Length': str(len(payload))})
+
+    async def run():
+        messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': method, 'path': path,
+            'scheme': 'http', 'query_string': b'', 'root_path': '', 'server': ('127.0.0.1', 5000),
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                        for k, v in headers.items()],
+            'client': ('127.0.0.1', 50000),
+        }
+        await application(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(run())
+    start = sent[0]
+    response = b''.join(message.get('body', b'') for message in sent[1:])
+    headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in start['headers']}
+    return start['status'], headers, response
+
+
+@pytest.fixture
+def application(monkeypatch, flask_app):
+    executor = HashingExecutor(workers=1, kind='thread')
+    monkeypatch.setattr(backend, '_hashing_executor', executor)
+    monkeypatch.setitem(backend.app.config, 'BCRYPT_ROUNDS', 4)
+    monkeypatch.setitem(backend.app.config, 'VAULT_ENABLED', False)
+    audit = []
+    monkeypatch.setattr(asgi_app, 'audit_user', lambda request, *args: audit.append(args))
+    monkeypatch.setattr(asgi_app, 'audit_password',
+                        lambda request, *args, **kwargs: audit.append(args + (kwargs,)))
+    backend._services_cache.clear()
+    application = asgi_app.ASGIApplication()
+    application.audit = audit
+    yield application
+    backend._services_cache.clear()
+    executor.shutdown()
+
+
+def test_protected_routes_require_a_valid_token(application):
+    application.api.pool = FakePool()
+    status, _, body = call(application, 'GET', '/get_services')
+    assert status == 401
+    assert json.loads(body)['message'] == 'Token is missing'
+
+    status, _, _ = call(application, 'GET', '/get_services', headers={'Authorization': 'Bearer junk'})
+    assert status == 401
+    assert application.api.pool.calls == []
+
+
+def test_login_checks_the_password_and_issues_tokens(application):
+    hashed = bcrypt.hashpw(b'correct horse', bcrypt.gensalt(rounds=4)).decode('utf-8')
+    application.api.pool = FakePool(fetchrow={'password_hash': hashed})
+
+    status, _, body = call(application, 'POST', '/login',
+                           {'username': 'alice', 'password': 'correct horse'})
+    assert status == 200
+    tokens = json.loads(body)
+    assert backend.verify_token(tokens['access_token'])['username'] == 'alice'
+
+    status, _, _ = call(application, 'POST', '/login', {'username': 'alice', 'password': 'wrong'})
+    assert status == 401
+    assert [entry[1:3] for entry in application.audit] == [('LOGIN', 'SUCCESS'), ('LOGIN', 'FAILED')]
+
+
+def test_get_services_is_cached_and_answers_conditional_requests(application, auth_headers):
+    pool = application.api.pool = FakePool(fetch=[('mail', 2), ('bank', 1)])
+
+    status, headers, body = call(application, 'GET', '/get_services', headers=auth_headers)
+    assert status == 200
+    listing = json.loads(body)
+    assert listing['services'] == ['bank', 'mail']
+    assert listing['versions'] == {'bank': 1, 'mail': 2}
+
+    status, _, body = call(application, 'GET', '/get_services',
+                           headers={**auth_headers, 'If-None-Match': headers['etag']})
+    assert status == 304
+    assert body == b''
+    # Повторный запрос сверяет только поколение, список из БД не читается
+    assert [method for method, _, _ in pool.calls] == ['fetchrow', 'fetch', 'fetchrow']
+
+    # Запись в другом воркере сменила поколение - кэш этого воркера устарел
+    pool.results.update(fetchrow=(1, 0), fetch=[('mail', 3)])
+    status, _, body = call(application, 'GET', '/get_services', headers=auth_headers)
+    assert json.loads(body)['versions'] == {'mail': 3}
+    assert backend._services_cache.get('alice')[2] == 1
+
+
+def test_save_password_returns_the_version_and_drops_the_cached_list(application, auth_headers):
+    application.api.pool = FakePool(fetch=[('mail', 1)])
+    call(application, 'GET', '/get_services', headers=auth_headers)
+    assert backend._services_cache.get('alice') is not None
+
+    pool = application.api.pool = FakePool(fetchrow=('$2b$04$old', 2))
+    status, _, body = call(application, 'POST', '/save_password',
+                           {'service': 'mail', 'password': 'Xk9#mQ2$vL8@pR4!wZ6^'}, auth_headers)
+    assert status == 201
+    assert json.loads(body)['version'] == 2
+    assert backend._services_cache.get('alice') is None
+    _, query, args = pool.calls[0]
+    # Тот же запрос из реестра queries.py, что и у Flask-версии
+    assert query == ' '.join(queries.UPSERT_SERVICE_PASSWORD.numbered.split())
+    password_hash = args[7]
+    assert args == queries.upsert_service_password_params('alice', 'mail', password_hash)
+    assert bcrypt.checkpw(b'Xk9#mQ2$vL8@pR4!wZ6^', password_hash.encode('utf-8'))
+    assert application.audit[-1][1:3] == ('mail', 'UPDATE')
+
+    status, _, _ = call(application, 'POST', '/save_password',
+                        {'service': 'mail', 'password': 'qwerty123'}, auth_headers)
+    assert status == 400
+    assert len(pool.calls) == 1
+
+
+def test_delete_password_reports_missing_entries(application, auth_headers):
+    application.api.pool = FakePool(fetchval=None)
+    status, _, _ = call(application, 'POST', '/delete_password', {'service': 'mail'}, auth_headers)
+    assert status == 404
+
+    application.api.pool = FakePool(fetchval='$2b$04$old')
+    status, _, body = call(application, 'POST', '/delete_password', {'service': 'mail'}, auth_headers)
+    assert status == 200
+    assert json.loads(body)['message'] == 'Password deleted'
+    assert application.audit[-1][1:3] == ('mail', 'DELETE')
+
+
+def test_other_routes_and_vault_flows_go_to_flask(application, monkeypatch, auth_headers):
+    pool = application.api.pool = FakePool()
+    status, headers, body = call(application, 'GET', '/metrics')
+    assert status == 200
+    assert b'http_requests_total' in body
+
+    monkeypatch.setattr(backend, 'vault_enabled', lambda: True)
+    monkeypatch.setattr(backend, 'log_password_action', lambda *args, **kwargs: None)
+    status, _, body = call(application, 'POST', '/save_password',
+                           {'service': 'mail', 'password': 'Xk9#mQ2$vL8@pR4!wZ6^'}, auth_headers)
+    # Ключ хранилища не открыт - ответ Flask-маршрута, пул asyncpg не тронут
+    assert status == 423
+    assert json.loads(body)['locked'] is True
+    assert pool.calls == []
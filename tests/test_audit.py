@@ -0,0 +1,72 @@
+import threading
+
+from audit import AuditWriter
+
+
+class RecordingFlush:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, table, rows):
+        with self.lock:
+            self.batches.append((table, list(rows)))
+
+    def rows(self, table):
+        return [row for t, rows in self.batches if t == table for row in rows]
+
+
+def test_batches_by_size_and_drains_on_stop():
+    flush = RecordingFlush()
+    writer = AuditWriter(flush, batch_size=10, flush_interval=60)
+    for i in range(25):
+        writer.submit('user_logs', (i,))
+    writer.stop()
+
+    assert flush.rows('user_logs') == [(i,) for i in range(25)]
+    assert all(len(rows) <= 10 for _, rows in flush.batches)
+
+
+def test_groups_rows_per_table():
+    flush = RecordingFlush()
+    writer = AuditWriter(flush, batch_size=100, flush_interval=0.01)
+    writer.submit('user_logs', ('a',))
+    writer.submit('password_logs', ('b',))
+    writer.stop()
+
+    assert flush.rows('user_logs') == [('a',)]
+    assert flush.rows('password_logs') == [('b',)]
+
+
+def test_overflow_drop_newest_and_drop_oldest():
+    flush = RecordingFlush()
+    newest = AuditWriter(flush, batch_size=100, flush_interval=60, max_queue=2,
+                         overflow='drop_newest')
+    # Поток не запускаем, чтобы очередь не разгружалась
+    newest._thread = object()
+    assert newest.submit('user_logs', (1,))
+    assert newest.submit('user_logs', (2,))
+    assert not newest.submit('user_logs', (3,))
+    assert [row for _, row in newest._queue] == [(1,), (2,)]
+
+    oldest = AuditWriter(flush, batch_size=100, flush_interval=60, max_queue=2,
+                         overflow='drop_oldest')
+    oldest._thread = object()
+    for i in (1, 2, 3):
+        assert oldest.submit('user_logs', (i,))
+    assert [row for _, row in oldest._queue] == [(2,), (3,)]
+
+
+def test_failed_flush_does_not_stop_writer():
+    calls = []
+
+    def flaky(table, rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise RuntimeError('db down')
+
+    writer = AuditWriter(flaky, batch_size=1, flush_interval=0.01)
+    writer.submit('user_logs', (1,))
+    writer.submit('user_logs', (2,))
+    writer.stop()
+    assert len(calls) == 2
@@ -0,0 +1,98 @@
+import io
+import os
+
+import pytest
+
+from avatars import AvatarStore, AvatarTooLarge, InvalidAvatar, stream_to_file
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def png_bytes(width=400, height=300):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_thumbnails_are_generated_and_deduplicated(tmp_path):
+    store = AvatarStore(str(tmp_path), sizes=(64, 128))
+    data = png_bytes()
+
+    digest, names = store.save(io.BytesIO(data), 'me.png')
+    assert set(names) == {64, 128}
+    with Image.open(tmp_path / names[128]) as thumb:
+        assert max(thumb.size) == 128
+
+    mtime = os.path.getmtime(tmp_path / names[64])
+    again, _ = store.save(io.BytesIO(data), 'copy.png')
+    assert again == digest
+    assert os.path.getmtime(tmp_path / names[64]) == mtime
+    assert sorted(os.listdir(tmp_path)) == sorted(names.values())
+
+
+def test_upload_over_limit_is_rejected(tmp_path):
+    store = AvatarStore(str(tmp_path), max_bytes=1024)
+    with pytest.raises(AvatarTooLarge):
+        store.save(io.BytesIO(b'x' * 2048), 'big.png')
+    assert os.listdir(tmp_path) == []
+
+
+def test_non_image_is_rejected(tmp_path):
+    store = AvatarStore(str(tmp_path))
+    with pytest.raises(InvalidAvatar):
+        store.save(io.BytesIO(b'not an image'), 'fake.png')
+
+
+def test_stream_to_file_reads_in_chunks(tmp_path):
+    target = tmp_path / 'out'
+    digest = stream_to_file(io.BytesIO(b'abc' * 1000), str(target), max_bytes=3000, chunk_size=7)
+    assert target.read_bytes() == b'abc' * 1000
+    assert len(digest) == 64
+
+
+class CountingStream(io.RawIOBase):
+    def __init__(self, prefix, size):
+        self.data = io.BytesIO(prefix + b'x' * size)
+        self.read_bytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.data.readinto(buffer)
+        self.read_bytes += count
+        return count
+
+
+@pytest.fixture
+def small_avatars(flask_app, monkeypatch):
+    import app as backend
+
+    monkeypatch.setitem(flask_app.config, 'AVATAR_MAX_BYTES', 1024)
+    monkeypatch.setattr(backend, 'log_user_action', lambda *args, **kwargs: None)
+    monkeypatch.setattr(backend, 'write_profile', lambda *args: pytest.fail('profile written'))
+
+
+def test_oversized_profile_update_is_rejected(small_avatars, client, auth_headers):
+    response = client.post(
+        '/update_profile',
+        data={'avatar': (io.BytesIO(b'x' * 200 * 1024), 'big.png')},
+        headers=auth_headers,
+    )
+    assert response.status_code == 413
+    assert response.get_json()['message'] == 'Avatar is too large'
+
+
+def test_chunked_upload_is_cut_off_at_the_limit(small_avatars, client, auth_headers):
+    prefix = (b'--b\r\nContent-Disposition: form-data; name="avatar"; filename="big.png"\r\n'
+              b'Content-Type: image/png\r\n\r\n')
+    stream = CountingStream(prefix, 8 * 1024 * 1024)
+    response = client.post(
+        '/update_profile',
+        content_type='multipart/form-data; boundary=b',
+        headers={**auth_headers, 'Transfer-Encoding': 'chunked'},
+        environ_overrides={'wsgi.input': stream, 'wsgi.input_terminated': True},
+    )
+    assert response.status_code == 413
+    # Без Content-Length тело читается только до предела, а не целиком
+    assert stream.read_bytes < 1024 * 1024
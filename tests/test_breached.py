@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+
+import pytest
+
+import app as backend
+import breached
+
+
+def sha1_line(password, count=1):
+    return f"{hashlib.sha1(password.encode()).hexdigest().upper()}:{count}\n"
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    passwords = [f"leaked-{i}" for i in range(3000)] + ['Bench#Vault-7q2Lx9']
+    source = tmp_path / 'hashes.txt'
+    # Несортированный вход с повторами и мусором, несколько пачек сортировки
+    source.write_text(''.join(sha1_line(p) for p in reversed(passwords)) + sha1_line('leaked-7')
+                      + 'not a hash\n\n')
+    packed = tmp_path / 'more.txt.gz'
+    with gzip.open(packed, 'wt') as f:
+        f.write(sha1_line('from-gzip'))
+    output = tmp_path / 'breached.idx'
+    stats = breached.build_index([str(source), str(packed)], str(output), chunk_size=500)
+    assert stats == {'read': 3003, 'skipped': 1, 'count': 3002}
+    return output
+
+
+def test_lookup_finds_only_listed_passwords(index_path):
+    index = breached.BreachedIndex(str(index_path))
+    try:
+        assert len(index) == 3002
+        assert all(f"leaked-{i}" in index for i in range(0, 3000, 7))
+        assert 'from-gzip' in index
+        assert 'not-leaked' not in index
+        assert 'leaked-3000' not in index
+    finally:
+        index.close()
+
+
+def test_file_size_is_header_plus_fixed_records(index_path):
+    assert index_path.stat().st_size == (breached.HEADER.size + breached.OFFSETS.size
+                                         + 3002 * breached.DEFAULT_SUFFIX_BYTES)
+
+
+def test_other_files_are_rejected(tmp_path):
+    bogus = tmp_path / 'bogus.idx'
+    bogus.write_bytes(b'x' * (breached.HEADER.size + breached.OFFSETS.size))
+    with pytest.raises(breached.IndexFormatError):
+        breached.BreachedIndex(str(bogus))
+
+
+def test_register_and_save_reject_breached_passwords(index_path, monkeypatch, client, auth_headers):
+    index = breached.BreachedIndex(str(index_path))
+    monkeypatch.setattr(backend, '_breached_index', index)
+
+    response = client.post('/register', json={'username': 'alice', 'password': 'leaked-42'})
+    assert response.status_code == 400
+    assert response.get_json()['breached'] is True
+
+    response = client.post('/save_password', headers=auth_headers,
+                           json={'service': 'mail', 'password': 'Bench#Vault-7q2Lx9'})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'This password has appeared in a data breach'
+
+    monkeypatch.setattr(backend, 'log_user_action', lambda *args, **kwargs: None)
+    monkeypatch.setattr(backend, 'write_service_passwords_bulk',
+                        lambda *args: pytest.fail('breached entry imported'))
+    response = client.post('/passwords/bulk', headers=auth_headers,
+                           json={'entries': [{'service': 'news', 'password': 'x7#Unlisted-Pw'},
+                                             {'service': 'bank', 'password': 'leaked-7'}]})
+    assert response.status_code == 400
+    rejected, = response.get_json()['rejected']
+    assert rejected['service'] == 'bank'
+    assert rejected['breached'] is True
+    assert rejected['message'] == 'This password has appeared in a data breach'
+    index.close()
@@ -0,0 +1,81 @@
+from cache import LRUTTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUTTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_per_entry_ttl_cannot_exceed_cache_ttl():
+    clock = FakeClock()
+    cache = LRUTTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set('short', 1, ttl=1)
+    cache.set('long', 2, ttl=100)
+    cache.set('expired', 3, ttl=-1)
+    clock.now = 2
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+    assert 'expired' not in cache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.evictions == 1
+
+
+def test_pop_removes_entry():
+    cache = LRUTTLCache()
+    cache.set('a', 1)
+    assert cache.pop('a') == 1
+    assert cache.pop('a') is None
+
+
+def test_total_size_is_capped():
+    cache = LRUTTLCache(maxsize=10, ttl=60, max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'yyyy')
+    cache.set('a', 'xxxxxx')
+    assert cache.bytes == 10
+    cache.set('c', 'zz')
+    assert cache.get('b') is None
+    assert cache.bytes == 8
+    cache.set('huge', 'x' * 11)
+    assert 'huge' not in cache
+    assert cache.pop('a') == 'xxxxxx'
+    assert cache.bytes == 2
+
+
+def test_unexpired_entries_are_kept_when_eviction_is_disabled():
+    clock = FakeClock()
+    cache = LRUTTLCache(maxsize=2, ttl=60, clock=clock, evict_unexpired=False)
+    cache.set('old', True, ttl=5)
+    cache.set('a', True)
+    cache.set('b', True)
+    # Переполнение: истёкших записей ещё нет, все три остаются
+    assert all(key in cache for key in ('old', 'a', 'b'))
+
+    clock.now = 10
+    cache.set('c', True)
+    assert 'old' not in cache
+    assert len(cache) == 3
+    assert cache.evictions == 0
@@ -0,0 +1,101 @@
+import threading
+
+import psycopg2.extensions
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), created
+
+
+def test_pool_reuses_connections():
+    pool, created = make_pool(min_size=1, max_size=2)
+    for _ in range(5):
+        with pool.connection():
+            pass
+    assert len(created) == 1
+    assert pool.stats()['acquired_total'] == 5
+
+
+def test_nested_checkout_in_same_thread_shares_connection():
+    pool, _ = make_pool(min_size=0, max_size=1, acquire_timeout=0.1)
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+        assert pool.stats()['in_use'] == 1
+    assert pool.stats()['in_use'] == 0
+
+
+def test_acquire_timeout_when_exhausted():
+    pool, _ = make_pool(min_size=0, max_size=1, acquire_timeout=0.05)
+    held = pool.getconn()
+    errors = []
+
+    def worker():
+        try:
+            pool.getconn()
+        except PoolTimeout as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    pool.putconn(held)
+    assert len(errors) == 1
+    assert pool.stats()['timeouts_total'] == 1
+
+
+def test_stale_connection_is_replaced():
+    pool, created = make_pool(min_size=1, max_size=1, max_idle=0)
+    created[0].closed = 1
+    conn = pool.getconn()
+    assert conn is created[1]
+    assert pool.stats()['discarded_total'] == 1
+    pool.putconn(conn)
+
+
+def test_failed_block_rolls_back_and_returns_connection():
+    pool, created = make_pool(min_size=1, max_size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+            raise RuntimeError('boom')
+    assert created[0].rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_tracked_checkouts_are_reported_until_returned():
+    pool, _ = make_pool(min_size=0, max_size=2, track_checkouts=True)
+    conn = pool.getconn()
+    (owner, held, stack), = pool.checkouts(threading.get_ident()).values()
+    assert owner == threading.get_ident()
+    assert 'test_tracked_checkouts_are_reported_until_returned' in ''.join(stack)
+    assert pool.checkouts(thread=-1) == {}
+    pool.putconn(conn)
+    assert pool.checkouts() == {}
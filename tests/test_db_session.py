@@ -0,0 +1,130 @@
+import pytest
+
+import app as backend
+import queries
+from db_pool import ConnectionPool
+from db_session import DBSession
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.row = None
+
+    def execute(self, statement, params=None):
+        self.connection.statements.append(statement)
+        self.row = self.connection.rows.pop(0) if self.connection.rows else None
+
+    def fetchone(self):
+        return self.row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def database(monkeypatch, client, auth_headers):
+    connections, rows = [], []
+
+    def connect():
+        connections.append(FakeConnection())
+        connections[-1].rows = rows
+        return connections[-1]
+
+    pool = ConnectionPool(connect, min_size=0, max_size=2, track_checkouts=True)
+    monkeypatch.setattr(backend, '_db_pool', pool)
+    monkeypatch.setattr(backend, '_db_initialized', True)
+    monkeypatch.setattr(backend, 'log_password_action', lambda **kwargs: None)
+    client.environ_base['HTTP_AUTHORIZATION'] = auth_headers['Authorization']
+    return client, pool, connections, rows
+
+
+def test_commit_runs_callbacks_only_after_writes_are_committed():
+    conn = FakeConnection()
+    pool = ConnectionPool(lambda: conn, min_size=0)
+    session = DBSession(lambda: pool)
+    called = []
+    session.connection()
+    session.mark_dirty()
+    session.after_commit(called.append, 'invalidate')
+    session.rollback()
+    session.commit()
+    assert (conn.commits, called) == (0, [])
+
+    session.mark_dirty()
+    session.after_commit(called.append, 'invalidate')
+    session.commit()
+    assert (conn.commits, called) == (1, ['invalidate'])
+    session.close()
+    assert pool.stats()['in_use'] == 0
+
+
+def test_clean_connection_is_released_and_acquired_again():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=1)
+    session = DBSession(lambda: pool)
+    first = session.connection()
+    session.release_if_clean()
+    assert not session.active and pool.stats()['in_use'] == 0
+    assert session.connection() is first
+    session.mark_dirty()
+    session.release_if_clean()
+    assert session.active
+    session.close()
+    assert session.acquired == 2 and pool.stats()['in_use'] == 0
+
+
+def test_delete_uses_one_connection_and_one_statement(database):
+    client, pool, connections, rows = database
+    rows.append(('old-hash',))
+    response = client.post('/delete_password', json={'service': 'mail'})
+    assert response.status_code == 200
+    conn, = connections
+    assert conn.statements == [queries.DELETE_SERVICE_PASSWORD.text]
+    assert conn.commits == 1
+    assert pool.stats()['in_use'] == 0
+
+
+def test_missing_entry_is_rolled_back_and_released(database):
+    client, pool, connections, _ = database
+    response = client.post('/delete_password', json={'service': 'missing'})
+    assert response.status_code == 404
+    assert connections[0].commits == 0
+    assert pool.stats()['in_use'] == 0
+
+
+def test_leaked_connection_is_reported_in_debug_mode(database, monkeypatch):
+    client, pool, _, _ = database
+    monkeypatch.setattr(backend.app, 'debug', True)
+
+    def delete_service_password(username, service):
+        pool.getconn()
+        return 'old-hash'
+
+    monkeypatch.setattr(backend, 'delete_service_password', delete_service_password)
+    before = backend.DB_CONNECTION_LEAKS.value()
+    assert client.post('/delete_password', json={'service': 'mail'}).status_code == 200
+    assert backend.DB_CONNECTION_LEAKS.value() == before + 1
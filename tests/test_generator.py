@@ -0,0 +1,77 @@
+import string
+
+import pytest
+
+import generator
+
+
+def test_random_password_has_every_required_class():
+    for _ in range(50):
+        password, entropy = generator.random_password(8, ['lower', 'upper', 'digits', 'symbols'])
+        assert len(password) == 8
+        assert any(c in string.ascii_lowercase for c in password)
+        assert any(c in string.ascii_uppercase for c in password)
+        assert any(c in string.digits for c in password)
+        assert any(c in generator.CLASSES['symbols'] for c in password)
+    assert entropy > 50
+
+
+def test_ambiguous_characters_can_be_excluded():
+    password, _ = generator.random_password(128, ['lower', 'upper', 'digits'], exclude_ambiguous=True)
+    assert not set(password) & generator.AMBIGUOUS
+
+
+def test_passphrase_and_pronounceable_modes():
+    phrase, entropy = generator.passphrase(4, separator='.', capitalize=True, word_list=('alpha', 'beta'))
+    assert len(phrase.split('.')) == 4 and all(word in ('Alpha', 'Beta') for word in phrase.split('.'))
+    assert entropy == 4
+    word, _ = generator.pronounceable_password(12, ['lower'])
+    assert all(c in generator.VOWELS for c in word[1::2])
+
+
+def test_pronounceable_mode_honours_digits_and_symbols():
+    for _ in range(20):
+        word, entropy = generator.pronounceable_password(12, ['upper', 'digits', 'symbols'])
+        assert word[:9].isalpha() and word[:9].isupper()
+        assert word[9:11].isdigit()
+        assert word[11] in generator.CLASSES['symbols']
+    plain, plain_entropy = generator.pronounceable_password(12, ['lower'])
+    assert plain.isalpha() and plain.islower()
+    assert entropy > plain_entropy
+
+
+@pytest.mark.parametrize('data', [
+    {'mode': 'emoji'}, {'length': 4}, {'count': 0}, {'count': True},
+    {'classes': ['greek']}, {'classes': []}, {'separator': '----'},
+    {'mode': 'pronounceable', 'classes': ['digits', 'symbols']},
+])
+def test_invalid_policies_are_rejected(data):
+    with pytest.raises(generator.PolicyError):
+        generator.parse_policy(data)
+
+
+def test_generate_password_endpoint(client, auth_headers):
+    response = client.post('/generate_password', headers=auth_headers,
+                           json={'count': 5, 'length': 24, 'classes': ['lower', 'digits']})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    passwords = response.get_json()['passwords']
+    assert len(passwords) == 5
+    assert all(len(item['password']) == 24 and item['score'] >= 3 for item in passwords)
+
+    response = client.post('/generate_password', headers=auth_headers, json={'length': 1000})
+    assert response.status_code == 400
+
+    response = client.post('/generate_password', headers=auth_headers,
+                           json={'mode': 'pronounceable', 'classes': ['digits']})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'pronounceable mode needs the lower or upper class'
+
+
+def test_save_password_rejects_weak_passwords(client, auth_headers):
+    response = client.post('/save_password', headers=auth_headers,
+                           json={'service': 'mail', 'password': 'password-5'})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['message'] == 'Password is too weak'
+    assert body['strength']['score'] == 0
@@ -0,0 +1,71 @@
+import pytest
+
+from hashing import BCRYPT_SECONDS, HashingBusy, HashingExecutor
+
+
+@pytest.mark.parametrize('kind', ['thread', 'process'])
+def test_hash_and_check_roundtrip(kind):
+    executor = HashingExecutor(workers=2, kind=kind)
+    try:
+        hashed = executor.hash('correct horse', rounds=4)
+        assert hashed.startswith('$2b$04$')
+        assert executor.check(hashed, 'correct horse')
+        assert not executor.check(hashed, 'wrong horse')
+    finally:
+        executor.shutdown()
+    assert BCRYPT_SECONDS.count(op='hash') >= 1
+
+
+def test_saturated_executor_rejects():
+    executor = HashingExecutor(workers=1, max_queue=0, queue_timeout=0.01, kind='thread')
+    # Единственный слот занят "долгим" вызовом
+    executor._slots.acquire()
+    try:
+        with pytest.raises(HashingBusy):
+            executor.hash('password', rounds=4)
+    finally:
+        executor._slots.release()
+        executor.shutdown()
+
+
+def test_hash_many_preserves_order():
+    executor = HashingExecutor(workers=3, kind='thread')
+    try:
+        passwords = [f'password-{i}' for i in range(7)]
+        hashed = executor.hash_many(passwords, rounds=4)
+        assert len(hashed) == 7
+        assert all(executor.check(h, p) for h, p in zip(hashed, passwords))
+    finally:
+        executor.shutdown()
+
+
+def test_bulk_hashing_leaves_workers_for_interactive_checks():
+    executor = HashingExecutor(workers=2, bulk_workers=1, bulk_batch=2, kind='thread')
+    try:
+        hashed = executor.hash('interactive', rounds=4)
+        running = []
+        original = executor._submit_bulk
+
+        def submit_bulk(chunk, rounds):
+            future = original(chunk, rounds)
+            running.append(executor._bulk_slots._value)
+            return future
+
+        executor._submit_bulk = submit_bulk
+        passwords = [f'password-{i}' for i in range(7)]
+        bulk = executor.hash_many(passwords, rounds=4)
+        assert len(bulk) == 7
+        # Пачки по два пароля, не больше одной в работе одновременно
+        assert len(running) == 4 and set(running) == {0}
+        assert executor.check(hashed, 'interactive')
+    finally:
+        executor.shutdown()
+
+
+def test_result_timeout_is_reported_as_busy():
+    executor = HashingExecutor(workers=1, result_timeout=0.01, kind='thread')
+    try:
+        with pytest.raises(HashingBusy):
+            executor.hash('password', rounds=12)
+    finally:
+        executor.shutdown()
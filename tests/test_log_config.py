@@ -0,0 +1,71 @@
+import atexit
+import json
+import logging
+import time
+
+from flask import Flask
+
+from log_config import JsonFormatter, SamplingFilter, parse_levels, restart_after_fork, setup_logging
+
+
+def make_record(level=logging.INFO, **extra):
+    record = logging.LogRecord('app', level, __file__, 1, 'hello %s', ('world',), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_request_fields():
+    line = JsonFormatter().format(make_record(request_id='abc', route='/login', latency_ms=1.5))
+    data = json.loads(line)
+    assert data['message'] == 'hello world'
+    assert data['request_id'] == 'abc'
+    assert data['route'] == '/login'
+    assert data['latency_ms'] == 1.5
+    assert 'status_code' not in data
+
+
+def test_sampling_filter_never_drops_warnings():
+    sampler = SamplingFilter(rate=0.0)
+    assert not sampler.filter(make_record(logging.INFO))
+    assert sampler.filter(make_record(logging.WARNING))
+
+
+def test_parse_levels():
+    assert parse_levels('app=info, werkzeug=ERROR,broken') == {'app': 'INFO', 'werkzeug': 'ERROR'}
+    assert parse_levels(None) == {}
+
+
+def test_restart_after_fork_replaces_listener(tmp_path):
+    app = Flask('fork_test')
+    handler = setup_logging(app, filename=str(tmp_path / 'app.log'), sample_rate=1.0)
+    old = handler.listener
+    restart_after_fork(handler)
+    assert handler.listener is not old
+    assert handler.queue is handler.listener.queue
+    app.logger.warning('after fork')
+    log_file = tmp_path / 'app.log'
+    deadline = time.monotonic() + 2
+    while 'after fork' not in log_file.read_text() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 'after fork' in log_file.read_text()
+
+
+def test_external_rotation_reopens_the_moved_file(tmp_path):
+    app = Flask('rotation_test')
+    log_file = tmp_path / 'app.log'
+    handler = setup_logging(app, filename=str(log_file), rotation='external', console=False)
+    try:
+        app.logger.warning('before rotation')
+        handler.listener.stop()
+        # Внешняя ротация переименовывает файл; обработчик открывает новый
+        log_file.rename(tmp_path / 'app.log.1')
+        restart_after_fork(handler)
+        app.logger.warning('after rotation')
+        deadline = time.monotonic() + 2
+        while not (log_file.exists() and 'after rotation' in log_file.read_text()):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert 'before rotation' in (tmp_path / 'app.log.1').read_text()
+    finally:
+        atexit.unregister(handler.listener.stop)
+        handler.listener.stop()
@@ -0,0 +1,111 @@
+import base64
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app as backend
+from app import APIError
+
+T0 = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+@pytest.fixture
+def log_db(monkeypatch, flask_app):
+    executed = []
+    rows = [('LOGIN', '10.0.0.1', 'curl', 'SUCCESS', None, T0 - timedelta(minutes=i), 100 - i)
+            for i in range(3)]
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, query, params):
+            executed.append(params)
+
+        def fetchall(self):
+            return list(rows)
+
+    class Connection:
+        def cursor(self):
+            return Cursor()
+
+    @contextmanager
+    def get_db_connection():
+        yield Connection()
+
+    monkeypatch.setattr(backend, 'get_db_connection', get_db_connection)
+    monkeypatch.setattr(backend, 'log_user_action', lambda *args, **kwargs: None)
+    return executed
+
+
+def test_cursor_round_trips():
+    cursor = backend.encode_log_cursor(T0, 42)
+    assert backend.decode_log_cursor(cursor) == (T0, 42)
+    naive = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    assert backend.decode_log_cursor(backend.encode_log_cursor(naive, 7)) == (naive, 7)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    b64(b'2024-05-01T12:00:00+00:00'),
+    b64(b'2024-05-01T12:00:00+00:00|abc'),
+    b64(b'yesterday|42'),
+    b64(b'2024-05-01T12:00:00+00:00|42|7'),
+    b64(b'\xff\xfe|42'),
+    'курсор',
+])
+def test_invalid_or_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(APIError) as error:
+        backend.decode_log_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', 100),
+    ('?limit=1', 1),
+    ('?limit=500', 500),
+    ('?limit=100000', 500),
+])
+def test_page_size_is_clamped(log_db, query, expected):
+    with backend.app.test_request_context(f'/get_user_logs{query}'):
+        assert backend.parse_page_size() == expected
+
+
+@pytest.mark.parametrize('limit', ['0', '-5', 'ten', '1.5'])
+def test_invalid_page_sizes_are_rejected(log_db, limit):
+    with backend.app.test_request_context(f'/get_user_logs?limit={limit}'):
+        with pytest.raises(APIError) as error:
+            backend.parse_page_size()
+    assert error.value.status_code == 400
+
+
+def test_log_page_applies_filters_and_returns_the_next_cursor(log_db, client, auth_headers):
+    cursor = backend.encode_log_cursor(T0 + timedelta(hours=1), 500)
+
+    response = client.get('/get_user_logs', headers=auth_headers, query_string={
+        'limit': 2, 'action_type': 'LOGIN', 'status': '', 'username': 'bob',
+        'since': '2024-05-01T00:00:00+00:00', 'cursor': cursor,
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [log['timestamp'] for log in body['logs']] == [
+        T0.isoformat(), (T0 - timedelta(minutes=1)).isoformat()]
+    assert backend.decode_log_cursor(body['next_cursor']) == (T0 - timedelta(minutes=1), 99)
+    # Пустые и неизвестные фильтры не попадают в запрос, владелец логов - из токена
+    assert log_db == [['alice', 'LOGIN', datetime(2024, 5, 1, tzinfo=timezone.utc),
+                       T0 + timedelta(hours=1), 500, 3]]
+
+    response = client.get('/get_user_logs', headers=auth_headers, query_string={'limit': 5})
+    assert response.get_json()['next_cursor'] is None
+
+    response = client.get('/get_user_logs', headers=auth_headers, query_string={'until': 'soon'})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid until timestamp'
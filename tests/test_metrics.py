@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from metrics import Counter, Histogram, Registry
+
+
+def test_counter_sums_values_written_by_many_threads():
+    counter = Counter('requests_total', 'test', registry=Registry())
+
+    def work():
+        for _ in range(1000):
+            counter.inc(route='/login')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value(route='/login') == 8000
+    # Словари завершившихся потоков слиты в общий
+    counter.inc(route='/login')
+    assert len(counter._shards._shards) == 1
+    assert counter.value(route='/login') == 8001
+
+
+def test_histogram_time_records_failures():
+    registry = Registry()
+    histogram = Histogram('op_seconds', 'test', buckets=(0.5, 1.0), registry=registry)
+
+    @histogram.time(op='fail')
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        fail()
+    assert histogram.count(op='fail') == 1
+    rendered = registry.render()
+    assert 'op_seconds_bucket{le="0.5",op="fail"} 1' in rendered
+    assert 'op_seconds_bucket{le="+Inf",op="fail"} 1' in rendered
+    assert 'op_seconds_count{op="fail"} 1' in rendered
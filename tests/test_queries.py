@@ -0,0 +1,88 @@
+import pytest
+from psycopg2 import errors as pg_errors
+
+import queries
+
+
+class FakeCursor:
+    def __init__(self, connection, fail_execute=False):
+        self.connection = connection
+        self.fail_execute = fail_execute
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+        if self.fail_execute and statement.startswith('EXECUTE'):
+            raise pg_errors.InvalidSqlStatementName('prepared statement does not exist')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.prepared_statements = set()
+
+
+def test_placeholders_are_numbered_for_prepare():
+    query = queries.Query('q', "SELECT a FROM t WHERE b = %s AND c = %s")
+    assert query.prepare_sql == "PREPARE q AS SELECT a FROM t WHERE b = $1 AND c = $2"
+    assert query.execute_sql == "EXECUTE q (%s, %s)"
+
+
+def test_statement_is_prepared_once_per_connection():
+    conn = FakeConnection()
+    cur = FakeCursor(conn)
+    queries.run(cur, queries.LIST_SERVICES, ('alice',))
+    queries.run(cur, queries.LIST_SERVICES, ('bob',))
+    assert [statement for statement, _ in cur.statements] == [
+        queries.LIST_SERVICES.prepare_sql,
+        'EXECUTE list_services (%s)',
+        'EXECUTE list_services (%s)',
+    ]
+    other = FakeCursor(FakeConnection())
+    queries.run(other, queries.LIST_SERVICES, ('alice',))
+    assert other.statements[0][0].startswith('PREPARE')
+
+
+def test_unprepared_queries_and_plain_connections_send_text():
+    cur = FakeCursor(FakeConnection())
+    queries.run(cur, queries.EXPORT_SERVICE_PASSWORDS, ('alice',))
+    plain = FakeCursor(object())
+    queries.run(plain, queries.GET_USER, ('alice',))
+    assert cur.statements == [(queries.EXPORT_SERVICE_PASSWORDS.text, ('alice',))]
+    assert plain.statements == [(queries.GET_USER.text, ('alice',))]
+
+
+def test_lost_statement_is_prepared_again():
+    conn = FakeConnection()
+    conn.prepared_statements.add('get_user')
+    with pytest.raises(pg_errors.InvalidSqlStatementName):
+        queries.run(FakeCursor(conn, fail_execute=True), queries.GET_USER, ('alice',))
+    cur = FakeCursor(conn)
+    queries.run(cur, queries.GET_USER, ('alice',))
+    assert cur.statements[0][0] == queries.GET_USER.prepare_sql
+
+
+def test_update_is_a_single_compare_and_swap_statement():
+    cur = FakeCursor(object())
+    cur.fetchone = lambda: None
+    assert queries.update_service_password(cur, 'alice', 'mail', 3, 'email', None) is None
+    (statement, params), = cur.statements
+    assert statement.count('%s') == len(params)
+    assert params[2] == params[9] == params[16] == 3
+    assert params[5] is False and params[13] is True
+
+
+def test_numbered_text_matches_the_psycopg2_text():
+    query = queries.DELETE_SERVICE_PASSWORD
+    assert query.numbered.count('$') == query.text.count('%s') == 5
+    assert '$5' in query.numbered and '%s' not in query.numbered
+    assert query.prepare_sql == f"PREPARE {query.name} AS {query.numbered}"
+
+
+def test_revoking_a_token_purges_expired_revocations():
+    cur = FakeCursor(object())
+    queries.insert_revoked_token(cur, 'a' * 64, 1700000000)
+    assert cur.statements == [
+        (queries.PURGE_REVOKED_TOKENS.text, ()),
+        (queries.INSERT_REVOKED_TOKEN.text, ('a' * 64, 1700000000)),
+    ]
+    assert queries.SCHEMA_CHANGES[-1].name == 'create_revoked_tokens'
@@ -0,0 +1,84 @@
+from ratelimit import LoginRateLimiter, MemoryRateLimitStore, SlidingWindowLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(clock, limit=3, window=10, lockout=5, max_lockout=40, store=None):
+    if store is None:
+        store = MemoryRateLimitStore()
+    return SlidingWindowLimiter(store, 'test', limit, window, lockout, max_lockout, clock)
+
+
+def test_limit_is_enforced_within_window():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    assert [limiter.hit('k') for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit('k') == 5
+    assert limiter.retry_after('k') == 5
+    clock.now += 5
+    assert limiter.retry_after('k') == 0
+
+
+def test_previous_window_is_weighted_by_overlap():
+    clock = FakeClock()
+    limiter = make_limiter(clock, limit=4)
+    for _ in range(4):
+        limiter.hit('k')
+    # Половина окна спустя предыдущий интервал весит 0.5: 4 * 0.5 + 2 = 4
+    clock.now += 15
+    assert limiter.hit('k') == 0
+    assert limiter.hit('k') == 0
+    assert limiter.hit('k') > 0
+
+
+def test_lockout_doubles_up_to_maximum():
+    clock = FakeClock()
+    limiter = make_limiter(clock, limit=1)
+    durations = []
+    for _ in range(5):
+        limiter.hit('k')
+        durations.append(limiter.hit('k'))
+        clock.now += durations[-1]
+    assert durations == [5, 10, 20, 40, 40]
+
+
+def test_store_evicts_least_recently_used_keys():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(max_keys=2)
+    limiter = make_limiter(clock, store=store)
+    for key in ('a', 'b', 'c'):
+        limiter.hit(key)
+    assert len(store) == 2
+    assert store.evictions == 1
+
+
+def test_login_limiter_counts_failures_per_user_and_attempts_per_ip():
+    clock = FakeClock()
+    limiter = LoginRateLimiter(MemoryRateLimitStore(), ip_limit=10, ip_window=60,
+                               user_limit=2, user_window=60, lockout=30, clock=clock)
+    assert limiter.check('alice', '10.0.0.1') == (None, 0)
+    limiter.failed('alice')
+    limiter.failed('alice')
+    assert limiter.failed('alice') == 30
+    assert limiter.check('alice', '10.0.0.2') == ('user', 30)
+    assert limiter.check('bob', '10.0.0.2') == (None, 0)
+
+    for _ in range(9):
+        limiter.check('bob', '10.0.0.3')
+    assert limiter.check('carol', '10.0.0.3') == (None, 0)
+    assert limiter.check('carol', '10.0.0.3') == ('ip', 30)
+
+
+def test_success_resets_user_failures():
+    clock = FakeClock()
+    limiter = LoginRateLimiter(MemoryRateLimitStore(), user_limit=2, clock=clock)
+    limiter.failed('alice')
+    limiter.failed('alice')
+    limiter.succeeded('alice')
+    assert limiter.failed('alice') == 0
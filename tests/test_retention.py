@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+
+import retention
+
+
+def test_periods():
+    moment = datetime(2026, 12, 17, 15, 30)
+    assert retention.period_start(moment, 'day') == datetime(2026, 12, 17)
+    assert retention.period_start(moment, 'week') == datetime(2026, 12, 14)
+    assert retention.period_start(moment, 'month') == datetime(2026, 12, 1)
+    assert retention.next_period(datetime(2026, 12, 1), 'month') == datetime(2027, 1, 1)
+    assert retention.next_period(datetime(2026, 1, 1), 'month') == datetime(2026, 2, 1)
+    with pytest.raises(ValueError):
+        retention.period_start(moment, 'year')
+
+
+def test_partition_bounds_are_parsed():
+    legacy = retention.parse_partition(
+        'user_logs_legacy', "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00')", 10)
+    monthly = retention.parse_partition(
+        'user_logs_p20261101',
+        "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')", 0)
+    default = retention.parse_partition('user_logs_default', 'DEFAULT', 0)
+    assert (legacy.start, legacy.end) == (None, datetime(2026, 11, 1))
+    assert (monthly.start, monthly.end) == (datetime(2026, 11, 1), datetime(2026, 12, 1))
+    assert default.default
+
+
+def test_bound_offsets_and_fractions_are_normalised():
+    bound = retention.parse_partition(
+        'user_logs_p20261101',
+        "FOR VALUES FROM ('2026-11-01 00:00:00.5+05:30') TO ('2026-12-01 00:00:00-08')", 0)
+    assert (bound.start, bound.end) == (datetime(2026, 11, 1, 0, 0, 0, 500000), datetime(2026, 12, 1))
+    with pytest.raises(ValueError):
+        retention.parse_partition('broken', "FOR VALUES FROM ('yesterday') TO (MAXVALUE)", 0)
+
+
+def test_plan_creates_missing_periods_and_archives_expired():
+    partitions = [
+        retention.Partition('user_logs_legacy', None, datetime(2026, 5, 1), 100, False),
+        retention.Partition('user_logs_p20260501', datetime(2026, 5, 1), datetime(2026, 6, 1), 5, False),
+        retention.Partition('user_logs_p20261001', datetime(2026, 10, 1), datetime(2026, 11, 1), 5, False),
+        retention.Partition('user_logs_default', None, None, 0, True),
+    ]
+    create, archive = retention.plan(partitions, datetime(2026, 10, 18), 'month', 2, 140)
+    assert create == [(datetime(2026, 11, 1), datetime(2026, 12, 1)),
+                      (datetime(2026, 12, 1), datetime(2027, 1, 1))]
+    # срез 31 мая: секция за май заканчивается позже и остаётся
+    assert [p.name for p in archive] == ['user_logs_legacy']
@@ -0,0 +1,80 @@
+import pytest
+
+import app as backend
+
+
+@pytest.fixture
+def services(monkeypatch, flask_app):
+    stored = {'alice': [('mail', 1), ('bank', 3)]}
+    generations = {}
+    calls = []
+
+    def get_user_services(username):
+        calls.append(username)
+        return list(stored.get(username, []))
+
+    monkeypatch.setattr(backend, 'get_user_services', get_user_services)
+    monkeypatch.setattr(backend, 'read_cache_generations',
+                        lambda username: (generations.get(username, 0), 0))
+    backend._services_cache.clear()
+    yield stored, calls, generations
+    backend._services_cache.clear()
+
+
+def test_service_list_is_cached_until_invalidated(services):
+    stored, calls, _ = services
+    first = backend.get_cached_services('alice')
+    assert backend.get_cached_services('alice') == first
+    assert first[0] == {'services': ['bank', 'mail'], 'versions': {'bank': 3, 'mail': 1}}
+    assert calls == ['alice']
+
+    stored['alice'].append(('forum', 1))
+    backend.invalidate_services('alice')
+    listing, etag = backend.get_cached_services('alice')
+    assert listing['services'] == ['bank', 'forum', 'mail']
+    assert etag != first[1]
+    assert len(calls) == 2
+
+
+def test_read_started_before_invalidation_is_not_cached(services):
+    epoch = backend.services_epoch()
+    backend.invalidate_services('alice')
+    backend.cache_services('alice', [('stale', 1)], epoch, 0)
+    assert backend._services_cache.get('alice') is None
+
+
+def test_write_in_another_worker_changes_the_generation(services):
+    stored, calls, generations = services
+    backend.get_cached_services('alice')
+    # Другой воркер сохранил пароль: локальный кэш не сброшен, но поколение в БД новое
+    stored['alice'].append(('forum', 1))
+    generations['alice'] = 1
+    listing, _ = backend.get_cached_services('alice')
+    assert listing['services'] == ['bank', 'forum', 'mail']
+    assert backend.get_cached_services('alice')[0] == listing
+    assert len(calls) == 2
+
+
+def test_get_services_returns_304_for_matching_etag(services, client, auth_headers):
+    response = client.get('/get_services', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['services'] == ['bank', 'mail']
+    assert response.get_json()['versions'] == {'bank': 3, 'mail': 1}
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    etag = response.headers['ETag']
+    response = client.get('/get_services', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_vault_flag_is_part_of_the_listing(services, client, auth_headers, monkeypatch):
+    monkeypatch.setitem(backend.app.config, 'VAULT_ENABLED', False)
+    response = client.get('/get_services', headers=auth_headers)
+    assert response.get_json()['vault'] is False
+
+    monkeypatch.setattr(backend, 'vault_enabled', lambda: True)
+    backend.invalidate_services('alice')
+    again = client.get('/get_services', headers={**auth_headers, 'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 200
+    assert again.get_json()['vault'] is True
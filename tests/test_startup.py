@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+# Холодный старт в отдельном процессе: импорт, create_app и первый запрос.
+# psycopg2.connect подменён, чтобы любое обращение к БД было видно
+CHILD = """
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import psycopg2
+connects = []
+def connect(*args, **kwargs):
+    connects.append(args)
+    raise psycopg2.OperationalError('no database in startup test')
+psycopg2.connect = connect
+
+import app as backend
+imported = time.perf_counter()
+after_import = {{'files': sorted(os.listdir('.')), 'env': os.getenv('STARTUP_PROBE'),
+                'connects': len(connects)}}
+
+backend.create_app()
+response = backend.app.test_client().get('/metrics')
+served = time.perf_counter()
+print(json.dumps({{
+    'after_import': after_import,
+    'status': response.status_code,
+    'env': os.getenv('STARTUP_PROBE'),
+    'connects': len(connects),
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - started) * 1000,
+}}))
+"""
+
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '3000'))
+
+
+def run_cold_start(cwd):
+    (cwd / '.env').write_text('STARTUP_PROBE=1\n')
+    env = dict(os.environ, LOG_CONSOLE='0')
+    env.pop('STARTUP_PROBE', None)
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD.format(backend=BACKEND_DIR)],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_has_no_side_effects(tmp_path):
+    data = run_cold_start(tmp_path)
+    assert data['after_import'] == {'files': ['.env'], 'env': None, 'connects': 0}
+    assert data['env'] == '1'
+    assert data['status'] == 200
+    # /metrics не обращается к базе
+    assert data['connects'] == 0
+    assert not (tmp_path / 'uploads').exists()
+
+
+def test_cold_start_to_first_request_within_budget(tmp_path):
+    data = run_cold_start(tmp_path)
+    print(f"import {data['import_ms']:.0f} ms, first request {data['first_request_ms']:.0f} ms")
+    assert data['first_request_ms'] < STARTUP_BUDGET_MS
+
+
+def test_schema_is_initialized_once_on_first_connection(monkeypatch):
+    from unittest import mock
+
+    import app as backend
+
+    pool = mock.MagicMock()
+    monkeypatch.setattr(backend, 'get_db_pool', lambda: pool)
+    monkeypatch.setattr(backend, '_db_initialized', False)
+    for _ in range(3):
+        with backend.get_db_connection():
+            pass
+    # одно соединение на создание индексов и по одному на каждый вызов
+    assert pool.connection.call_count == 4
+    assert backend._db_initialized
@@ -0,0 +1,63 @@
+import pytest
+
+import app as backend
+from strength import StrengthEstimator
+
+estimator = StrengthEstimator()
+
+
+def test_common_and_patterned_passwords_score_low():
+    for password in ('password-5', 'P@ssw0rd2024', 'qwerty123', 'aaaaaaaaaaaa', 'abcdefgh1234'):
+        assert estimator.estimate(password).score == 0, password
+
+
+def test_random_passwords_score_high():
+    strength = estimator.estimate('Xk9#mQ2$vL8@pR4!wZ6^')
+    assert strength.score == 4
+    assert strength.warnings == []
+
+
+def test_repeated_blocks_score_low():
+    strength = estimator.estimate('aB3$' * 16)
+    assert strength.score == 0
+    assert strength.warnings == ['Contains repeated characters']
+    assert estimator.estimate('x9#Kx9#Kx9#K').score == 0
+    # Сильный блок остаётся сильным, копии добавляют лишь несколько бит
+    assert estimator.estimate('Xk9#mQ2$vL8@pR4!wZ6^' * 2).entropy < 95
+
+
+def test_warnings_name_the_patterns_found():
+    assert estimator.estimate('P@ssw0rd2024').warnings == [
+        'Contains a commonly used password', 'Contains a year']
+    assert 'Contains the username or service name' in estimator.estimate(
+        'zorglub!!', ('zorglub',)).warnings
+    assert estimator.estimate('Ab1!').warnings[0] == 'Password is shorter than 8 characters'
+
+
+def test_custom_dictionary_is_used():
+    custom = StrengthEstimator(['zorglubqx'], words=())
+    assert custom.estimate('zorglubqx').score == 0
+    assert estimator.estimate('zorglubqx').entropy > custom.estimate('zorglubqx').entropy
+
+
+def test_bulk_import_rejects_weak_entries(monkeypatch, client, auth_headers):
+    monkeypatch.setattr(backend, 'log_user_action', lambda *args, **kwargs: None)
+    monkeypatch.setattr(backend, 'write_service_passwords_bulk',
+                        lambda *args: pytest.fail('weak entry imported'))
+    response = client.post(
+        '/passwords/bulk', headers=auth_headers,
+        json={'entries': [{'service': 'mail', 'password': 'Xk9#mQ2$vL8@pR4!wZ6^'},
+                          {'service': 'bank', 'password': 'qwerty123'},
+                          {'service': 'shop', 'password': ''},
+                          {'service': 'forum', 'password': 'password'}]})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['message'] == '3 of 4 entries were rejected'
+    # Отклонённые записи перечислены все сразу, а не только первая
+    rejected = {entry['service']: entry for entry in body['rejected']}
+    assert sorted(rejected) == ['bank', 'forum', 'shop']
+    assert rejected['shop'] == {'index': 2, 'service': 'shop',
+                                'message': 'Each entry needs a service and a password'}
+    assert rejected['bank']['message'] == 'Password is too weak'
+    assert rejected['bank']['strength']['score'] == 0
+    assert rejected['forum']['strength']['score'] == 0
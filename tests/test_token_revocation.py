@@ -0,0 +1,48 @@
+import pytest
+
+import app as backend
+from app import APIError
+
+
+@pytest.fixture
+def tokens(flask_app):
+    return backend.generate_tokens('alice')
+
+
+def forget_local_state():
+    # Другой воркер или перезапущенный процесс: кэши процесса пусты
+    backend._token_cache.clear()
+    backend._revoked_tokens.clear()
+
+
+def test_revocation_is_persisted_and_seen_by_other_workers(tokens, revoked_tokens):
+    token = tokens['access_token']
+    assert backend.verify_token(token)['username'] == 'alice'
+
+    backend.revoke_token(token)
+    assert list(revoked_tokens) == [backend.token_digest(token)]
+
+    forget_local_state()
+    with pytest.raises(APIError) as error:
+        backend.verify_token(token)
+    assert error.value.status_code == 401
+    assert error.value.message == 'Token has been revoked'
+    # Отзыв из БД запомнен в процессе, повторной проверки не нужно
+    assert backend.token_digest(token) in backend._revoked_tokens
+    assert backend.cached_token_claims(token) is None
+
+
+def test_cached_token_skips_the_revocation_lookup(tokens, monkeypatch):
+    token = tokens['access_token']
+    lookups = []
+    monkeypatch.setattr(backend, 'is_token_revoked', lambda digest: lookups.append(digest) or False)
+
+    backend.verify_token(token)
+    backend.verify_token(token)
+    assert len(lookups) == 1
+    assert backend.cached_token_claims(token)['username'] == 'alice'
+
+
+def test_invalid_token_is_not_persisted(tokens, revoked_tokens):
+    backend.revoke_token('junk')
+    assert revoked_tokens == {}
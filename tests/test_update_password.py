@@ -0,0 +1,51 @@
+import pytest
+
+import app as backend
+
+
+@pytest.fixture
+def actions(monkeypatch, client, auth_headers):
+    actions = []
+    monkeypatch.setattr(backend, 'log_password_action', lambda **kwargs: actions.append(kwargs))
+    client.environ_base['HTTP_AUTHORIZATION'] = auth_headers['Authorization']
+    return actions
+
+
+def test_version_is_required(client, actions):
+    response = client.post('/update_password', json={'service': 'mail', 'new_service': 'email'})
+    assert response.status_code == 400
+    assert actions[-1]['status'] == 'FAILED'
+
+
+def test_stale_version_is_rejected_with_current_version(client, actions, monkeypatch):
+    def update_service_password(username, service, version, new_service, password=None, data_key=None):
+        raise backend.VersionConflict(5)
+
+    monkeypatch.setattr(backend, 'update_service_password', update_service_password)
+    response = client.post('/update_password',
+                           json={'service': 'mail', 'new_service': 'email', 'version': 4})
+    assert response.status_code == 409
+    assert response.get_json()['current_version'] == 5
+
+
+def test_rename_keeps_hash_out_of_the_log(client, actions, monkeypatch):
+    monkeypatch.setattr(backend, 'update_service_password',
+                        lambda *args, **kwargs: (5, 'hash', 'hash'))
+    response = client.post('/update_password',
+                           json={'service': 'mail', 'new_service': 'email', 'version': 4})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 5
+    assert actions[-1]['old_password_hash'] is None
+    assert actions[-1]['details'] == 'Renamed from mail'
+
+
+def test_internal_error_is_logged_as_failed(client, actions, monkeypatch):
+    def update_service_password(*args, **kwargs):
+        raise RuntimeError('connection reset')
+
+    monkeypatch.setattr(backend, 'update_service_password', update_service_password)
+    response = client.post('/update_password',
+                           json={'service': 'mail', 'new_service': 'email', 'version': 4})
+    assert response.status_code == 500
+    assert actions[-1] == {'username': 'alice', 'service': 'mail', 'action_type': 'UPDATE',
+                           'status': 'FAILED', 'details': 'Internal error'}
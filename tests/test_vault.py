@@ -0,0 +1,77 @@
+import jwt
+import pytest
+
+import app as backend
+import vault
+
+needs_crypto = pytest.mark.skipif(not vault.AVAILABLE, reason='cryptography is not installed')
+FAST_KDF = {'n': 2 ** 10, 'r': 8, 'p': 1}
+
+
+def test_key_derivation_depends_on_password_and_salt():
+    key = vault.derive_key('correct horse', b'0' * 16, **FAST_KDF)
+    assert len(key) == vault.KEY_BYTES
+    assert vault.derive_key('correct horse', b'0' * 16, **FAST_KDF) == key
+    assert vault.derive_key('correct horse', b'1' * 16, **FAST_KDF) != key
+    assert vault.derive_key('correct horsf', b'0' * 16, **FAST_KDF) != key
+
+
+def test_refresh_keeps_the_login_session(monkeypatch, client):
+    monkeypatch.setattr(backend, 'user_exists', lambda username: True)
+    tokens = backend.generate_tokens('alice', 'session-1')
+    response = client.post('/refresh', json={'refresh_token': tokens['refresh_token']})
+    claims = jwt.decode(response.get_json()['access_token'], backend.app.config['SECRET_KEY'],
+                        algorithms=['HS256'])
+    assert claims['sid'] == 'session-1'
+
+
+@needs_crypto
+def test_data_key_opens_only_with_the_master_password():
+    record, data_key = vault.create_user_key('alice', 'Bench#Vault-7q2Lx9', **FAST_KDF)
+    assert vault.unwrap_user_key('alice', 'Bench#Vault-7q2Lx9', record) == data_key
+    with pytest.raises(vault.InvalidMasterPassword):
+        vault.unwrap_user_key('alice', 'wrong password', record)
+    with pytest.raises(vault.InvalidMasterPassword):
+        vault.unwrap_user_key('mallory', 'Bench#Vault-7q2Lx9', record)
+
+
+@needs_crypto
+def test_entries_are_bound_to_owner_and_service():
+    _, data_key = vault.create_user_key('alice', 'master', **FAST_KDF)
+    blob = vault.encrypt_secret(data_key, 'alice', 'mail', 's3cret')
+    assert vault.decrypt_secret(data_key, 'alice', 'mail', blob) == 's3cret'
+    with pytest.raises(vault.VaultError):
+        vault.decrypt_secret(data_key, 'alice', 'bank', blob)
+    tampered = blob[:-1] + bytes([blob[-1] ^ 1])
+    assert list(vault.decrypt_secrets(data_key, 'alice', [('mail', blob), ('mail', tampered)])) == [
+        ('mail', 's3cret'), ('mail', None)
+    ]
+
+
+@needs_crypto
+def test_batch_decrypt_uses_the_cached_session_key(monkeypatch, client, make_auth_headers):
+    monkeypatch.setitem(backend.app.config, 'VAULT_ENABLED', True)
+    monkeypatch.setattr(backend, 'log_user_action', lambda *args, **kwargs: None)
+    _, data_key = vault.create_user_key('alice', 'master', **FAST_KDF)
+    secrets = vault.encrypt_secrets(data_key, 'alice', {f'site{i}': f'pw{i}' for i in range(50)})
+    monkeypatch.setattr(backend, 'read_service_secrets', lambda username, services=None: [
+        (service, 1, secret) for service, secret in secrets.items()
+        if services is None or service in services
+    ] + [('legacy', 1, None)])
+    backend._vault_keys.set(('alice', 'session-1'), data_key)
+    headers = make_auth_headers('alice', 'session-1')
+    derivations = backend.VAULT_KEY_DERIVATIONS.value()
+    response = client.post('/passwords/decrypt', json={'services': ['site3', 'legacy', 'gone']},
+                           headers=headers)
+    body = response.get_json()
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert body['passwords'] == [{'service': 'site3', 'version': 1, 'password': 'pw3'}]
+    assert (body['missing'], body['not_encrypted']) == (['gone'], ['legacy'])
+    response = client.post('/passwords/decrypt', headers=headers)
+    assert len(response.get_json()['passwords']) == 50
+    assert backend.VAULT_KEY_DERIVATIONS.value() == derivations
+
+    response = client.post('/passwords/decrypt', headers=make_auth_headers('alice', 'session-2'))
+    assert response.status_code == 423
+    assert response.get_json()['locked'] is True
+    backend._vault_keys.clear()